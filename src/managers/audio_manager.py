@@ -15,8 +15,13 @@ import numpy as np
 import os
 import threading
 import struct
+import time
+from cryptography.exceptions import InvalidTag
 
 from src.managers.base_audio_manager import *
+from src.managers.crypto_manager import SEGMENT_HEADER_SIZE, ENVELOPE_HEADER_SIZE
+from src.utils.audio_container import ContainerWriter, ContainerReader, is_container
+from src.utils.recorder import StreamRecorder, WaveSink, OpusSink
 
 # Path and file names for the file types.
 PATH = "./audio_files/"
@@ -33,6 +38,9 @@ HYBRID_ENCRYPTED_AUDIO_FILE = PATH + "HYBRID_encrypted_audio.bin"
 HYBRID_ENCRYPTED_AUDIO_STREAM_FILE = PATH + "HYBRID_encrypted_audio_stream.wav"
 HYBRID_DECRYPTED_AUDIO_FILE = PATH + "HYBRID_decrypted_audio.wav"
 HYBRID_DECRYPTED_AUDIO_STREAM_FILE = PATH + "HYBRID_decrypted_audio_stream.wav"
+SEGMENTED_AUDIO_FILE = PATH + "segmented_audio.bin"
+SEGMENTED_DECRYPTED_AUDIO_FILE = PATH + "segmented_decrypted_audio.wav"
+CONTAINER_AUDIO_FILE = PATH + "encrypted_audio.sd3c"
 
 
 class AudioManager(BaseAudioManager):
@@ -115,6 +123,11 @@ class AudioManager(BaseAudioManager):
         """
         self.logger.info(f"Monitoring audio | {self.volume}%")
 
+        # The monitor thread owns its own session for each direction
+        tx_session = self.crypto_manager.open_session(encrypt=True)
+        rx_session = self.crypto_manager.open_session(encrypt=False)
+        seq = 0
+
         try:
             # Open the streams
             if self.audio.get_device_count() == 0:
@@ -138,12 +151,15 @@ class AudioManager(BaseAudioManager):
                 data = audio_data.tobytes()
                 ###############################################################
                 # Encrypt --> decrypt --> write to output stream
-                encrypted_data = self.crypto_manager.encrypt(data)
-                decrypted_data = self.crypto_manager.decrypt(encrypted_data)
+                encrypted_data = tx_session.update(data, seq)
+                decrypted_data = rx_session.update(encrypted_data, seq)
+                seq += 1
                 self.output_stream.write(decrypted_data)
         except KeyboardInterrupt:
             self.logger.info("\nMonitoring stopped.\n")
         finally:
+            tx_session.close()
+            rx_session.close()
             self.close_streams()
             self.logger.info("Monitoring stopped.")
 
@@ -151,6 +167,10 @@ class AudioManager(BaseAudioManager):
         """
         Record audio from the microphone and save it to a WAV file.
 
+        The audio is written by a StreamRecorder as it is recorded, so memory
+        stays constant and the file is playable up to the last batch if the
+        recording is cut short.
+
         Parameters
         ----------
         output_file : str, optional
@@ -172,41 +192,34 @@ class AudioManager(BaseAudioManager):
         try:
             self.logger.debug("Recording... Press Ctrl+C to stop.")
             self.open_streams()
-            frames = []  # List to store recorded frames
-            try:
-                while True:
-                    # Capture audio data from the input stream
-                    data = self.input_stream.read(
-                        self.CHUNK, exception_on_overflow=False
-                    )
-                    frames.append(data)
-                    # Playback the captured data
-                    if monitoring:
-                        self.output_stream.write(data)
-            except KeyboardInterrupt:
-                self.logger.debug("\nRecording stopped.")
-                # Save recorded audio to a WAV file
-                with wave.open(output_file, "wb") as wf:
-                    wf.setnchannels(self.CHANNELS)
-                    wf.setsampwidth(self.audio.get_sample_size(self.FORMAT))
-                    wf.setframerate(self.RATE)
-                    wf.writeframes(b"".join(frames))
-                self.logger.debug(f"Audio saved to {output_file}")
+            sink = WaveSink(
+                output_file_path,
+                self.CHANNELS,
+                self.audio.get_sample_size(self.FORMAT),
+                self.RATE,
+            )
+            with StreamRecorder(sink) as recorder:
+                self._record(recorder, monitoring)
+            self.logger.debug(f"Audio saved to {output_file}")
         except Exception as e:
             self.logger.error(f"An error occurred: {e}")
         finally:
             self.close_streams()
 
     def record_encrypted_audio(
-        self, output_file=ENCRYPTED_AUDIO_STREAM_FILE, monitoring=False
+        self, output_file=CONTAINER_AUDIO_FILE, monitoring=False
     ):
         """
-        Record audio, encrypt it, and save it to a file.
+        Record audio, encrypt it, and save it to a seekable container.
+
+        Segments are sealed and written as they fill by a StreamRecorder,
+        so only one segment of audio is held in memory and sealing never
+        delays the input stream.
 
         Parameters
         ----------
         output_file : str, optional
-            The name of the output encrypted file (default is "recorded_audio_encrypted.wav").
+            The name of the output container (default is "encrypted_audio.sd3c").
         monitoring : bool, optional
             If True, play back the recorded audio while recording (default is False).
         """
@@ -224,24 +237,17 @@ class AudioManager(BaseAudioManager):
         try:
             self.logger.debug("Recording... Press Ctrl+C to stop.")
             self.open_streams()
-            frames = []
-            try:
-                while True:
-                    data = self.input_stream.read(
-                        self.CHUNK, exception_on_overflow=False
-                    )
-                    encrypted_data = self.crypto_manager.encrypt(data)
-                    frames.append(encrypted_data)
-                    if monitoring:
-                        self.output_stream.write(data)
-            except KeyboardInterrupt:
-                self.logger.debug("\nRecording stopped.")
-                with wave.open(output_file, "wb") as wf:
-                    wf.setnchannels(self.CHANNELS)
-                    wf.setsampwidth(self.audio.get_sample_size(self.FORMAT))
-                    wf.setframerate(self.RATE)
-                    wf.writeframes(b"".join(frames))
-                self.logger.debug(f"Audio saved to {output_file}")
+            with open(output_file_path, "wb") as f:
+                container = ContainerWriter(
+                    self.crypto_manager,
+                    f,
+                    self.CHANNELS,
+                    self.audio.get_sample_size(self.FORMAT),
+                    self.RATE,
+                )
+                with StreamRecorder(container) as recorder:
+                    self._record(recorder, monitoring)
+            self.logger.debug(f"Audio saved to {output_file}")
         except PermissionError:
             self.logger.warning(
                 f"Permission denied: Unable to write to {output_file}"
@@ -251,6 +257,33 @@ class AudioManager(BaseAudioManager):
         finally:
             self.close_streams()
 
+    def _record(self, recorder, monitoring=False):
+        """
+        Read the input stream into a recorder until Ctrl+C is pressed.
+
+        Parameters
+        ----------
+        recorder : StreamRecorder
+            Receives every chunk read.
+        monitoring : bool, optional
+            If True, play back the recorded audio while recording.
+        """
+        try:
+            while True:
+                data = self.input_stream.read(
+                    self.CHUNK, exception_on_overflow=False
+                )
+                recorder.write(data)
+                if monitoring:
+                    self.output_stream.write(data)
+        except KeyboardInterrupt:
+            self.logger.debug("\nRecording stopped.")
+        if recorder.dropped:
+            self.logger.warning(
+                f"{recorder.dropped} of {recorder.queued + recorder.dropped} "
+                f"chunks were dropped while recording."
+            )
+
     def encrypt_file(
         self, input_file=AUDIO_FILE, output_file=ENCRYPTED_AUDIO_FILE
     ):
@@ -288,8 +321,7 @@ class AudioManager(BaseAudioManager):
         with open(input_file_path, "rb") as f:
             audio_data = f.read()
 
-        crypto_manager = CryptoManager()
-        encrypted_data = crypto_manager.encrypt(audio_data)
+        encrypted_data = self.crypto_manager.encrypt(audio_data)
 
         with open(output_file_path, "wb") as f:
             f.write(encrypted_data)
@@ -352,18 +384,28 @@ class AudioManager(BaseAudioManager):
 
     def decrypt_audio_file_chunked(
         self,
-        input_file=ENCRYPTED_AUDIO_STREAM_FILE,
+        input_file=CONTAINER_AUDIO_FILE,
         output_file=DECRYPTED_AUDIO_STREAM_FILE,
+        start=0.0,
+        end=None,
     ):
         """
-        Decrypt an encrypted audio file (chunked frames) and save the decrypted audio to a new file.
+        Decrypt an encrypted recording and save the decrypted audio to a new file.
+
+        Both the seekable container and the older WAV of encrypted chunks
+        are supported. Only the segments or chunks overlapping the time
+        range are read and decrypted.
 
         Parameters
         ----------
         input_file : str, optional
-            The encrypted audio file to decrypt (default is "recorded_audio_encrypted.wav").
+            The encrypted recording to decrypt (default is "encrypted_audio.sd3c").
         output_file : str, optional
-            The file to save the decrypted audio (default is "recorded_audio_decrypted.wav").
+            The file to save the decrypted audio (default is "decrypted_audio_stream.wav").
+        start : float, optional
+            Start time in seconds (default is the beginning).
+        end : float, optional
+            End time in seconds (default is the end of the recording).
         """
         # Get the parent directory of the current script
         parent_dir = get_proj_root()
@@ -388,30 +430,58 @@ class AudioManager(BaseAudioManager):
 
         try:
             self.logger.debug(f"Decrypting {input_file}...")
+            if is_container(input_file_path):
+                with open(input_file_path, "rb") as f, wave.open(
+                    output_file_path, "wb"
+                ) as wf:
+                    container = ContainerReader(self.crypto_manager, f)
+                    wf.setnchannels(container.channels)
+                    wf.setsampwidth(container.sample_width)
+                    wf.setframerate(container.sample_rate)
+                    for data in container.read(start, end):
+                        wf.writeframesraw(data)
+                self.logger.debug(f"Decrypted audio saved to {output_file}")
+                return
+
             decrypted_frames = []
 
             # Open the encrypted audio file
-            with wave.open(input_file, "rb") as wf:
+            with wave.open(input_file_path, "rb") as wf:
                 # Get parameters from the encrypted file
                 num_channels = wf.getnchannels()
                 sample_width = wf.getsampwidth()
                 frame_rate = wf.getframerate()
                 num_frames = wf.getnframes()
 
+                # Each chunk was encrypted on its own, so decryption can
+                # start at the chunk holding the start time.
+                first = min(int(start * frame_rate), num_frames)
+                last = num_frames
+                if end is not None:
+                    last = max(first, min(int(end * frame_rate), num_frames))
+                chunk_start = first - first % self.CHUNK
+                wf.setpos(chunk_start)
+
                 # Read and decrypt frames chunk by chunk
-                for _ in range(0, num_frames, self.CHUNK):
+                for _ in range(chunk_start, last, self.CHUNK):
                     encrypted_chunk = wf.readframes(self.CHUNK)
                     decrypted_chunk = self.crypto_manager.decrypt(
                         encrypted_chunk
                     )
                     decrypted_frames.append(decrypted_chunk)
 
+            # Trim the first and last chunks to the time range
+            frame_bytes = num_channels * sample_width
+            lo = (first - chunk_start) * frame_bytes
+            hi = (last - chunk_start) * frame_bytes
+            decrypted_data = b"".join(decrypted_frames)[lo:hi]
+
             # Write the decrypted frames to a new WAV file
-            with wave.open(output_file, "wb") as wf:
+            with wave.open(output_file_path, "wb") as wf:
                 wf.setnchannels(num_channels)
                 wf.setsampwidth(sample_width)
                 wf.setframerate(frame_rate)
-                wf.writeframes(b"".join(decrypted_frames))
+                wf.writeframes(decrypted_data)
 
             self.logger.debug(f"Decrypted audio saved to {output_file}")
         except Exception as e:
@@ -422,7 +492,8 @@ class AudioManager(BaseAudioManager):
         Record audio from the microphone, encode it using the Opus codec, and save it to a file.
 
         This method records audio from the microphone, encodes it using the Opus codec,
-        and saves the encoded audio to a file.
+        and saves the encoded audio to a file. Encoding and writing run on the
+        StreamRecorder writer thread.
 
         Raises
         ------
@@ -441,26 +512,20 @@ class AudioManager(BaseAudioManager):
         # Open the input stream
         self.open_input_stream()
 
-        # Open file to write encoded audio
-        with open(output_file, "wb") as file:
-            print("Recording... Press Ctrl+C to stop.")
-            try:
-                while True:
-                    data = self.input_stream.read(
-                        self.CHUNK, exception_on_overflow=False
-                    )
-                    encoded = self.encoder.encode(data, self.CHUNK)
-
-                    # Write the length of the encoded frame first (to aid decoding)
-                    file.write(
-                        struct.pack("H", len(encoded))
-                    )  # Store frame size (2 bytes)
-                    file.write(encoded)  # Store actual Opus frame data
-            except KeyboardInterrupt:
-                print("\nRecording stopped.")
-                # Close input stream
-                self.input_stream.stop_stream()
-                self.input_stream.close()
+        # Each frame is written as its length (2 bytes) and the Opus data
+        sink = OpusSink(
+            output_file,
+            self.encoder,
+            self.CHUNK,
+            self.CHANNELS * self.audio.get_sample_size(self.FORMAT),
+        )
+        print("Recording... Press Ctrl+C to stop.")
+        try:
+            with StreamRecorder(sink) as recorder:
+                self._record(recorder)
+        finally:
+            # Close input stream
+            self.close_input_stream()
 
     def play_encoded_audio(self):
         """
@@ -539,23 +604,12 @@ class AudioManager(BaseAudioManager):
             return
 
         try:
-            # Read the audio file
-            with wave.open(input_file_path, 'rb') as wf:
-                # Get audio parameters
-                params = {
-                    'channels': wf.getnchannels(),
-                    'sampwidth': wf.getsampwidth(),
-                    'framerate': wf.getframerate()
-                }
-                # Read audio data
-                audio_data = wf.readframes(wf.getnframes())
-
-            # Encrypt the audio data
-            encrypted_data = self.crypto_manager.rsa_encrypt(audio_data)
-
-            # Encrypt the audio data
-            with open(output_file_path, "wb") as f:
-                f.write(encrypted_data)
+            # Encrypt the audio with an RSA-wrapped data key, block by block
+            with wave.open(input_file_path, 'rb') as wf, open(output_file_path, "wb") as f:
+                frame_bytes = wf.getsampwidth() * wf.getnchannels()
+                self.crypto_manager.envelope_encrypt_stream(
+                    lambda size: wf.readframes(size // frame_bytes), f.write
+                )
 
             self.logger.info(f"RSA encrypted audio saved to {output_file}")
         except Exception as e:
@@ -586,21 +640,39 @@ class AudioManager(BaseAudioManager):
 
         try:
             self.logger.info(f"Decrypting {input_file}...")
-            # Read encrypted data from the file
             with open(input_file_path, "rb") as encrypted_file:
-                encrypted_data = encrypted_file.read()
-
-            # Decrypt the audio data
-            decrypted_data = self.crypto_manager.rsa_decrypt(encrypted_data)
+                is_envelope = self.crypto_manager.is_envelope(
+                    encrypted_file.read(ENVELOPE_HEADER_SIZE)
+                )
+                encrypted_file.seek(0)
 
-            # Write the decrypted data to a WAV file
-            with wave.open(output_file_path, "wb") as wf:
-                wf.setnchannels(self.CHANNELS)
-                wf.setsampwidth(self.audio.get_sample_size(self.FORMAT))
-                wf.setframerate(self.RATE)
-                wf.writeframes(decrypted_data)
+                with wave.open(output_file_path, "wb") as wf:
+                    wf.setnchannels(self.CHANNELS)
+                    wf.setsampwidth(self.audio.get_sample_size(self.FORMAT))
+                    wf.setframerate(self.RATE)
+                    if is_envelope:
+                        # The audio is decrypted block by block, the WAV
+                        # header is patched once when the file is closed
+                        self.crypto_manager.envelope_decrypt_stream(
+                            encrypted_file.read,
+                            wf.writeframesraw,
+                            os.path.getsize(input_file_path),
+                        )
+                    else:
+                        # Files written before the envelope format, one RSA
+                        # block per 446 bytes of audio. The blocks are
+                        # decrypted on worker processes and written as each
+                        # range comes back.
+                        for decrypted_data in self.crypto_manager.rsa_decrypt_stream(
+                            encrypted_file.read()
+                        ):
+                            wf.writeframes(decrypted_data)
 
             self.logger.info(f"Decrypted audio saved to {output_file}")
+        except InvalidTag:
+            # The tag is checked after the last block, so drop the audio
+            os.remove(output_file_path)
+            self.logger.error("Decryption failed: the file was modified")
         except Exception as e:
             self.logger.error(f"An error occurred during decryption: {e}")
 
@@ -674,6 +746,386 @@ class AudioManager(BaseAudioManager):
         except Exception as e:
             self.logger.error(f"An error occurred during decryption: {e}")
 
+    def _stream_paths(self, input_file, output_file):
+        """
+        Resolve the input and output paths of a streamed file.
+
+        Parameters
+        ----------
+        input_file : str
+            Name of the input file in the audio files folder.
+        output_file : str
+            Name of the output file in the audio files folder.
+
+        Returns
+        -------
+        tuple or None
+            ``(input_file_path, output_file_path)``, or None if the input
+            file does not exist.
+        """
+        output_dir = os.path.join(get_proj_root(), PATH)
+        ensure_path(str(output_dir))
+        input_file_path = os.path.join(
+            output_dir, os.path.basename(input_file)
+        )
+        output_file_path = os.path.join(
+            output_dir, os.path.basename(output_file)
+        )
+        if not os.path.exists(input_file_path):
+            self.logger.error(f"Error: {input_file_path} does not exist.")
+            return None
+        return input_file_path, output_file_path
+
+    def _log_throughput(self, action, num_bytes, duration):
+        """
+        Log and return the throughput of a streamed file.
+
+        Returns
+        -------
+        float
+            Throughput in MB/s.
+        """
+        mb = num_bytes / (1024 * 1024)
+        mb_per_sec = mb / duration if duration > 0 else 0.0
+        self.logger.info(
+            f"{action} {mb:.1f} MB in {duration:.2f} s ({mb_per_sec:.1f} MB/s)"
+        )
+        return mb_per_sec
+
+    def encrypt_file_stream(
+        self, input_file=AUDIO_FILE, output_file=ENCRYPTED_AUDIO_FILE
+    ):
+        """
+        Encrypt an audio file block by block, with constant memory use.
+
+        The output is the same as ``encrypt_file``.
+
+        Parameters
+        ----------
+        input_file : str, optional
+            The audio file to encrypt (default is "audio.wav").
+        output_file : str, optional
+            The file to save the encrypted audio (default is "encrypted_audio.bin").
+
+        Returns
+        -------
+        float or None
+            Throughput in MB/s, or None if the file could not be encrypted.
+        """
+        paths = self._stream_paths(input_file, output_file)
+        if paths is None:
+            return None
+
+        try:
+            start_time = time.perf_counter()
+            with open(paths[0], "rb") as src, open(paths[1], "wb") as dst:
+                total = self.crypto_manager.transform_stream(
+                    src.read, dst.write, encrypt=True
+                )
+            duration = time.perf_counter() - start_time
+            self.logger.debug(f"Encrypted audio saved to {output_file}")
+            return self._log_throughput("Encrypted", total, duration)
+        except Exception as e:
+            self.logger.error(f"An error occurred during encryption: {e}")
+            return None
+
+    def decrypt_audio_file_stream(
+        self, input_file=ENCRYPTED_AUDIO_FILE, output_file=DECRYPTED_AUDIO_FILE
+    ):
+        """
+        Decrypt an encrypted audio file block by block, with constant memory use.
+
+        The output is the same as ``decrypt_audio_file``.
+
+        Parameters
+        ----------
+        input_file : str, optional
+            The encrypted audio file to decrypt (default is "encrypted_audio.bin").
+        output_file : str, optional
+            The WAV file to save the decrypted audio (default is "decrypted_audio.wav").
+
+        Returns
+        -------
+        float or None
+            Throughput in MB/s, or None if the file could not be decrypted.
+        """
+        paths = self._stream_paths(input_file, output_file)
+        if paths is None:
+            return None
+
+        try:
+            self.logger.debug(f"Decrypting {input_file}...")
+            start_time = time.perf_counter()
+            with open(paths[0], "rb") as src, wave.open(paths[1], "wb") as wf:
+                wf.setnchannels(self.CHANNELS)
+                wf.setsampwidth(self.audio.get_sample_size(self.FORMAT))
+                wf.setframerate(self.RATE)
+                # The WAV header is patched once when the file is closed
+                total = self.crypto_manager.transform_stream(
+                    src.read, wf.writeframesraw, encrypt=False
+                )
+            duration = time.perf_counter() - start_time
+            self.logger.debug(f"Decrypted audio saved to {output_file}")
+            return self._log_throughput("Decrypted", total, duration)
+        except Exception as e:
+            self.logger.error(f"An error occurred during decryption: {e}")
+            return None
+
+    def encrypt_hybrid_file_stream(
+        self, input_file=AUDIO_FILE, output_file=HYBRID_ENCRYPTED_AUDIO_FILE
+    ):
+        """
+        Encrypt the audio of a WAV file using hybrid RSA-AES encryption,
+        block by block, with constant memory use.
+
+        The output is the same as ``encrypt_hybrid_file``.
+
+        Parameters
+        ----------
+        input_file : str, optional
+            The WAV file to encrypt (default is "audio.wav").
+        output_file : str, optional
+            The file to save the encrypted audio.
+
+        Returns
+        -------
+        float or None
+            Throughput in MB/s, or None if the file could not be encrypted.
+        """
+        paths = self._stream_paths(input_file, output_file)
+        if paths is None:
+            return None
+
+        try:
+            start_time = time.perf_counter()
+            with wave.open(paths[0], "rb") as wf, open(paths[1], "wb") as dst:
+                frame_bytes = wf.getsampwidth() * wf.getnchannels()
+                total = self.crypto_manager.transform_stream(
+                    lambda size: wf.readframes(size // frame_bytes),
+                    dst.write,
+                    encrypt=True,
+                    hybrid=True,
+                )
+            duration = time.perf_counter() - start_time
+            self.logger.info(f"Hybrid encrypted audio saved to {output_file}")
+            return self._log_throughput("Encrypted", total, duration)
+        except Exception as e:
+            self.logger.error(f"An error occurred during encryption: {e}")
+            return None
+
+    def decrypt_hybrid_audio_file_stream(
+        self,
+        input_file=HYBRID_ENCRYPTED_AUDIO_FILE,
+        output_file=HYBRID_DECRYPTED_AUDIO_FILE,
+    ):
+        """
+        Decrypt a hybrid RSA-AES encrypted audio file block by block, with
+        constant memory use.
+
+        The output is the same as ``decrypt_hybrid_audio_file``.
+
+        Parameters
+        ----------
+        input_file : str, optional
+            The encrypted audio file to decrypt.
+        output_file : str, optional
+            The WAV file to save the decrypted audio.
+
+        Returns
+        -------
+        float or None
+            Throughput in MB/s, or None if the file could not be decrypted.
+        """
+        paths = self._stream_paths(input_file, output_file)
+        if paths is None:
+            return None
+
+        try:
+            self.logger.info(f"Decrypting {input_file}...")
+            start_time = time.perf_counter()
+            with open(paths[0], "rb") as src, wave.open(paths[1], "wb") as wf:
+                wf.setnchannels(self.CHANNELS)
+                wf.setsampwidth(self.audio.get_sample_size(self.FORMAT))
+                wf.setframerate(self.RATE)
+                total = self.crypto_manager.transform_stream(
+                    src.read, wf.writeframesraw, encrypt=False, hybrid=True
+                )
+            duration = time.perf_counter() - start_time
+            self.logger.info(f"Decrypted audio saved to {output_file}")
+            return self._log_throughput("Decrypted", total, duration)
+        except Exception as e:
+            self.logger.error(f"An error occurred during decryption: {e}")
+            return None
+
+    def encrypt_file_container(
+        self, input_file=AUDIO_FILE, output_file=CONTAINER_AUDIO_FILE
+    ):
+        """
+        Encrypt the audio of a WAV file into a seekable container.
+
+        Parameters
+        ----------
+        input_file : str, optional
+            The WAV file to encrypt (default is "audio.wav").
+        output_file : str, optional
+            The container to save the encrypted audio (default is "encrypted_audio.sd3c").
+
+        Returns
+        -------
+        float or None
+            Throughput in MB/s, or None if the file could not be encrypted.
+        """
+        paths = self._stream_paths(input_file, output_file)
+        if paths is None:
+            return None
+
+        try:
+            start_time = time.perf_counter()
+            with wave.open(paths[0], "rb") as wf, open(paths[1], "wb") as f:
+                with ContainerWriter(
+                    self.crypto_manager,
+                    f,
+                    wf.getnchannels(),
+                    wf.getsampwidth(),
+                    wf.getframerate(),
+                ) as container:
+                    while data := wf.readframes(wf.getframerate()):
+                        container.write(data)
+                total = container.num_frames * container.frame_bytes
+            duration = time.perf_counter() - start_time
+            self.logger.debug(f"Encrypted audio saved to {output_file}")
+            return self._log_throughput("Encrypted", total, duration)
+        except Exception as e:
+            self.logger.error(f"An error occurred during encryption: {e}")
+            return None
+
+    def encrypt_file_parallel(
+        self,
+        input_file=AUDIO_FILE,
+        output_file=SEGMENTED_AUDIO_FILE,
+        workers=FILE_WORKERS,
+        segment_size=SEGMENT_SIZE,
+    ):
+        """
+        Encrypt the audio of a WAV file into a segmented AES-CTR file,
+        using a thread pool.
+
+        The header keeps the audio format, so the file decrypts back to a
+        WAV file without knowing how it was recorded.
+
+        Parameters
+        ----------
+        input_file : str, optional
+            The WAV file to encrypt (default is "audio.wav").
+        output_file : str, optional
+            The file to save the encrypted audio (default is "segmented_audio.bin").
+        workers : int, optional
+            Number of threads encrypting segments.
+        segment_size : int, optional
+            Size of each segment in bytes, a multiple of 16.
+
+        Returns
+        -------
+        float or None
+            Throughput in MB/s, or None if the file could not be encrypted.
+        """
+        paths = self._stream_paths(input_file, output_file)
+        if paths is None:
+            return None
+
+        try:
+            start_time = time.perf_counter()
+            with wave.open(paths[0], "rb") as wf, open(paths[1], "wb") as dst:
+                frame_bytes = wf.getsampwidth() * wf.getnchannels()
+                nonce = os.urandom(8)
+                dst.write(
+                    self.crypto_manager.pack_segment_header(
+                        nonce,
+                        wf.getnframes() * frame_bytes,
+                        (wf.getnchannels(), wf.getsampwidth(), wf.getframerate()),
+                        segment_size,
+                    )
+                )
+                total = self.crypto_manager.transform_segments(
+                    lambda size: wf.readframes(size // frame_bytes),
+                    dst.write,
+                    nonce,
+                    workers=workers,
+                    segment_size=segment_size,
+                )
+            duration = time.perf_counter() - start_time
+            self.logger.debug(f"Segmented audio saved to {output_file}")
+            return self._log_throughput("Encrypted", total, duration)
+        except Exception as e:
+            self.logger.error(f"An error occurred during encryption: {e}")
+            return None
+
+    def decrypt_audio_file_parallel(
+        self,
+        input_file=SEGMENTED_AUDIO_FILE,
+        output_file=SEGMENTED_DECRYPTED_AUDIO_FILE,
+        workers=FILE_WORKERS,
+        start_segment=0,
+    ):
+        """
+        Decrypt a segmented AES-CTR file into a WAV file, using a thread pool.
+
+        Decryption may start at any segment, the audio before it is skipped
+        without being read.
+
+        Parameters
+        ----------
+        input_file : str, optional
+            The segmented file to decrypt (default is "segmented_audio.bin").
+        output_file : str, optional
+            The WAV file to save the decrypted audio.
+        workers : int, optional
+            Number of threads decrypting segments.
+        start_segment : int, optional
+            Index of the first segment to decrypt.
+
+        Returns
+        -------
+        float or None
+            Throughput in MB/s, or None if the file could not be decrypted.
+        """
+        paths = self._stream_paths(input_file, output_file)
+        if paths is None:
+            return None
+
+        try:
+            self.logger.debug(f"Decrypting {input_file}...")
+            start_time = time.perf_counter()
+            with open(paths[0], "rb") as src, wave.open(paths[1], "wb") as wf:
+                header = self.crypto_manager.unpack_segment_header(
+                    src.read(SEGMENT_HEADER_SIZE)
+                )
+                crypto_manager = self.crypto_manager.with_key(header["key_id"])
+                if crypto_manager is None:
+                    raise ValueError(f"Unknown key ID {header['key_id']}")
+                wf.setnchannels(header["channels"])
+                wf.setsampwidth(header["sample_width"])
+                wf.setframerate(header["sample_rate"])
+
+                offset = min(
+                    start_segment * header["segment_size"], header["length"]
+                )
+                src.seek(SEGMENT_HEADER_SIZE + offset)
+                total = crypto_manager.transform_segments(
+                    src.read,
+                    wf.writeframesraw,
+                    header["nonce"],
+                    offset=offset,
+                    workers=workers,
+                    segment_size=header["segment_size"],
+                )
+            duration = time.perf_counter() - start_time
+            self.logger.debug(f"Decrypted audio saved to {output_file}")
+            return self._log_throughput("Decrypted", total, duration)
+        except Exception as e:
+            self.logger.error(f"An error occurred during decryption: {e}")
+            return None
+
 
 if __name__ == "__main__":
     tm = ThreadManager()
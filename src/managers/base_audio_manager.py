@@ -17,6 +17,13 @@ import threading
 import struct
 
 from src.managers.crypto_manager import CryptoManager
+from src.utils.encoder_profile import ENCODER_PROFILES, encoder_ctl
+from src.utils.vad import frame_rms
+from src.utils.callback_stream import (
+    CallbackStream,
+    CaptureStream,
+    PlaybackStream,
+)
 from src.utils.utils import *
 from src.logging.logger import *
 from src.managers.thread_manager import ThreadManager
@@ -55,9 +62,12 @@ class BaseAudioManager:
     output_device_index : int or None
         Index of the output device.
 
-    input_stream : pyaudio.Stream or None
+    callback_mode : bool
+        True to open callback mode streams backed by ring buffers, False
+        for blocking streams.
+    input_stream : pyaudio.Stream, CaptureStream or None
         Stream object for audio input.
-    output_stream : pyaudio.Stream or None
+    output_stream : pyaudio.Stream, PlaybackStream or None
         Stream object for audio output.
 
     crypto_manager : CryptoManager
@@ -93,19 +103,20 @@ class BaseAudioManager:
         self.input_device_index = in_device_index  #! THIS VALUE CAN CHANGE
         self.output_device_index = out_device_index  #! THIS VALUE CAN CHANGE
 
+        self.callback_mode = AUDIO_CALLBACK_MODE
         self.input_stream = None
         self.output_stream = None
 
-        # Initialize the crypto_manager
+        # Initialize the crypto_manager, loading only the keys the active
+        # encryption mode needs.
         self.crypto_manager = CryptoManager()
+        self.crypto_manager.preload()
 
         self.volume = 100  # Volume in %
         self.thread_manager = thread_manager
 
         # Create Opus encoder
-        self.encoder = opuslib.Encoder(
-            self.RATE, self.CHANNELS, application=opuslib.APPLICATION_AUDIO
-        )
+        self.set_encoder_profile(OPUS_PROFILE)
 
         # Decode Opus audio
         self.decoder = opuslib.Decoder(self.RATE, self.CHANNELS)
@@ -149,6 +160,47 @@ class BaseAudioManager:
         # Terminate the PyAudio session
         self.audio.terminate()
 
+    def set_encoder_profile(self, name):
+        """
+        Replace the Opus encoder with one built from a profile.
+
+        The new encoder is swapped in whole, so a transmission in progress
+        switches over at the next frame.
+
+        Parameters
+        ----------
+        name : str
+            Name of a profile in ``ENCODER_PROFILES``.
+        """
+        if name not in ENCODER_PROFILES:
+            raise ValueError(f"Unknown encoder profile: {name}")
+        profile = ENCODER_PROFILES[name]
+        self.encoder = profile.create_encoder(self.RATE, self.CHANNELS)
+        self.encoder_profile = profile
+        self.logger.info(f"Encoder profile set to {profile.format()}")
+
+    def set_inband_fec(self, enabled, packet_loss_perc):
+        """
+        Configure Opus in-band forward error correction on the encoder.
+
+        With FEC on, every packet also carries a low-bitrate copy of the
+        frame before it, which the receiver decodes when that frame was
+        lost. The expected loss sets how many bits the copy gets.
+
+        Parameters
+        ----------
+        enabled : bool
+            Enable or disable in-band FEC.
+        packet_loss_perc : int
+            Expected packet loss in percent (0-100).
+        """
+        encoder_ctl(self.encoder, opuslib.api.ctl.set_inband_fec, int(enabled))
+        encoder_ctl(
+            self.encoder,
+            opuslib.api.ctl.set_packet_loss_perc,
+            packet_loss_perc,
+        )
+
     def set_audio_processing(
         self,
         enable_normalization=None,
@@ -196,6 +248,16 @@ class BaseAudioManager:
         Open the audio input stream.
         """
         try:
+            if self.callback_mode:
+                self.input_stream = CaptureStream(
+                    self.audio,
+                    self.FORMAT,
+                    self.CHANNELS,
+                    self.RATE,
+                    self.CHUNK,
+                    self.input_device_index,
+                )
+                return
             self.input_stream = self.audio.open(
                 format=self.FORMAT,
                 channels=self.CHANNELS,
@@ -214,6 +276,16 @@ class BaseAudioManager:
         Open the audio output stream.
         """
         try:
+            if self.callback_mode:
+                self.output_stream = PlaybackStream(
+                    self.audio,
+                    self.FORMAT,
+                    self.CHANNELS,
+                    self.RATE,
+                    self.CHUNK,
+                    self.output_device_index,
+                )
+                return
             self.output_stream = self.audio.open(
                 format=self.FORMAT,
                 channels=self.CHANNELS,
@@ -242,6 +314,8 @@ class BaseAudioManager:
         """
         # Close input stream if it is open
         if self.input_stream:
+            if isinstance(self.input_stream, CallbackStream):
+                self.logger.debug(self.input_stream.format())
             self.input_stream.stop_stream()
             self.input_stream.close()
             del self.input_stream
@@ -253,6 +327,8 @@ class BaseAudioManager:
         """
         # Close output stream if it is open
         if self.output_stream:
+            if isinstance(self.output_stream, CallbackStream):
+                self.logger.debug(self.output_stream.format())
             self.output_stream.stop_stream()
             self.output_stream.close()
             del self.output_stream
@@ -265,6 +341,19 @@ class BaseAudioManager:
         self.close_input_stream()
         self.close_output_stream()
 
+    @property
+    def buffering_latency(self):
+        """
+        Seconds audio currently spends buffered between the microphone and
+        the encoder plus between the decoder and the speaker, including the
+        device latency. Only callback mode streams are counted.
+        """
+        latency = 0.0
+        for stream in (self.input_stream, self.output_stream):
+            if isinstance(stream, CallbackStream):
+                latency += stream.buffered + stream.device_latency
+        return latency
+
     def find_devices(self):
         """
         Display all available audio input and output devices.
@@ -302,7 +391,7 @@ class BaseAudioManager:
         # Apply audio processing if enabled
         if self.enable_normalization or self.enable_noise_gate:
             # Calculate current RMS (audio level)
-            rms = np.sqrt(np.mean(np.square(audio_data.astype(np.float32))))
+            rms = frame_rms(data)
 
             # Apply noise gate if enabled
             if self.enable_noise_gate and rms < self.noise_gate_threshold:
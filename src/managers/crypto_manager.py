@@ -29,232 +29,2548 @@ Why CFB for Audio?
         It allows encryption and decryption of partial blocks, making it efficient for real-time processing.
         The lack of padding simplifies the processing pipeline for continuous audio streams.
 
+Radio frames in the default mode use AES-CTR instead, re-keyed per frame, so
+a lost frame does not affect the next one (see ``_open_aes``).
+
 Other modes:
     GCM (provides integrity/authentication)
     CTR (better parallelism and performance).
 
 """
 
+import io
+import os
 import sys
+import copy
+import time
+import struct
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.primitives.asymmetric import rsa, padding
 from cryptography.hazmat.primitives import serialization, hashes
+from cryptography.exceptions import InvalidTag
 
 from src.utils.utils import *
 from src.utils.constants import (
     PACKET_ENCRYPTION,
     DATA_ENCRYPTION,
     MODE_AES,
+    MODE_CTR,
+    MODE_GCM,
+    MODE_CHACHA,
+    AEAD_TAG_SIZE,
     MODE_RSA,
     MODE_HYBRID,
+    KEY_ID,
+    MAX_KEY_ID,
+    SEQUENCE_MASK,
+    RSA_WORKERS,
+    FILE_BLOCK_SIZE,
+    SEGMENT_SIZE,
+    FILE_WORKERS,
+    KEYSTREAM_DEPTH,
+    MAX_FRAME_PAYLOAD,
+    REKEY_INTERVAL,
+    REKEY_FRAMES,
+    REKEY_LEAD_FRAMES,
+    SESSION_KEYS_KEPT,
+    SESSION_KEY_HOLD,
 )
 from src.logging.logger import *
 
+# RSA OAEP padding shared by every RSA operation
+OAEP_PADDING = padding.OAEP(
+    mgf=padding.MGF1(algorithm=hashes.SHA256()),
+    algorithm=hashes.SHA256(),
+    label=None,
+)
+
+# RSA envelope file format:
+#   magic | version | wrapped key length | GCM nonce   (ENVELOPE_HEADER_FORMAT)
+#   RSA-OAEP wrapped AES-256 data key
+#   AES-GCM ciphertext
+#   16-byte GCM tag
+ENVELOPE_MAGIC = b"SD3E"
+ENVELOPE_VERSION = 1
+ENVELOPE_HEADER_FORMAT = ">4sBH12s"
+ENVELOPE_HEADER_SIZE = struct.calcsize(ENVELOPE_HEADER_FORMAT)
+ENVELOPE_TAG_SIZE = 16
 
-class CryptoManager:
+# Segmented AES-CTR file format:
+#   magic | version | key ID | channels | sample width | sample rate |
+#   segment size | nonce | audio length               (SEGMENT_HEADER_FORMAT)
+#   AES-CTR ciphertext, the same length as the audio
+# The counter block of each 16 bytes is the nonce followed by its 64-bit
+# block index, so segment i starts at block i * segment size / 16 and can be
+# processed on its own.
+SEGMENT_MAGIC = b"SD3S"
+SEGMENT_VERSION = 1
+SEGMENT_HEADER_FORMAT = ">4sBBBBII8sQ"
+SEGMENT_HEADER_SIZE = struct.calcsize(SEGMENT_HEADER_FORMAT)
+
+# Chunk sizes of the legacy per-chunk RSA-4096 format
+RSA_PLAIN_CHUNK = 446  # Maximum size for RSA-4096 with OAEP padding
+RSA_CIPHER_CHUNK = 512  # RSA-4096 encrypted chunk size
+
+# Counter block of a session key frame: 8 zero bytes, the 32-bit frame
+# sequence number and a 32-bit block counter
+SESSION_NONCE_FORMAT = ">8xII"
+
+
+def _session_nonce(seq):
+    """Build the AES-CTR counter block of a frame under a session key."""
+    return struct.pack(SESSION_NONCE_FORMAT, seq & SEQUENCE_MASK, 0)
+
+
+def _ctr_nonce(iv, key_id, seq):
+    """Build the AES-CTR counter block of a frame (see ``frame_nonce``)."""
+    return iv[:7] + struct.pack(">BII", key_id, seq & SEQUENCE_MASK, 0)
+
+
+def _nonce_writer(nonce, offset):
     """
-    Handles encryption and decryption using three different methods:
-    1. AES-CFB for stream encryption
-    2. RSA for public key encryption
-    3. Hybrid RSA-AES for combining the benefits of both
+    Build a session's ``nonce_for`` function from the nonce of frame 0.
+
+    The 32-bit sequence number at ``offset`` is written into one reused
+    buffer, so re-keying a session for a frame allocates nothing. The
+    buffer is only valid until the next call.
+    """
+    block = bytearray(nonce)
+
+    def nonce_for(seq):
+        struct.pack_into(">I", block, offset, seq & SEQUENCE_MASK)
+        return block
+
+    return nonce_for
+
+
+def _stream_blocks(context, read, write, block_size, length=None):
+    """
+    Pass a stream through a cipher context block by block.
+
+    The blocks go through one context into a reused output buffer, so
+    memory use does not grow with the stream length.
+
+    Parameters
+    ----------
+    context : CipherSession or CipherContext
+        Anything with ``update_into(data, buf)``.
+    read : callable
+        Called with a size, returns the next block of data or an empty
+        value at the end of the stream.
+    write : callable
+        Called with each processed block. The data is only valid until
+        the next call.
+    block_size : int
+        Number of bytes to read at a time.
+    length : int, optional
+        Number of bytes to read. Defaults to the end of the stream.
+
+    Returns
+    -------
+    int
+        Number of bytes processed.
+    """
+    out_buffer = bytearray(block_size + 15)
+    out_view = memoryview(out_buffer)
+    total = 0
+    while length is None or total < length:
+        size = (
+            block_size if length is None else min(block_size, length - total)
+        )
+        block = read(size)
+        if not block:
+            break
+        written = context.update_into(block, out_buffer)
+        write(out_view[:written])
+        total += len(block)
+    return total
+
+
+# RSA key loaded once by each process pool worker
+_worker_key = None
+
+
+def _init_rsa_worker(key_file, private):
+    """
+    Load the RSA key used by a process pool worker.
+
+    Parameters
+    ----------
+    key_file : str
+        Path to the PEM key file.
+    private : bool
+        True to load a private key, False for a public key.
+    """
+    global _worker_key
+    with open(key_file, "rb") as f:
+        if private:
+            # The key was already validated when CryptoManager loaded it
+            _worker_key = serialization.load_pem_private_key(
+                f.read(), password=None, unsafe_skip_rsa_key_validation=True
+            )
+        else:
+            _worker_key = serialization.load_pem_public_key(f.read())
+
+
+def _rsa_encrypt_range(data):
+    """
+    Encrypt a contiguous range of RSA chunks in a pool worker.
+    """
+    return b"".join(
+        _worker_key.encrypt(data[i : i + RSA_PLAIN_CHUNK], OAEP_PADDING)
+        for i in range(0, len(data), RSA_PLAIN_CHUNK)
+    )
+
+
+def _rsa_decrypt_range(data):
+    """
+    Decrypt a contiguous range of RSA chunks in a pool worker.
+    """
+    return b"".join(
+        _worker_key.decrypt(data[i : i + RSA_CIPHER_CHUNK], OAEP_PADDING)
+        for i in range(0, len(data), RSA_CIPHER_CHUNK)
+    )
+
+
+class CipherSession:
+    """
+    Persistent cipher context for one direction of an audio stream.
+
+    The context is created once when the stream starts and every frame is
+    passed through ``update``, so the per-frame cost is a single OpenSSL
+    update call instead of building and finalizing a new context.
+
+    For counter mode sessions the context is re-keyed with the frame nonce
+    before every frame, so each frame decrypts on its own and frames may be
+    skipped or arrive out of order. Other modes chain across frames, which
+    only suits lossless streams such as files.
 
     Attributes
     ----------
-    key : bytes
-        The AES key for encryption and decryption.
-    iv : bytes
-        The initialization vector (IV) for encryption and decryption.
-    cipher : Cipher
-        The AES cipher for encryption and decryption.
+    context : CipherContext or None
+        The open encryptor/decryptor, or None for a passthrough session.
+    nonce_for : callable or None
+        Maps a frame sequence number to its nonce (counter mode only).
+    frames : int
+        Number of frames processed by the session.
+    independent_frames : bool
+        True if every frame can be processed on its own, in any order.
+    overhead : int
+        Number of bytes the session adds to each frame.
+    key_id : int
+        ID of the keyring entry the session is keyed with.
     """
 
     def __init__(
         self,
-        key_file="/keys/aes.txt",
-        public_key_file="/keys/public_key.pem",
-        private_key_file="/keys/private_key.pem",
-        hybrid_file="/keys/hybrid.txt",
-        hybrid_public_file="/keys/hybrid_public.pem",
-        hybrid_private_file="/keys/hybrid_private.pem",
+        cipher=None,
+        encrypt=True,
+        nonce_for=None,
+        frame_fn=None,
+        frame_into_fn=None,
+    ):
+        """
+        Open the session.
+
+        Parameters
+        ----------
+        cipher : Cipher, optional
+            The cipher to stream through. If None, data is passed through unchanged.
+        encrypt : bool, optional
+            True for an encryptor, False for a decryptor.
+        nonce_for : callable, optional
+            Function giving the nonce of a frame sequence number. Only used
+            for counter mode ciphers.
+        frame_fn : callable, optional
+            Per-frame function ``(data, seq, aad)`` used instead of a
+            persistent context, for modes such as GCM that can not re-key.
+        frame_into_fn : callable, optional
+            Per-frame function ``(data, seq, buf, aad)`` writing into ``buf``,
+            the counterpart of ``frame_fn`` used by ``update_into``.
+        """
+        self.context = None
+        self.encrypt = encrypt
+        if cipher is not None:
+            self.context = self._open_context(cipher)
+        self.nonce_for = nonce_for
+        self.frame_fn = frame_fn
+        self.frame_into_fn = frame_into_fn
+        self.frames = 0
+        self.closed = False
+        self.independent_frames = False
+        self.overhead = 0
+        self.key_id = 0
+
+    def _open_context(self, cipher):
+        """Create the encryptor or decryptor of a cipher."""
+        return cipher.encryptor() if self.encrypt else cipher.decryptor()
+
+    def update(self, data, seq=None, aad=b""):
+        """
+        Encrypt or decrypt the next frame of the stream.
+
+        Parameters
+        ----------
+        data : bytes
+            The frame to process.
+        seq : int, optional
+            Sequence number of the frame. Required for counter mode sessions.
+        aad : bytes, optional
+            Data authenticated alongside the frame (authenticated modes only).
+
+        Returns
+        -------
+        bytes or None
+            The processed frame, or None if an authenticated frame failed
+            verification.
+        """
+        self.frames += 1
+        if self.frame_fn is not None:
+            return self.frame_fn(data, seq, aad)
+        if self.context is None:
+            return data
+        if self.nonce_for is not None:
+            self.context.reset_nonce(self.nonce_for(seq))
+        return self.context.update(data)
+
+    def update_into(self, data, buf, seq=None, aad=b""):
+        """
+        Encrypt or decrypt the next frame directly into a caller buffer.
+
+        ``buf`` must have room for ``len(data) + 15`` bytes, which is what
+        OpenSSL requires for an in-place update.
+
+        Parameters
+        ----------
+        data : bytes-like
+            The frame to process.
+        buf : bytearray or memoryview
+            Writable buffer that receives the output at offset 0.
+        seq : int, optional
+            Sequence number of the frame. Required for counter mode sessions.
+        aad : bytes-like, optional
+            Data authenticated alongside the frame (authenticated modes only).
+
+        Returns
+        -------
+        int or None
+            Number of bytes written, or None if an authenticated frame
+            failed verification.
+        """
+        self.frames += 1
+        if self.frame_into_fn is not None:
+            return self.frame_into_fn(data, seq, buf, aad)
+        if self.context is None:
+            buf[: len(data)] = data
+            return len(data)
+        if self.nonce_for is not None:
+            self.context.reset_nonce(self.nonce_for(seq))
+        return self.context.update_into(data, buf)
+
+    def close(self):
+        """
+        Finalize the context. The session can not be used afterwards.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        if self.context is not None:
+            self.context.finalize()
+            self.context = None
+
+
+class KeyedSessions:
+    """
+    The sessions of one direction of a stream, one per peer key.
+
+    Received frames carry the key ID of their sender. The session for an
+    ID is opened the first time it is seen and then found with a single
+    dictionary lookup, so frames from different peers can be interleaved
+    at no extra cost. When the keys are reloaded the sessions are opened
+    again at the next frame.
+
+    Attributes
+    ----------
+    sessions : dict
+        Open sessions by key ID. Unknown IDs map to None.
+    independent_frames : bool
+        True if every frame can be processed on its own, in any order.
+    """
+
+    def __init__(self, crypto_manager, encrypt=False):
+        """
+        Start with no sessions open.
+
+        Parameters
+        ----------
+        crypto_manager : CryptoManager
+            The manager holding the keyring.
+        encrypt : bool, optional
+            True for encrypt sessions, False for decrypt sessions.
+        """
+        self.crypto_manager = crypto_manager
+        self.encrypt = encrypt
+        # Resolve the mode once so every peer uses the same backend
+        self.backend = crypto_manager.backend
+        self.independent_frames = self.backend.independent_frames
+        self.sessions = {}
+        self.generation = KeyStore.generation
+
+    def get(self, key_id):
+        """
+        Return the session of a key ID, opening it on first use.
+
+        Parameters
+        ----------
+        key_id : int
+            The key ID from the frame header.
+
+        Returns
+        -------
+        CipherSession or None
+            The session, or None if the key ID is not in the keyring.
+        """
+        if self.generation != KeyStore.generation:
+            # New keys were loaded, reopen the sessions with them
+            self.close()
+            self.generation = KeyStore.generation
+        try:
+            return self.sessions[key_id]
+        except KeyError:
+            session = self.crypto_manager.open_session(
+                self.encrypt, key_id, self.backend
+            )
+            self.sessions[key_id] = session
+            return session
+
+    def close(self):
+        """
+        Close every open session.
+        """
+        for session in self.sessions.values():
+            if session is not None:
+                session.close()
+        self.sessions.clear()
+
+
+class KeystreamRing:
+    """
+    Transmit session that generates counter mode keystream ahead of time.
+
+    A producer thread fills a ring of keystream blocks for the next frame
+    sequence numbers, so encrypting a frame only XORs it with a ready
+    block. It is used in place of a CipherSession on the transmit side.
+    Blocks are made for every ``stride``-th sequence number, the first
+    sequence numbers of the bursts the sender sends. Sequence numbers the
+    sender skips (paused speech) move the ring forward past their blocks.
+    A frame that arrives before its block is ready is encrypted inline,
+    and a frame behind the ring or off the stride also restarts the ring
+    one stride after it.
+
+    Attributes
+    ----------
+    depth : int
+        Number of blocks of keystream kept ready.
+    stride : int
+        Sequence numbers from one block to the next.
+    hits : int
+        Frames encrypted with a precomputed block.
+    misses : int
+        Frames encrypted inline.
+    frames : int
+        Number of frames processed by the session.
+    independent_frames : bool
+        Always True, counter mode frames are keyed by sequence number.
+    overhead : int
+        Number of bytes the session adds to each frame (none).
+    key_id : int
+        ID of the keyring entry the session is keyed with.
+    """
+
+    def __init__(
+        self,
+        producer_session,
+        inline_session,
+        start_seq,
+        depth=KEYSTREAM_DEPTH,
+        block_size=MAX_FRAME_PAYLOAD,
+        stride=1,
+    ):
+        """
+        Start the producer thread.
+
+        Parameters
+        ----------
+        producer_session : CipherSession
+            Counter mode encrypt session used by the producer thread.
+        inline_session : CipherSession
+            Counter mode encrypt session used for frames without a block.
+        start_seq : int
+            Sequence number of the first frame.
+        depth : int, optional
+            Number of blocks of keystream kept ready.
+        block_size : int, optional
+            Keystream bytes per block, the largest frame the ring covers.
+        stride : int, optional
+            Sequence numbers from one block to the next, the frames per
+            burst.
+        """
+        self.producer_session = producer_session
+        self.inline_session = inline_session
+        self.depth = depth
+        self.block_size = block_size
+        self.stride = stride
+        self.zeros = bytes(block_size)
+        # One row per frame, with the slack OpenSSL needs for update_into
+        self.ring = np.zeros((depth, block_size + 15), dtype=np.uint8)
+        self.out_buf = None
+        self.out_array = None
+        self.hits = 0
+        self.misses = 0
+        self.frames = 0
+        self.closed = False
+        self.independent_frames = True
+        self.overhead = 0
+        self.key_id = inline_session.key_id
+
+        self.condition = threading.Condition()
+        self.generation = 0
+        self._restart(start_seq)
+        self.producer = threading.Thread(
+            target=self._produce, name="KEYSTREAM", daemon=True
+        )
+        self.producer.start()
+
+    def _restart(self, start_seq):
+        """Point the ring at a new first sequence number (lock held)."""
+        self.start_seq = start_seq
+        self.produced = 0
+        self.consumed = 0
+        self.generation += 1
+        self.ring_seq = [None] * self.depth
+
+    def _produce(self):
+        """Producer thread: keep ``depth`` frames of keystream ready."""
+        while True:
+            with self.condition:
+                while (
+                    not self.closed
+                    and self.produced - self.consumed >= self.depth
+                ):
+                    self.condition.wait()
+                if self.closed:
+                    return
+                # Skip the frames already encrypted inline
+                self.produced = max(self.produced, self.consumed)
+                index = self.produced
+                generation = self.generation
+                seq = (self.start_seq + index * self.stride) & SEQUENCE_MASK
+                slot = index % self.depth
+
+            # Keystream is the encryption of zeros, made outside the lock
+            self.producer_session.update_into(self.zeros, self.ring[slot], seq)
+
+            with self.condition:
+                if generation == self.generation and index >= self.consumed:
+                    self.ring_seq[slot] = seq
+                    self.produced = index + 1
+
+    def update_into(self, data, buf, seq=None, aad=b""):
+        """
+        Encrypt the next frame directly into a caller buffer.
+
+        Parameters
+        ----------
+        data : bytes-like
+            The frame to encrypt.
+        buf : bytearray or memoryview
+            Writable buffer that receives the output at offset 0.
+        seq : int
+            Sequence number of the frame.
+        aad : bytes, optional
+            Ignored, counter mode does not authenticate.
+
+        Returns
+        -------
+        int
+            Number of bytes written to ``buf``.
+        """
+        self.frames += 1
+        length = len(data)
+        # Only this thread moves ``consumed`` and restarts the ring, and the
+        # producer publishes a block after writing it, so the check needs no
+        # lock. A stale read only turns a hit into a miss.
+        index, phase = divmod(
+            (seq - self.start_seq) & SEQUENCE_MASK, self.stride
+        )
+        slot = index % self.depth
+        # Half the sequence space ahead counts as forward, the rest as behind
+        ahead = index - self.consumed
+        forward = not phase and 0 <= ahead * self.stride <= SEQUENCE_MASK >> 1
+        ready = (
+            forward
+            and index < self.produced
+            and self.ring_seq[slot] == seq
+            and length <= self.block_size
+        )
+
+        if not ready:
+            self.misses += 1
+            written = self.inline_session.update_into(data, buf, seq)
+            with self.condition:
+                if forward:
+                    self.consumed = index + 1
+                else:
+                    # Behind the ring or off the stride, start over one
+                    # stride after this frame
+                    self._restart((seq + self.stride) & SEQUENCE_MASK)
+                self.condition.notify()
+            return written
+
+        # The producer only writes slots less than ``depth`` blocks past
+        # ``consumed``, so not this one until it is consumed
+        self.hits += 1
+        if buf is not self.out_buf:
+            # The transmit buffer is reused, so its array view is too
+            self.out_buf = buf
+            self.out_array = np.frombuffer(buf, dtype=np.uint8)
+        np.bitwise_xor(
+            np.frombuffer(data, dtype=np.uint8),
+            self.ring[slot, :length],
+            out=self.out_array[:length],
+        )
+        with self.condition:
+            # The blocks of skipped frames are dropped
+            self.consumed = index + 1
+            self.condition.notify()
+        return length
+
+    def update(self, data, seq=None, aad=b""):
+        """
+        Encrypt the next frame.
+
+        Parameters
+        ----------
+        data : bytes
+            The frame to encrypt.
+        seq : int
+            Sequence number of the frame.
+        aad : bytes, optional
+            Ignored, counter mode does not authenticate.
+
+        Returns
+        -------
+        bytes
+            The encrypted frame.
+        """
+        buf = bytearray(len(data) + 15)
+        length = self.update_into(data, buf, seq)
+        return bytes(buf[:length])
+
+    def close(self):
+        """
+        Stop the producer thread and close both sessions.
+        """
+        if self.closed:
+            return
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.producer.join()
+        self.producer_session.close()
+        self.inline_session.close()
+
+
+class SessionKeySender:
+    """
+    Transmit session of hybrid mode, keyed with RSA-wrapped session keys.
+
+    Every session key is a fresh AES-256 key, wrapped with the RSA public
+    key and sent once in a session key frame before it is used. Frames are
+    encrypted with AES-CTR keyed per frame by their sequence number, and
+    carry the one byte epoch of their session key in the key ID field of
+    the header.
+
+    New keys are made and wrapped on a worker thread. Once a new key is
+    announced, the old one is kept for ``lead`` more frames so the
+    receivers can unwrap it off their audio path, then the sessions are
+    swapped between two frames.
+
+    Attributes
+    ----------
+    session : CipherSession or None
+        The live session, None until the first frame.
+    rekeys : int
+        Number of session keys made live after the first one.
+    frames : int
+        Number of frames processed by the session.
+    independent_frames : bool
+        Always True, frames are keyed by sequence number.
+    overhead : int
+        Number of bytes the session adds to each frame (none).
+    """
+
+    def __init__(
+        self,
+        crypto_manager,
+        interval=REKEY_INTERVAL,
+        max_frames=REKEY_FRAMES,
+        lead=REKEY_LEAD_FRAMES,
+    ):
+        """
+        Start making the first session key.
+
+        Parameters
+        ----------
+        crypto_manager : CryptoManager
+            The manager holding the RSA keys.
+        interval : float, optional
+            Seconds a session key is used for, 0 for no limit.
+        max_frames : int, optional
+            Frames a session key is used for, 0 for no limit.
+        lead : int, optional
+            Frames sent with the old key after a new one is announced.
+        """
+        self.crypto_manager = crypto_manager
+        self.interval = interval
+        self.max_frames = max_frames
+        self.lead = lead
+        self.worker = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="REKEY"
+        )
+        self.session = None
+        self.announced = None
+        self.switch_at = None
+        self.key_frames = 0
+        self.started = time.monotonic()
+        self.rekeys = 0
+        self.frames = 0
+        self.closed = False
+        self.independent_frames = True
+        self.overhead = 0
+        # Epochs carry on from the previous transmission, so receivers
+        # never see a new key for an epoch they still hold
+        self.next = self.worker.submit(
+            self._prepare, crypto_manager.next_epoch
+        )
+
+    def _prepare(self, epoch):
+        """Worker: make, wrap and open a new session key."""
+        key = os.urandom(32)
+        wrapped = self.crypto_manager.wrap_session_key(key, epoch)
+        session = self.crypto_manager.open_session_key(key, epoch, True)
+        return session, wrapped
+
+    @property
+    def key_id(self):
+        """Epoch of the live session key, sent in the frame header."""
+        return self.session.key_id
+
+    def _due(self):
+        """Check if the live session key has reached its limit."""
+        if self.max_frames and self.key_frames >= self.max_frames:
+            return True
+        return bool(
+            self.interval and time.monotonic() - self.started >= self.interval
+        )
+
+    def _go_live(self, session):
+        """Make a session the live one."""
+        if self.session is not None:
+            self.session.close()
+            self.rekeys += 1
+        self.session = session
+        self.key_frames = 0
+        self.started = time.monotonic()
+        self.crypto_manager.next_epoch = (session.key_id + 1) & MAX_KEY_ID
+
+    def next_frame(self):
+        """
+        Advance the rekey schedule to the next frame.
+
+        Must be called once before every frame, on the transmit thread.
+        Only the first frame waits for a key, later keys are ready before
+        they are announced.
+
+        Returns
+        -------
+        tuple or None
+            ``(epoch, wrapped key)`` of a session key frame to send before
+            this frame, or None.
+        """
+        if self.session is None:
+            session, wrapped = self.next.result()
+            self.next = None
+            self._go_live(session)
+            return session.key_id, wrapped
+
+        self.key_frames += 1
+        if self.announced is not None:
+            if self.key_frames >= self.switch_at:
+                self._go_live(self.announced)
+                self.announced = None
+            return None
+        if self.next is None:
+            if self._due():
+                epoch = (self.session.key_id + 1) & MAX_KEY_ID
+                self.next = self.worker.submit(self._prepare, epoch)
+            return None
+        if not self.next.done():
+            return None
+
+        session, wrapped = self.next.result()
+        self.next = None
+        self.announced = session
+        self.switch_at = self.key_frames + self.lead
+        if self.lead == 0:
+            self._go_live(session)
+            self.announced = None
+        return session.key_id, wrapped
+
+    def update_into(self, data, buf, seq=None, aad=b""):
+        """
+        Encrypt a frame with the live session key into a buffer.
+
+        See ``CipherSession.update_into``.
+        """
+        self.frames += 1
+        return self.session.update_into(data, buf, seq, aad)
+
+    def update(self, data, seq=None, aad=b""):
+        """
+        Encrypt a frame with the live session key.
+
+        See ``CipherSession.update``.
+        """
+        self.frames += 1
+        return self.session.update(data, seq, aad)
+
+    def close(self):
+        """
+        Stop the worker and close the sessions.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.worker.shutdown(wait=True, cancel_futures=True)
+        for session in (self.session, self.announced):
+            if session is not None:
+                session.close()
+
+
+class SessionKeyring:
+    """
+    Receive sessions of hybrid mode, one per announced session key.
+
+    Session key frames are unwrapped with the RSA private key on a worker
+    thread as soon as they arrive. Audio frames find their session by the
+    epoch in their header and only wait for the unwrap if they arrive
+    before it is done, which is normally just the first frame of a
+    stream. Used in place of KeyedSessions.
+
+    An epoch keeps its key while frames use it. A repeated session key
+    frame is ignored, and a different key for the epoch is rejected, so a
+    replayed or forged key frame can not replace the live key. Only once
+    the epoch has been idle for ``hold`` seconds (the transmitter
+    restarted) can it get a new key.
+
+    Attributes
+    ----------
+    sessions : dict
+        Future of the session of each epoch, oldest first.
+    wrapped : dict
+        Wrapped key of each epoch.
+    last_used : dict
+        Time each epoch's key was received or last used by a frame.
+    waits : int
+        Frames that had to wait for their key to be unwrapped.
+    rejected : int
+        Key frames rejected because their epoch already has a key.
+    independent_frames : bool
+        Always True, frames are keyed by sequence number.
+    """
+
+    def __init__(
+        self, crypto_manager, kept=SESSION_KEYS_KEPT, hold=SESSION_KEY_HOLD
     ):
         """
-        Initialize the CryptoManager instance.
+        Start with no session keys.
+
+        Parameters
+        ----------
+        crypto_manager : CryptoManager
+            The manager holding the RSA keys.
+        kept : int, optional
+            Number of session keys kept, so frames sent just before a
+            rekey still decrypt.
+        hold : float, optional
+            Seconds an epoch must be idle before it can get a new key.
+        """
+        self.crypto_manager = crypto_manager
+        self.kept = kept
+        self.hold = hold
+        self.worker = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="REKEY RX"
+        )
+        self.sessions = {}
+        self.wrapped = {}
+        self.last_used = {}
+        self.waits = 0
+        self.rejected = 0
+        self.independent_frames = True
+
+    def _unwrap(self, epoch, wrapped):
+        """Worker: unwrap a session key and open its session."""
+        try:
+            key = self.crypto_manager.unwrap_session_key(wrapped, epoch)
+        except ValueError as e:
+            self.crypto_manager.logger.warning(
+                f"Session key {epoch} rejected: {e}"
+            )
+            return None
+        return self.crypto_manager.open_session_key(key, epoch, False)
+
+    def receive(self, epoch, wrapped):
+        """
+        Start unwrapping a received session key.
+
+        Parameters
+        ----------
+        epoch : int
+            Epoch from the session key frame header.
+        wrapped : bytes-like
+            The wrapped key. Copied, so it may be a reused buffer.
+
+        Returns
+        -------
+        bool
+            True if the key was taken, False if the epoch already has it
+            or another key.
+        """
+        wrapped = bytes(wrapped)
+        now = time.monotonic()
+        if epoch in self.sessions:
+            if wrapped == self.wrapped[epoch]:
+                return False
+            if now - self.last_used[epoch] < self.hold:
+                self.rejected += 1
+                self.crypto_manager.logger.warning(
+                    f"Session key {epoch} rejected: the epoch has a key"
+                )
+                return False
+            # Idle, the transmitter restarted
+            self._drop(epoch)
+        self.sessions[epoch] = self.worker.submit(self._unwrap, epoch, wrapped)
+        self.wrapped[epoch] = wrapped
+        self.last_used[epoch] = now
+        while len(self.sessions) > self.kept:
+            self._drop(next(iter(self.sessions)))
+        return True
+
+    def _drop(self, epoch):
+        """Forget an epoch's key."""
+        # Dropped sessions are not closed, a frame may still be using one
+        del self.sessions[epoch]
+        del self.wrapped[epoch]
+        del self.last_used[epoch]
+
+    def get(self, key_id):
+        """
+        Return the session of an epoch.
+
+        Parameters
+        ----------
+        key_id : int
+            The epoch from the frame header.
+
+        Returns
+        -------
+        CipherSession or None
+            The session, or None if its key was never received or could
+            not be unwrapped.
+        """
+        future = self.sessions.get(key_id)
+        if future is None:
+            return None
+        if not future.done():
+            self.waits += 1
+        self.last_used[key_id] = time.monotonic()
+        return future.result()
+
+    def close(self):
+        """
+        Stop the worker and close every session.
+        """
+        self.worker.shutdown(wait=True, cancel_futures=True)
+        for future in self.sessions.values():
+            if not future.cancelled() and future.result() is not None:
+                future.result().close()
+        self.sessions.clear()
+        self.wrapped.clear()
+        self.last_used.clear()
+
+
+class CipherBackend:
+    """
+    A frame cipher that the CryptoManager can run audio through.
+
+    Backends are kept in ``CIPHER_BACKENDS`` and selected by a boolean mode
+    attribute of the CryptoManager, e.g. ``mode_ctr``. The active backend is
+    resolved once per stream when a session is opened, so no mode checks
+    run per frame.
+
+    Attributes
+    ----------
+    name : str
+        Name the backend is registered under.
+    flag : str
+        Name of the CryptoManager attribute that enables the backend.
+    open : callable
+        Function ``(crypto_manager, encrypt)`` returning a CipherSession.
+    independent_frames : bool
+        True if frames are keyed by their sequence number and can be
+        processed on their own.
+    overhead : callable
+        Function ``(crypto_manager)`` giving the bytes added per frame.
+    keystream : bool
+        True if a frame is XORed with keystream that depends only on the
+        key and sequence number, so it can be generated ahead of time.
+    session_keys : bool
+        True if radio streams are keyed with RSA-wrapped session keys
+        (see SessionKeySender) instead of the stored keys.
+    """
+
+    def __init__(
+        self,
+        name,
+        flag,
+        open,
+        independent_frames=False,
+        overhead=None,
+        keystream=False,
+        session_keys=False,
+    ):
+        """
+        Describe a backend.
+
+        Parameters
+        ----------
+        name : str
+            Name to register the backend under.
+        flag : str
+            Name of the CryptoManager attribute that enables the backend.
+        open : callable
+            Function ``(crypto_manager, encrypt)`` returning a CipherSession.
+        independent_frames : bool, optional
+            True if frames can be processed on their own.
+        overhead : callable, optional
+            Function ``(crypto_manager)`` giving the bytes added per frame.
+            Defaults to no overhead.
+        keystream : bool, optional
+            True if the keystream can be generated ahead of time.
+        session_keys : bool, optional
+            True if radio streams use RSA-wrapped session keys.
+        """
+        self.name = name
+        self.flag = flag
+        self.open = open
+        self.independent_frames = independent_frames
+        self.overhead = overhead if overhead is not None else lambda cm: 0
+        self.keystream = keystream
+        self.session_keys = session_keys
+
+
+# Registered backends, in the order their mode flags are checked
+CIPHER_BACKENDS = {}
+
+# Used when no mode flag is set, frames pass through unchanged
+PASSTHROUGH_BACKEND = CipherBackend(
+    "none", None, lambda crypto_manager, encrypt: CipherSession()
+)
+
+
+def register_backend(backend):
+    """
+    Add a cipher backend to the registry.
+
+    A backend registered under an existing name replaces it.
+
+    Parameters
+    ----------
+    backend : CipherBackend
+        The backend to register.
+
+    Returns
+    -------
+    CipherBackend
+        The registered backend.
+    """
+    CIPHER_BACKENDS[backend.name] = backend
+    return backend
+
+
+class KeyStore:
+    """
+    Process-wide cache of loaded key material.
+
+    Every CryptoManager reads its keys through this store, so each key file
+    is parsed at most once per process no matter how many managers exist.
+    Entries are loaded on first use and can be dropped with ``clear``.
+
+    Entries belong to a generation. New keys are loaded into the next
+    generation while the current one stays in use, then ``commit`` makes
+    them live with a single assignment, so a stream never sees half of a
+    key change.
+
+    Attributes
+    ----------
+    generation : int
+        The live generation. Streams compare it between frames to notice
+        new keys.
+    """
+
+    _keys = {}
+    _lock = threading.RLock()
+    generation = 0
+
+    @classmethod
+    def get(cls, name, loader, generation=None):
+        """
+        Return a cached entry, loading it on first use.
+
+        Parameters
+        ----------
+        name : tuple
+            Cache key, normally the key type and its file paths.
+        loader : callable
+            Function returning the entry when it is not cached yet.
+        generation : int, optional
+            Generation to read. Defaults to the live one.
+
+        Returns
+        -------
+        object
+            The cached entry.
+        """
+        if generation is None:
+            generation = cls.generation
+        name = (generation, name)
+        entry = cls._keys.get(name)
+        if entry is None:
+            with cls._lock:
+                # Another thread may have loaded it while we waited. The
+                # lock is reentrant because some loaders need other keys.
+                entry = cls._keys.get(name)
+                if entry is None:
+                    entry = loader()
+                    cls._keys[name] = entry
+        return entry
+
+    @classmethod
+    def contains(cls, name, generation=None):
+        """
+        Check if an entry is loaded, without loading it.
+        """
+        if generation is None:
+            generation = cls.generation
+        return (generation, name) in cls._keys
+
+    @classmethod
+    def commit(cls, generation):
+        """
+        Make a staged generation live.
+
+        Entries older than the previous generation are dropped. The
+        previous one is kept for threads that read the generation number
+        just before the change.
+
+        Parameters
+        ----------
+        generation : int
+            The generation to make live.
+        """
+        with cls._lock:
+            cls.generation = generation
+            for name in [n for n in cls._keys if n[0] < generation - 1]:
+                del cls._keys[name]
+
+    @classmethod
+    def clear(cls):
+        """
+        Drop every cached entry so keys are read again on next use.
+        """
+        with cls._lock:
+            cls._keys.clear()
+
+
+class CryptoManager:
+    """
+    Handles encryption and decryption using five different methods:
+    1. AES-CFB for stream encryption
+    2. AES-CTR with a per-frame nonce built from the frame sequence number
+    3. AES-GCM with a truncated tag, authenticating each frame
+    4. RSA for public key encryption, either chunked or as an envelope
+       (RSA-wrapped AES-GCM data key) for files
+    5. Hybrid RSA-AES for combining the benefits of both. Radio streams
+       use fresh AES-CTR session keys, wrapped with RSA, sent once and
+       rotated on a schedule (see SessionKeySender)
+
+    Key material is loaded lazily through the shared ``KeyStore`` the first
+    time a mode needs it, so RSA keys are only parsed when RSA or hybrid
+    mode is used.
+
+    One CryptoManager is shared by the transmit, receive and monitor
+    threads. The keys and ``Cipher`` objects it holds never change once
+    loaded, so they are shared freely. Cipher state lives in the
+    CipherSession each thread opens for its own direction, so TX and RX
+    never wait on each other. A session must only be used by one thread
+    at a time. The stateless ``encrypt``/``decrypt`` calls build a new
+    context every time and are safe from any thread.
+
+    The AES keys are held in a keyring indexed by a one byte key ID that
+    is sent in every frame header. Key ID 0 is ``keys/aes.txt`` and the
+    other entries are ``keys/keyring/<id>.txt``, in the same format. The
+    keys can be replaced while streams run with ``reload_keys``.
+
+    Attributes
+    ----------
+    key_id : int
+        The keyring entry this radio transmits with.
+    key : bytes
+        The AES key for encryption and decryption.
+    iv : bytes
+        The initialization vector (IV) for encryption and decryption.
+    cipher : Cipher
+        The AES cipher for encryption and decryption.
+    tag_size : int
+        Length in bytes of the truncated GCM tag appended to each frame.
+    """
+
+    def __init__(
+        self,
+        key_file="/keys/aes.txt",
+        public_key_file="/keys/public_key.pem",
+        private_key_file="/keys/private_key.pem",
+        hybrid_file="/keys/hybrid.txt",
+        hybrid_public_file="/keys/hybrid_public.pem",
+        hybrid_private_file="/keys/hybrid_private.pem",
+        keyring_dir="/keys/keyring",
+    ):
+        """
+        Initialize the CryptoManager instance.
+
+        Parameters
+        ----------
+        key_file : str, optional
+            Path to the file containing the AES key and IV.
+        keyring_dir : str, optional
+            Folder holding the other keyring entries.
+        """
+        # Set up logging
+        self.logger: logging = Logger(
+            "CryptoManager",
+            console_level=logging.INFO,
+            console_logging=EN_CONSOLE_LOGGING,
+        )
+
+        # Setting up the RSA keys
+        self.key_file = str(get_proj_root()) + key_file
+        self.private_key_file = str(get_proj_root()) + private_key_file
+        self.public_key_file = str(get_proj_root()) + public_key_file
+        self.hybrid_file = str(get_proj_root()) + hybrid_file
+        self.hybrid_public_file = str(get_proj_root()) + hybrid_public_file
+        self.hybrid_private_file = str(get_proj_root()) + hybrid_private_file
+        self.keyring_dir = str(get_proj_root()) + keyring_dir
+
+        # Keyring entry used to transmit, and the managers bound to the
+        # other entries (see with_key).
+        self.key_id = KEY_ID
+        self.key_views = {}
+        # Epoch of the next hybrid session key sent (see SessionKeySender).
+        # Random at start up, so a restarted radio is unlikely to reuse an
+        # epoch a receiver still holds.
+        self.next_epoch = os.urandom(1)[0]
+        # KeyStore generation to read keys from, None for the live one.
+        # Only set on the copy that stages new keys (see reload_keys).
+        self.staged_generation = None
+
+        # Dictates if Encyption is enabled or not
+        self.penc_en = PACKET_ENCRYPTION
+        self.denc_en = DATA_ENCRYPTION
+
+        # Sets the encryption mode
+        self.mode_aes = MODE_AES
+        self.mode_ctr = MODE_CTR
+        self.mode_gcm = MODE_GCM
+        self.mode_chacha = MODE_CHACHA
+        self.tag_size = AEAD_TAG_SIZE
+        self.mode_rsa = MODE_RSA
+        self.mode_hybrid = MODE_HYBRID
+
+        # Keeps a mode change from being seen half done by a stream opening
+        # its session on another thread.
+        self.mode_lock = threading.Lock()
+
+        self.logger.info("CryptoManager initialized")
+
+    def preload(self):
+        """
+        Load the key material needed by the enabled encryption mode.
+
+        Calling this at startup moves the key loading cost out of the first
+        audio frame. Keys of modes that are not enabled stay unloaded.
+        """
+        for key_id in self.keyring:
+            self.with_key(key_id).cipher
+        if self.mode_rsa:
+            self.private_key
+        if self.mode_hybrid:
+            self.hybrid_cipher
+            # Session keys are wrapped with the RSA keys
+            self.private_key
+        self.logger.debug("Key material preloaded.")
+
+    def _stored(self, name, loader):
+        """Read an entry of the KeyStore generation this manager uses."""
+        return KeyStore.get(name, loader, self.staged_generation)
+
+    def reload_keys(self):
+        """
+        Read the key files again and swap the new keys in.
+
+        The new keys are loaded and checked on the calling thread while
+        the current ones stay in use. Every key the live manager has
+        loaded is loaded again, then all of them become live at once.
+        Open streams pick them up at their next frame. If any file is
+        invalid the current keys are kept.
+
+        Returns
+        -------
+        bool
+            True if the new keys are live.
+        """
+        staged = copy.copy(self)
+        staged.staged_generation = KeyStore.generation + 1
+        staged.key_views = {}
+        try:
+            for key_id in staged.keyring:
+                staged.with_key(key_id).cipher
+            if KeyStore.contains(
+                ("rsa", self.public_key_file, self.private_key_file)
+            ):
+                staged.private_key
+            if KeyStore.contains(
+                ("hybrid cipher", self.hybrid_file, self.hybrid_private_file)
+            ):
+                staged.hybrid_cipher
+        except Exception as e:
+            self.logger.error(f"New keys rejected, keeping current keys: {e}")
+            return False
+        except SystemExit:
+            # The loaders exit on a bad file at startup and have logged
+            # why, here the current keys simply stay in use.
+            self.logger.error("New keys rejected, keeping current keys.")
+            return False
+
+        KeyStore.commit(staged.staged_generation)
+        self.logger.info(
+            f"Keys reloaded, {len(self.keyring)} keyring entries are live."
+        )
+        return True
+
+    @property
+    def key_generation(self):
+        """
+        The live KeyStore generation, which changes when keys are reloaded.
+        """
+        return KeyStore.generation
+
+    @property
+    def keyring(self):
+        """The AES keys and IVs by key ID."""
+        return self._stored(
+            ("keyring", self.key_file, self.keyring_dir), self._load_keyring
+        )
+
+    @property
+    def key(self):
+        """The AES key."""
+        return self.keyring[self.key_id][0]
+
+    @property
+    def iv(self):
+        """The AES IV."""
+        return self.keyring[self.key_id][1]
+
+    @property
+    def cipher(self):
+        """The AES-CFB cipher."""
+        return self._stored(
+            ("aes cipher", self.key_file, self.keyring_dir, self.key_id),
+            lambda: Cipher(algorithms.AES(self.key), modes.CFB(self.iv)),
+        )
+
+    def with_key(self, key_id):
+        """
+        Get a CryptoManager that uses another keyring entry.
+
+        The returned manager shares everything with this one except the
+        key ID, and is cached, so switching between peers only costs a
+        dictionary lookup.
+
+        Parameters
+        ----------
+        key_id : int
+            The keyring entry to use.
+
+        Returns
+        -------
+        CryptoManager or None
+            The manager bound to the entry, or None if there is no entry
+            with that ID.
+        """
+        if key_id == self.key_id:
+            return self
+        # Entries can disappear when the keys are reloaded
+        if key_id not in self.keyring:
+            return None
+        view = self.key_views.get(key_id)
+        if view is None:
+            view = copy.copy(self)
+            view.key_id = key_id
+            self.key_views[key_id] = view
+        return view
+
+    @property
+    def public_key(self):
+        """The RSA public key."""
+        return self._rsa_keys[0]
+
+    @property
+    def private_key(self):
+        """The RSA private key."""
+        return self._rsa_keys[1]
+
+    @property
+    def _rsa_keys(self):
+        return self._stored(
+            ("rsa", self.public_key_file, self.private_key_file),
+            self._load_rsa_keys,
+        )
+
+    @property
+    def hybrid_public_key(self):
+        """The hybrid RSA public key."""
+        return self._hybrid_keys[0]
+
+    @property
+    def hybrid_private_key(self):
+        """The hybrid RSA private key."""
+        return self._hybrid_keys[1]
+
+    @property
+    def _hybrid_keys(self):
+        return self._stored(
+            ("hybrid", self.hybrid_public_file, self.hybrid_private_file),
+            self._load_hybrid_keys,
+        )
+
+    @property
+    def hybrid_aes_key(self):
+        """The hybrid AES key, decrypted with the hybrid RSA key."""
+        return self._hybrid_aes[0]
+
+    @property
+    def hybrid_iv(self):
+        """The hybrid AES IV."""
+        return self._hybrid_aes[1]
+
+    @property
+    def _hybrid_aes(self):
+        return self._stored(
+            ("hybrid aes", self.hybrid_file, self.hybrid_private_file),
+            self._load_hybrid_aes_key,
+        )
+
+    @property
+    def hybrid_cipher(self):
+        """The hybrid AES-CFB cipher."""
+        return self._stored(
+            ("hybrid cipher", self.hybrid_file, self.hybrid_private_file),
+            lambda: Cipher(
+                algorithms.AES(self.hybrid_aes_key),
+                modes.CFB(self.hybrid_iv),
+            ),
+        )
+
+    def _load_key_iv(self):
+        """
+        Load the AES key and IV from a file.
+
+        Returns
+        -------
+        tuple
+            A tuple containing the AES key (bytes) and IV (bytes).
+        """
+        try:
+            with open(self.key_file, "r") as f:
+                key = bytes.fromhex(f.readline().strip())
+                iv = bytes.fromhex(f.readline().strip())
+                self.logger.debug("Key and IV loaded from file.")
+                return key, iv
+        except Exception as e:
+            self.logger.error(f"Exception thrown: {e}\nExiting program...")
+            sys.exit()
+
+    def _load_keyring(self):
+        """
+        Load every AES key and IV of the keyring.
+
+        Entry 0 is the main key file, the others are read from the
+        keyring folder. Entries with a bad name or content are skipped.
+
+        Returns
+        -------
+        dict
+            ``(key, iv)`` tuples by key ID.
+        """
+        keyring = {0: self._load_key_iv()}
+        if not os.path.isdir(self.keyring_dir):
+            return keyring
+
+        for name in sorted(os.listdir(self.keyring_dir)):
+            stem, ext = os.path.splitext(name)
+            if ext != ".txt":
+                continue
+            try:
+                entry_id = int(stem)
+                if not 0 < entry_id <= MAX_KEY_ID:
+                    raise ValueError(f"key ID must be 1-{MAX_KEY_ID}")
+                with open(os.path.join(self.keyring_dir, name), "r") as f:
+                    key = bytes.fromhex(f.readline().strip())
+                    iv = bytes.fromhex(f.readline().strip())
+                if len(key) != 32 or len(iv) != 16:
+                    raise ValueError("expected a 32 byte key and 16 byte IV")
+                keyring[entry_id] = (key, iv)
+            except ValueError as e:
+                self.logger.warning(f"Skipping keyring entry {name}: {e}")
+        self.logger.debug(f"Keyring loaded with {len(keyring)} keys.")
+        return keyring
+
+    def _load_rsa_keys(self):
+        """
+        Load the RSA public and private keys from files.
+
+        Returns
+        -------
+        tuple
+            A tuple containing the RSA public key and private key.
+        """
+        try:
+            with open(self.public_key_file, "rb") as f:
+                public_key = serialization.load_pem_public_key(f.read())
+            with open(self.private_key_file, "rb") as f:
+                private_key = serialization.load_pem_private_key(
+                    f.read(), password=None
+                )
+            self.logger.debug("RSA keys loaded from files.")
+            return public_key, private_key
+        except Exception as e:
+            self.logger.error(f"Exception thrown: {e}\nExiting program...")
+            sys.exit()
+
+    def _load_hybrid_keys(self):
+        """
+        Load the hybrid RSA public and private keys from files.
+
+        Returns
+        -------
+        tuple
+            A tuple containing the hybrid RSA public key and private key.
+        """
+        try:
+            with open(self.hybrid_public_file, "rb") as f:
+                public_key = serialization.load_pem_public_key(f.read())
+            with open(self.hybrid_private_file, "rb") as f:
+                private_key = serialization.load_pem_private_key(
+                    f.read(), password=None
+                )
+            self.logger.debug("Hybrid RSA keys loaded from files.")
+            return public_key, private_key
+        except Exception as e:
+            self.logger.error(f"Exception thrown: {e}\nExiting program...")
+            sys.exit()
+
+    def _load_hybrid_aes_key(self):
+        """
+        Load and decrypt the hybrid AES key from file.
+
+        Returns
+        -------
+        tuple
+            A tuple containing the hybrid AES key and IV.
+        """
+        try:
+            with open(self.hybrid_file, "rb") as f:
+                encrypted_data = f.read()
+
+            decrypted_data = self.hybrid_private_key.decrypt(
+                encrypted_data,
+                padding.OAEP(
+                    mgf=padding.MGF1(algorithm=hashes.SHA256()),
+                    algorithm=hashes.SHA256(),
+                    label=None,
+                ),
+            )
+
+            aes_key = decrypted_data[:32]
+            iv = decrypted_data[32:]
+
+            self.logger.debug("Hybrid AES key loaded and decrypted.")
+            return aes_key, iv
+        except Exception as e:
+            self.logger.error(f"Exception thrown: {e}\nExiting program...")
+            sys.exit()
+
+    def encrypt(self, data):
+        """
+        Encrypt the given audio data using AES-CFB.
+
+        Parameters
+        ----------
+        data : bytes
+            The audio data to encrypt.
+
+        Returns
+        -------
+        bytes
+            Encrypted audio data.
+        """
+        encryptor = self.cipher.encryptor()
+        return encryptor.update(data) + encryptor.finalize()
+
+    def decrypt(self, data):
+        """
+        Decrypt the given encrypted audio data using AES-CFB.
+
+        Parameters
+        ----------
+        data : bytes
+            The encrypted audio data to decrypt.
+
+        Returns
+        -------
+        bytes
+            Decrypted audio data.
+        """
+        decryptor = self.cipher.decryptor()
+        return decryptor.update(data) + decryptor.finalize()
+
+    def open_session(self, encrypt=True, key_id=None, backend=None):
+        """
+        Open a persistent cipher session for the active encryption mode.
+
+        In every mode a frame passed with its sequence number is processed
+        on its own, so frames may be lost or reordered.
+
+        Parameters
+        ----------
+        encrypt : bool, optional
+            True for the transmit (encrypt) side, False for the receive side.
+        key_id : int, optional
+            The keyring entry to use. Defaults to ``key_id``.
+        backend : CipherBackend, optional
+            The backend to use. Defaults to the active mode.
+
+        Returns
+        -------
+        CipherSession or None
+            The open session, or None if the key ID is not in the keyring.
+            RSA mode has no stream cipher, so a passthrough session is
+            returned.
+        """
+        if key_id is None:
+            key_id = self.key_id
+        crypto_manager = self.with_key(key_id)
+        if crypto_manager is None:
+            self.logger.warning(f"Unknown key ID {key_id}.")
+            return None
+        if backend is None:
+            backend = self.backend
+        session = backend.open(crypto_manager, encrypt)
+        session.independent_frames = backend.independent_frames
+        session.overhead = backend.overhead(self)
+        session.key_id = key_id
+        self.logger.debug(
+            f"{'Encrypt' if encrypt else 'Decrypt'} session opened "
+            f"with key {key_id}."
+        )
+        return session
+
+    def open_keystream_session(
+        self, start_seq, key_id=None, depth=KEYSTREAM_DEPTH, stride=1
+    ):
+        """
+        Open a transmit session with keystream generated ahead of time.
+
+        Only counter mode backends have keystream that does not depend on
+        the audio. Other modes get a normal encrypt session.
+
+        Parameters
+        ----------
+        start_seq : int
+            Sequence number of the first frame.
+        key_id : int, optional
+            The keyring entry to use. Defaults to ``key_id``.
+        depth : int, optional
+            Number of blocks of keystream kept ready.
+        stride : int, optional
+            Sequence numbers from one packet to the next, the frames per
+            burst.
+
+        Returns
+        -------
+        KeystreamRing, CipherSession or None
+            The open session, or None if the key ID is not in the keyring.
+        """
+        backend = self.backend
+        inline_session = self.open_session(True, key_id, backend)
+        if inline_session is None or not backend.keystream:
+            return inline_session
+        return KeystreamRing(
+            self.open_session(True, key_id, backend),
+            inline_session,
+            start_seq,
+            depth,
+            stride=stride,
+        )
+
+    def open_sessions(self, encrypt=False):
+        """
+        Open a set of sessions, one per peer key, for one stream direction.
+
+        Parameters
+        ----------
+        encrypt : bool, optional
+            True for the transmit side, False for the receive side.
+
+        Returns
+        -------
+        KeyedSessions or SessionKeyring
+            Sessions opened on demand by key ID, or by session key epoch
+            for the receive side of hybrid mode.
+        """
+        if not encrypt and self.backend.session_keys:
+            return SessionKeyring(self)
+        return KeyedSessions(self, encrypt)
+
+    def open_session_sender(self):
+        """
+        Open a transmit session keyed with RSA-wrapped session keys.
+
+        Returns
+        -------
+        SessionKeySender
+            The session. Session key frames must be sent as it returns
+            them from ``next_frame``.
+        """
+        return SessionKeySender(self)
+
+    def wrap_session_key(self, key, epoch):
+        """
+        Wrap a session key with the RSA public key.
+
+        The epoch is wrapped with the key, so a key can not be replayed
+        under another epoch.
+
+        Parameters
+        ----------
+        key : bytes
+            The 32-byte AES session key.
+        epoch : int
+            Epoch the key is sent under, 0-255.
+
+        Returns
+        -------
+        bytes
+            The RSA-OAEP ciphertext.
+        """
+        return self.public_key.encrypt(bytes([epoch]) + key, OAEP_PADDING)
+
+    def unwrap_session_key(self, wrapped, epoch):
+        """
+        Unwrap a session key with the RSA private key.
+
+        Parameters
+        ----------
+        wrapped : bytes
+            The RSA-OAEP ciphertext.
+        epoch : int
+            Epoch the key was received under.
+
+        Returns
+        -------
+        bytes
+            The 32-byte AES session key.
+
+        Raises
+        ------
+        ValueError
+            If the key can not be unwrapped or belongs to another epoch.
+        """
+        plain = self.private_key.decrypt(wrapped, OAEP_PADDING)
+        if len(plain) != 33 or plain[0] != epoch:
+            raise ValueError("wrapped key does not match its epoch")
+        return plain[1:]
+
+    def open_session_key(self, key, epoch, encrypt):
+        """
+        Open an AES-CTR session keyed per frame with a session key.
+
+        Every session key is new, so the counter block is just the frame
+        sequence number and a block counter.
+
+        Parameters
+        ----------
+        key : bytes
+            The 32-byte AES session key.
+        epoch : int
+            Epoch of the key, used as the key ID of the session.
+        encrypt : bool
+            True for an encryptor, False for a decryptor.
+
+        Returns
+        -------
+        CipherSession
+            The open session.
+        """
+        session = CipherSession(
+            Cipher(algorithms.AES(key), modes.CTR(bytes(16))),
+            encrypt=encrypt,
+            nonce_for=_nonce_writer(_session_nonce(0), 8),
+        )
+        session.independent_frames = True
+        session.key_id = epoch
+        return session
+
+    @property
+    def backend(self):
+        """
+        The cipher backend of the active encryption mode.
+
+        Returns
+        -------
+        CipherBackend
+            The first registered backend whose mode flag is set, or a
+            passthrough backend if none is.
+        """
+        with self.mode_lock:
+            for backend in CIPHER_BACKENDS.values():
+                if getattr(self, backend.flag, False):
+                    return backend
+        return PASSTHROUGH_BACKEND
+
+    def set_backend(self, name):
+        """
+        Make a registered backend the active encryption mode.
+
+        Parameters
+        ----------
+        name : str
+            Name of the backend.
+        """
+        if name not in CIPHER_BACKENDS:
+            raise ValueError(f"Unknown cipher backend: {name}")
+        with self.mode_lock:
+            for backend in CIPHER_BACKENDS.values():
+                setattr(self, backend.flag, backend.name == name)
+        self.logger.info(f"Cipher backend set to {name}.")
+
+    def benchmark_backends(self, names=None, frame_size=120, num_frames=2000):
+        """
+        Time each backend encrypting and decrypting audio sized frames.
+
+        Both radios must run the same backend, so it is not switched at
+        runtime. The backend is chosen when a board is set up, by running
+        ``python -m src.utils.benchmark --backends`` on it and setting the
+        reported ``MODE_*`` flag in ``src/utils/constants.py`` on every
+        radio.
+
+        Parameters
+        ----------
+        names : list of str, optional
+            Backends to time. Defaults to every backend with a stream
+            cipher (RSA and hybrid are left out).
+        frame_size : int, optional
+            Size of each frame in bytes.
+        num_frames : int, optional
+            Number of frames to run through each backend.
+
+        Returns
+        -------
+        dict
+            Frames per second (encrypt + decrypt) of each backend.
+        """
+        if names is None:
+            names = [
+                name
+                for name in CIPHER_BACKENDS
+                if name not in ("rsa", "hybrid")
+            ]
+        frame = os.urandom(frame_size)
+        results = {}
+        for name in names:
+            backend = CIPHER_BACKENDS[name]
+            tx_session = backend.open(self, True)
+            rx_session = backend.open(self, False)
+            start_time = time.perf_counter()
+            for seq in range(num_frames):
+                rx_session.update(tx_session.update(frame, seq), seq)
+            duration = time.perf_counter() - start_time
+            tx_session.close()
+            rx_session.close()
+            results[name] = num_frames / duration
+        self.logger.debug(f"Backend benchmark: {results}")
+        return results
+
+    def _open_aes(self, encrypt):
+        """
+        Open the session of the default AES mode.
+
+        CFB can not be re-keyed, so radio frames use AES-CTR keyed per frame
+        like the ctr mode. Files and ``encrypt``/``decrypt`` keep AES-CFB.
+        """
+        return self._open_ctr(encrypt)
+
+    def _open_ctr(self, encrypt):
+        """Open an AES-CTR session keyed per frame."""
+        return CipherSession(
+            self._frame_cipher(0),
+            encrypt=encrypt,
+            nonce_for=_nonce_writer(self.frame_nonce(0), 8),
+        )
+
+    def _open_gcm(self, encrypt):
+        """Open an AES-GCM session sealing each frame on its own."""
+        if encrypt:
+            return CipherSession(
+                frame_fn=self.seal_frame, frame_into_fn=self.seal_frame_into
+            )
+        return CipherSession(
+            frame_fn=self.open_frame, frame_into_fn=self.open_frame_into
+        )
+
+    def _open_chacha(self, encrypt):
+        """Open a ChaCha20 session keyed per frame."""
+        return CipherSession(
+            self._chacha_cipher(0),
+            encrypt=encrypt,
+            nonce_for=_nonce_writer(self.chacha_nonce(0), 12),
+        )
+
+    def _open_hybrid(self, encrypt):
+        """Open an AES-CTR session keyed per frame with the hybrid key."""
+        nonce = _ctr_nonce(self.hybrid_iv, self.key_id, 0)
+        return CipherSession(
+            Cipher(algorithms.AES(self.hybrid_aes_key), modes.CTR(bytes(16))),
+            encrypt=encrypt,
+            nonce_for=_nonce_writer(nonce, 8),
+        )
+
+    def chacha_nonce(self, seq):
+        """
+        Build the ChaCha20 nonce for a frame.
+
+        The 16-byte value is a 32-bit little endian block counter starting
+        at zero, followed by the 12-byte nonce: the first 7 bytes of the
+        stored IV, the key ID and the 32-bit frame sequence number. The key
+        ID keeps radios that share key material apart, as long as each one
+        transmits with its own (see ``KEY_ID``).
+
+        Parameters
+        ----------
+        seq : int
+            The frame sequence number.
+
+        Returns
+        -------
+        bytes
+            The 16-byte counter and nonce.
+        """
+        return (
+            struct.pack("<I", 0)
+            + self.iv[:7]
+            + struct.pack(">BI", self.key_id, seq & SEQUENCE_MASK)
+        )
+
+    def _chacha_cipher(self, seq):
+        """
+        Create the ChaCha20 cipher for a single frame.
+
+        ChaCha20 runs fast in software, so it suits CPUs without AES
+        instructions.
+
+        Parameters
+        ----------
+        seq : int
+            The frame sequence number.
+
+        Returns
+        -------
+        Cipher
+            The cipher keyed with the frame nonce.
+        """
+        return Cipher(
+            algorithms.ChaCha20(self.key, self.chacha_nonce(seq)), mode=None
+        )
+
+    def frame_nonce(self, seq):
+        """
+        Build the AES-CTR counter block for a frame.
+
+        The first 7 bytes of the stored IV are followed by the key ID, the
+        32-bit frame sequence number and a 32-bit block counter starting at
+        zero, so no two frames share keystream until the sequence number
+        wraps. A radio carries its sequence numbers on across restarts
+        (see ``SequenceStore``), but two radios can use the same ones, so
+        each must transmit with its own key ID (see ``KEY_ID``).
+
+        Parameters
+        ----------
+        seq : int
+            The frame sequence number.
+
+        Returns
+        -------
+        bytes
+            The 16-byte initial counter block.
+        """
+        return _ctr_nonce(self.iv, self.key_id, seq)
+
+    def _frame_cipher(self, seq):
+        """
+        Create the AES-CTR cipher for a single frame.
+
+        Parameters
+        ----------
+        seq : int
+            The frame sequence number.
+
+        Returns
+        -------
+        Cipher
+            The cipher keyed with the frame nonce.
+        """
+        return Cipher(
+            algorithms.AES(self.key), modes.CTR(self.frame_nonce(seq))
+        )
+
+    @property
+    def independent_frames(self):
+        """
+        True if the active mode decrypts every frame on its own.
+        """
+        return self.backend.independent_frames
+
+    @property
+    def frame_overhead(self):
+        """
+        Number of bytes the active mode adds to each frame.
+
+        Returns
+        -------
+        int
+            The tag size in GCM mode, otherwise 0.
+        """
+        return self.backend.overhead(self)
+
+    def _gcm_nonce(self, seq):
+        """
+        Build the implicit 12-byte GCM nonce of a frame.
+
+        Only the key ID and sequence number travel in the frame header.
+        Bytes 8 to 14 of the stored IV and the key ID form the fixed part,
+        keeping the GCM counter blocks apart from the CTR mode ones. A
+        repeated nonce would reveal the authentication key. The sequence
+        numbers carry on across restarts (see ``SequenceStore``), and the
+        radio does not transmit without storing their mark, but two radios
+        can use the same ones, so each must transmit with its own key ID
+        (see ``KEY_ID``).
+
+        Parameters
+        ----------
+        seq : int
+            The frame sequence number.
+
+        Returns
+        -------
+        bytes
+            The 12-byte nonce.
+        """
+        return self.iv[8:15] + struct.pack(
+            ">BI", self.key_id, seq & SEQUENCE_MASK
+        )
+
+    def seal_frame(self, data, seq, aad=b""):
+        """
+        Encrypt and authenticate one frame using AES-GCM.
+
+        The 16-byte GCM tag is truncated to ``tag_size`` bytes so the frame
+        does not spill into an extra radio packet.
+
+        Parameters
+        ----------
+        data : bytes
+            The frame to encrypt.
+        seq : int
+            The frame sequence number.
+        aad : bytes, optional
+            Additional data to authenticate, such as the frame header.
+
+        Returns
+        -------
+        bytes
+            Ciphertext followed by the truncated tag.
+        """
+        encryptor = Cipher(
+            algorithms.AES(self.key), modes.GCM(self._gcm_nonce(seq))
+        ).encryptor()
+        if aad:
+            encryptor.authenticate_additional_data(aad)
+        ciphertext = encryptor.update(data) + encryptor.finalize()
+        return ciphertext + encryptor.tag[: self.tag_size]
+
+    def open_frame(self, data, seq, aad=b""):
+        """
+        Verify and decrypt one AES-GCM frame.
+
+        Parameters
+        ----------
+        data : bytes
+            Ciphertext followed by the truncated tag.
+        seq : int
+            The frame sequence number.
+        aad : bytes, optional
+            Additional data that was authenticated with the frame.
+
+        Returns
+        -------
+        bytes or None
+            The decrypted frame, or None if the frame is corrupt.
+        """
+        if len(data) < self.tag_size:
+            self.logger.warning(f"Frame {seq} is shorter than the tag.")
+            return None
+        ciphertext = data[: -self.tag_size]
+        tag = data[-self.tag_size :]
+        try:
+            decryptor = Cipher(
+                algorithms.AES(self.key),
+                modes.GCM(
+                    self._gcm_nonce(seq), tag, min_tag_length=self.tag_size
+                ),
+            ).decryptor()
+            if aad:
+                decryptor.authenticate_additional_data(aad)
+            return decryptor.update(ciphertext) + decryptor.finalize()
+        except InvalidTag:
+            self.logger.warning(f"Frame {seq} failed authentication.")
+            return None
+
+    def seal_frame_into(self, data, seq, buf, aad=b""):
+        """
+        Encrypt and authenticate one frame with AES-GCM into ``buf``.
+
+        Same as ``seal_frame`` but the ciphertext and truncated tag are
+        written straight into the caller's buffer.
+
+        Parameters
+        ----------
+        data : bytes-like
+            The frame to encrypt.
+        seq : int
+            The frame sequence number.
+        buf : bytearray or memoryview
+            Output buffer with room for ``len(data) + 15`` bytes and the tag.
+        aad : bytes-like, optional
+            Additional data to authenticate, such as the frame header.
+
+        Returns
+        -------
+        int
+            Number of bytes written (ciphertext plus tag).
+        """
+        encryptor = Cipher(
+            algorithms.AES(self.key), modes.GCM(self._gcm_nonce(seq))
+        ).encryptor()
+        if aad:
+            encryptor.authenticate_additional_data(aad)
+        written = encryptor.update_into(data, buf)
+        encryptor.finalize()
+        buf[written : written + self.tag_size] = encryptor.tag[: self.tag_size]
+        return written + self.tag_size
+
+    def open_frame_into(self, data, seq, buf, aad=b""):
+        """
+        Verify and decrypt one AES-GCM frame into ``buf``.
+
+        The plaintext is written before the tag is checked, so the contents
+        of ``buf`` must be ignored when None is returned.
+
+        Parameters
+        ----------
+        data : bytes-like
+            Ciphertext followed by the truncated tag.
+        seq : int
+            The frame sequence number.
+        buf : bytearray or memoryview
+            Output buffer with room for ``len(data) + 15`` bytes.
+        aad : bytes-like, optional
+            Additional data that was authenticated with the frame.
+
+        Returns
+        -------
+        int or None
+            Number of plaintext bytes written, or None if the frame is corrupt.
+        """
+        if len(data) < self.tag_size:
+            self.logger.warning(f"Frame {seq} is shorter than the tag.")
+            return None
+        data = memoryview(data)
+        try:
+            decryptor = Cipher(
+                algorithms.AES(self.key),
+                modes.GCM(
+                    self._gcm_nonce(seq),
+                    bytes(data[-self.tag_size :]),
+                    min_tag_length=self.tag_size,
+                ),
+            ).decryptor()
+            if aad:
+                decryptor.authenticate_additional_data(aad)
+            written = decryptor.update_into(data[: -self.tag_size], buf)
+            decryptor.finalize()
+            return written
+        except InvalidTag:
+            self.logger.warning(f"Frame {seq} failed authentication.")
+            return None
+
+    def rsa_encrypt(self, data):
+        """
+        Encrypt data using RSA. Handles data chunking for large files.
+
+        Parameters
+        ----------
+        data : bytes
+            The data to encrypt.
+
+        Returns
+        -------
+        bytes
+            Encrypted data.
+        """
+        try:
+            encrypted_chunks = [
+                self.public_key.encrypt(
+                    data[i : i + RSA_PLAIN_CHUNK], OAEP_PADDING
+                )
+                for i in range(0, len(data), RSA_PLAIN_CHUNK)
+            ]
+            return b"".join(encrypted_chunks)
+        except Exception as e:
+            self.logger.error(f"RSA encryption error: {e}")
+            return None
+
+    def rsa_decrypt(self, encrypted_data):
+        """
+        Decrypt RSA encrypted data. Handles chunked data.
+
+        Parameters
+        ----------
+        encrypted_data : bytes
+            The encrypted data to decrypt.
+
+        Returns
+        -------
+        bytes
+            Decrypted data.
+        """
+        try:
+            decrypted_chunks = [
+                self.private_key.decrypt(
+                    encrypted_data[i : i + RSA_CIPHER_CHUNK], OAEP_PADDING
+                )
+                for i in range(0, len(encrypted_data), RSA_CIPHER_CHUNK)
+            ]
+            return b"".join(decrypted_chunks)
+        except Exception as e:
+            self.logger.error(f"RSA decryption error: {e}")
+            return None
+
+    def _rsa_parallel(self, data, chunk_size, worker_fn, private, workers):
+        """
+        Run a per-chunk RSA operation over a process pool.
+
+        The data is split into contiguous ranges of whole chunks. Every
+        worker loads the key once, and results are yielded in order as soon
+        as each range is done.
 
         Parameters
         ----------
-        key_file : str, optional
-            Path to the file containing the AES key and IV.
+        data : bytes
+            The data to process.
+        chunk_size : int
+            Size of one RSA chunk in ``data``.
+        worker_fn : callable
+            Module level function processing one range.
+        private : bool
+            True if the workers need the private key.
+        workers : int
+            Number of worker processes.
+
+        Yields
+        ------
+        bytes
+            The processed ranges, in order.
         """
-        # Set up logging
-        self.logger: logging = Logger(
-            "CryptoManager",
-            console_level=logging.INFO,
-            console_logging=EN_CONSOLE_LOGGING,
-        )
+        num_chunks = -(-len(data) // chunk_size)
+        # A few ranges per worker keeps the workers busy until the end
+        num_ranges = max(1, min(num_chunks, workers * 4))
+        range_size = -(-num_chunks // num_ranges) * chunk_size
+        ranges = [
+            data[i : i + range_size] for i in range(0, len(data), range_size)
+        ]
+        key_file = self.private_key_file if private else self.public_key_file
 
-        # Setting up the RSA keys
-        self.key_file = str(get_proj_root()) + key_file
-        self.private_key_file = str(get_proj_root()) + private_key_file
-        self.public_key_file = str(get_proj_root()) + public_key_file
-        self.hybrid_file = str(get_proj_root()) + hybrid_file
-        self.hybrid_public_file = str(get_proj_root()) + hybrid_public_file
-        self.hybrid_private_file = str(get_proj_root()) + hybrid_private_file
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_rsa_worker,
+            initargs=(key_file, private),
+        ) as executor:
+            yield from executor.map(worker_fn, ranges)
 
-        # Setting up the AES key and IV
-        self.key, self.iv = self._load_key_iv()
-        self.public_key, self.private_key = self._load_rsa_keys()
-        self.hybrid_public_key, self.hybrid_private_key = (
-            self._load_hybrid_keys()
-        )
-        self.hybrid_aes_key, self.hybrid_iv = self._load_hybrid_aes_key()
+    def rsa_encrypt_stream(self, data, workers=None):
+        """
+        Encrypt data in the per-chunk RSA format on several processes.
 
-        self.cipher = Cipher(algorithms.AES(self.key), modes.CFB(self.iv))
-        self.hybrid_cipher = Cipher(
-            algorithms.AES(self.hybrid_aes_key), modes.CFB(self.hybrid_iv)
-        )
+        Parameters
+        ----------
+        data : bytes
+            The data to encrypt.
+        workers : int, optional
+            Number of worker processes (default is RSA_WORKERS).
 
-        # Dictates if Encyption is enabled or not
-        self.penc_en = PACKET_ENCRYPTION
-        self.denc_en = DATA_ENCRYPTION
+        Yields
+        ------
+        bytes
+            Consecutive pieces of the encrypted data.
+        """
+        yield from self._rsa_parallel(
+            data,
+            RSA_PLAIN_CHUNK,
+            _rsa_encrypt_range,
+            False,
+            workers or RSA_WORKERS,
+        )
 
-        # Sets the encryption mode
-        self.mode_aes = MODE_AES
-        self.mode_rsa = MODE_RSA
-        self.mode_hybrid = MODE_HYBRID
+    def rsa_decrypt_stream(self, encrypted_data, workers=None):
+        """
+        Decrypt per-chunk RSA data on several processes.
 
-        self.logger.info("CryptoManager initialized")
+        Parameters
+        ----------
+        encrypted_data : bytes
+            The encrypted data, a whole number of 512-byte chunks.
+        workers : int, optional
+            Number of worker processes (default is RSA_WORKERS).
 
-    def _load_key_iv(self):
+        Yields
+        ------
+        bytes
+            Consecutive pieces of the decrypted data.
         """
-        Load the AES key and IV from a file.
+        yield from self._rsa_parallel(
+            encrypted_data,
+            RSA_CIPHER_CHUNK,
+            _rsa_decrypt_range,
+            True,
+            workers or RSA_WORKERS,
+        )
 
-        Returns
-        -------
-        tuple
-            A tuple containing the AES key (bytes) and IV (bytes).
+    def rsa_encrypt_parallel(self, data, workers=None):
         """
-        try:
-            with open(self.key_file, "r") as f:
-                key = bytes.fromhex(f.readline().strip())
-                iv = bytes.fromhex(f.readline().strip())
-                self.logger.debug("Key and IV loaded from file.")
-                return key, iv
-        except Exception as e:
-            self.logger.error(f"Exception thrown: {e}\nExiting program...")
-            sys.exit()
+        Encrypt data like ``rsa_encrypt``, spread over several processes.
 
-    def _load_rsa_keys(self):
-        """
-        Load the RSA public and private keys from files.
+        Parameters
+        ----------
+        data : bytes
+            The data to encrypt.
+        workers : int, optional
+            Number of worker processes (default is RSA_WORKERS).
 
         Returns
         -------
-        tuple
-            A tuple containing the RSA public key and private key.
+        bytes
+            Encrypted data.
         """
         try:
-            with open(self.public_key_file, "rb") as f:
-                public_key = serialization.load_pem_public_key(f.read())
-            with open(self.private_key_file, "rb") as f:
-                private_key = serialization.load_pem_private_key(
-                    f.read(), password=None
-                )
-            self.logger.debug("RSA keys loaded from files.")
-            return public_key, private_key
+            return b"".join(self.rsa_encrypt_stream(data, workers))
         except Exception as e:
-            self.logger.error(f"Exception thrown: {e}\nExiting program...")
-            sys.exit()
+            self.logger.error(f"RSA encryption error: {e}")
+            return None
 
-    def _load_hybrid_keys(self):
+    def rsa_decrypt_parallel(self, encrypted_data, workers=None):
         """
-        Load the hybrid RSA public and private keys from files.
+        Decrypt data like ``rsa_decrypt``, spread over several processes.
+
+        Parameters
+        ----------
+        encrypted_data : bytes
+            The encrypted data to decrypt.
+        workers : int, optional
+            Number of worker processes (default is RSA_WORKERS).
 
         Returns
         -------
-        tuple
-            A tuple containing the hybrid RSA public key and private key.
+        bytes
+            Decrypted data.
         """
         try:
-            with open(self.hybrid_public_file, "rb") as f:
-                public_key = serialization.load_pem_public_key(f.read())
-            with open(self.hybrid_private_file, "rb") as f:
-                private_key = serialization.load_pem_private_key(
-                    f.read(), password=None
-                )
-            self.logger.debug("Hybrid RSA keys loaded from files.")
-            return public_key, private_key
+            return b"".join(self.rsa_decrypt_stream(encrypted_data, workers))
         except Exception as e:
-            self.logger.error(f"Exception thrown: {e}\nExiting program...")
-            sys.exit()
+            self.logger.error(f"RSA decryption error: {e}")
+            return None
 
-    def _load_hybrid_aes_key(self):
+    @staticmethod
+    def is_envelope(data):
         """
-        Load and decrypt the hybrid AES key from file.
+        Check if data is in the RSA envelope format.
+
+        Parameters
+        ----------
+        data : bytes
+            The encrypted data.
 
         Returns
         -------
-        tuple
-            A tuple containing the hybrid AES key and IV.
+        bool
+            True if the data starts with the envelope header.
         """
-        try:
-            with open(self.hybrid_file, "rb") as f:
-                encrypted_data = f.read()
-
-            decrypted_data = self.hybrid_private_key.decrypt(
-                encrypted_data,
-                padding.OAEP(
-                    mgf=padding.MGF1(algorithm=hashes.SHA256()),
-                    algorithm=hashes.SHA256(),
-                    label=None,
-                ),
-            )
-
-            aes_key = decrypted_data[:32]
-            iv = decrypted_data[32:]
-
-            self.logger.debug("Hybrid AES key loaded and decrypted.")
-            return aes_key, iv
-        except Exception as e:
-            self.logger.error(f"Exception thrown: {e}\nExiting program...")
-            sys.exit()
+        return data[: len(ENVELOPE_MAGIC)] == ENVELOPE_MAGIC
 
-    def encrypt(self, data):
+    def envelope_encrypt_stream(self, read, write, block_size=FILE_BLOCK_SIZE):
         """
-        Encrypt the given audio data using AES-CFB.
+        Encrypt a stream into the RSA envelope format, block by block.
+
+        A random AES-256 data key is wrapped with one RSA-OAEP operation and
+        the data itself is encrypted with AES-GCM, so the cost no longer
+        grows with one RSA operation per 446 bytes. The header and wrapped
+        key are written first, then each block as it is encrypted, then the
+        tag, so memory use does not grow with the stream length.
 
         Parameters
         ----------
-        data : bytes
-            The audio data to encrypt.
+        read : callable
+            Called with ``block_size``, returns the next block of data or
+            an empty value at the end of the stream.
+        write : callable
+            Called with each piece of the envelope. The data is only valid
+            until the next call.
+        block_size : int, optional
+            Number of bytes to read at a time.
 
         Returns
         -------
-        bytes
-            Encrypted audio data.
+        int
+            Number of bytes encrypted.
         """
-        encryptor = self.cipher.encryptor()
-        return encryptor.update(data) + encryptor.finalize()
+        data_key = os.urandom(32)
+        nonce = os.urandom(12)
+        wrapped_key = self.public_key.encrypt(data_key, OAEP_PADDING)
+        header = struct.pack(
+            ENVELOPE_HEADER_FORMAT,
+            ENVELOPE_MAGIC,
+            ENVELOPE_VERSION,
+            len(wrapped_key),
+            nonce,
+        )
 
-    def decrypt(self, data):
+        encryptor = Cipher(
+            algorithms.AES(data_key), modes.GCM(nonce)
+        ).encryptor()
+        # The header and wrapped key are authenticated with the data
+        encryptor.authenticate_additional_data(header + wrapped_key)
+        write(header + wrapped_key)
+        total = _stream_blocks(encryptor, read, write, block_size)
+        encryptor.finalize()
+        write(encryptor.tag)
+        return total
+
+    def envelope_decrypt_stream(
+        self, read, write, length, block_size=FILE_BLOCK_SIZE
+    ):
         """
-        Decrypt the given encrypted audio data using AES-CFB.
+        Decrypt a stream in the RSA envelope format, block by block.
+
+        The tag is only checked after the last block, so the data already
+        written must be discarded if ``InvalidTag`` is raised.
 
         Parameters
         ----------
-        data : bytes
-            The encrypted audio data to decrypt.
+        read : callable
+            Called with a size, returns up to that many bytes of the
+            envelope.
+        write : callable
+            Called with each decrypted block. The data is only valid until
+            the next call.
+        length : int
+            Total length of the envelope in bytes.
+        block_size : int, optional
+            Number of bytes to read at a time.
 
         Returns
         -------
-        bytes
-            Decrypted audio data.
+        int
+            Number of bytes decrypted.
+
+        Raises
+        ------
+        ValueError
+            If the stream is not a complete envelope.
+        InvalidTag
+            If the data was modified.
         """
-        decryptor = self.cipher.decryptor()
-        return decryptor.update(data) + decryptor.finalize()
+        header = read(ENVELOPE_HEADER_SIZE)
+        if len(header) < ENVELOPE_HEADER_SIZE:
+            raise ValueError("Truncated envelope")
+        magic, version, key_len, nonce = struct.unpack(
+            ENVELOPE_HEADER_FORMAT, header
+        )
+        if magic != ENVELOPE_MAGIC or version != ENVELOPE_VERSION:
+            raise ValueError("Unsupported envelope format")
+        wrapped_key = read(key_len)
+        data_len = length - ENVELOPE_HEADER_SIZE - key_len - ENVELOPE_TAG_SIZE
+        if len(wrapped_key) < key_len or data_len < 0:
+            raise ValueError("Truncated envelope")
 
-    def rsa_encrypt(self, data):
+        data_key = self.private_key.decrypt(wrapped_key, OAEP_PADDING)
+        decryptor = Cipher(
+            algorithms.AES(data_key), modes.GCM(nonce)
+        ).decryptor()
+        decryptor.authenticate_additional_data(header + wrapped_key)
+        total = _stream_blocks(decryptor, read, write, block_size, data_len)
+        tag = read(ENVELOPE_TAG_SIZE)
+        if total < data_len or len(tag) < ENVELOPE_TAG_SIZE:
+            raise ValueError("Truncated envelope")
+        decryptor.finalize_with_tag(tag)
+        return total
+
+    def envelope_encrypt(self, data):
         """
-        Encrypt data using RSA. Handles data chunking for large files.
+        Encrypt data using an RSA envelope (see ``envelope_encrypt_stream``).
 
         Parameters
         ----------
@@ -264,68 +2580,41 @@ class CryptoManager:
         Returns
         -------
         bytes
-            Encrypted data.
+            Header, wrapped key, ciphertext and tag.
         """
         try:
-            chunk_size = 446  # Maximum size for RSA-4096 with OAEP padding
-            chunks = [
-                data[i : i + chunk_size]
-                for i in range(0, len(data), chunk_size)
-            ]
-
-            encrypted_chunks = []
-            for chunk in chunks:
-                encrypted_chunk = self.public_key.encrypt(
-                    chunk,
-                    padding.OAEP(
-                        mgf=padding.MGF1(algorithm=hashes.SHA256()),
-                        algorithm=hashes.SHA256(),
-                        label=None,
-                    ),
-                )
-                encrypted_chunks.append(encrypted_chunk)
-
-            return b"".join(encrypted_chunks)
+            out = io.BytesIO()
+            self.envelope_encrypt_stream(io.BytesIO(data).read, out.write)
+            return out.getvalue()
         except Exception as e:
-            self.logger.error(f"RSA encryption error: {e}")
+            self.logger.error(f"Envelope encryption error: {e}")
             return None
 
-    def rsa_decrypt(self, encrypted_data):
+    def envelope_decrypt(self, encrypted_data):
         """
-        Decrypt RSA encrypted data. Handles chunked data.
+        Decrypt data in the RSA envelope format.
 
         Parameters
         ----------
         encrypted_data : bytes
-            The encrypted data to decrypt.
+            Data produced by ``envelope_encrypt``.
 
         Returns
         -------
         bytes
-            Decrypted data.
+            Decrypted data, or None if the data is invalid or was modified.
         """
         try:
-            chunk_size = 512  # RSA-4096 encrypted chunk size
-            chunks = [
-                encrypted_data[i : i + chunk_size]
-                for i in range(0, len(encrypted_data), chunk_size)
-            ]
-
-            decrypted_chunks = []
-            for chunk in chunks:
-                decrypted_chunk = self.private_key.decrypt(
-                    chunk,
-                    padding.OAEP(
-                        mgf=padding.MGF1(algorithm=hashes.SHA256()),
-                        algorithm=hashes.SHA256(),
-                        label=None,
-                    ),
-                )
-                decrypted_chunks.append(decrypted_chunk)
-
-            return b"".join(decrypted_chunks)
+            out = io.BytesIO()
+            self.envelope_decrypt_stream(
+                io.BytesIO(encrypted_data).read, out.write, len(encrypted_data)
+            )
+            return out.getvalue()
+        except InvalidTag:
+            self.logger.error("Envelope decryption error: data was modified")
+            return None
         except Exception as e:
-            self.logger.error(f"RSA decryption error: {e}")
+            self.logger.error(f"Envelope decryption error: {e}")
             return None
 
     def hybrid_encrypt(self, data):
@@ -370,6 +2659,258 @@ class CryptoManager:
             self.logger.error(f"Hybrid decryption error: {e}")
             return None
 
+    def pack_segment_header(
+        self, nonce, length, audio_params, segment_size=SEGMENT_SIZE
+    ):
+        """
+        Build the header of a segmented AES-CTR file.
+
+        Parameters
+        ----------
+        nonce : bytes
+            The random 8-byte nonce of the file.
+        length : int
+            Number of audio bytes in the file.
+        audio_params : tuple
+            ``(channels, sample_width, sample_rate)`` of the audio.
+        segment_size : int, optional
+            Size of each segment in bytes, a multiple of 16.
+
+        Returns
+        -------
+        bytes
+            The packed header, written with ``key_id``.
+        """
+        channels, sample_width, sample_rate = audio_params
+        return struct.pack(
+            SEGMENT_HEADER_FORMAT,
+            SEGMENT_MAGIC,
+            SEGMENT_VERSION,
+            self.key_id,
+            channels,
+            sample_width,
+            sample_rate,
+            segment_size,
+            nonce,
+            length,
+        )
+
+    @staticmethod
+    def unpack_segment_header(data):
+        """
+        Read the header of a segmented AES-CTR file.
+
+        Parameters
+        ----------
+        data : bytes
+            At least the first ``SEGMENT_HEADER_SIZE`` bytes of the file.
+
+        Returns
+        -------
+        dict
+            ``key_id``, ``channels``, ``sample_width``, ``sample_rate``,
+            ``segment_size``, ``nonce`` and ``length``.
+
+        Raises
+        ------
+        ValueError
+            If the data is not a supported segmented file.
+        """
+        if len(data) < SEGMENT_HEADER_SIZE:
+            raise ValueError("Unsupported segmented file format")
+        fields = struct.unpack_from(SEGMENT_HEADER_FORMAT, data)
+        if fields[0] != SEGMENT_MAGIC or fields[1] != SEGMENT_VERSION:
+            raise ValueError("Unsupported segmented file format")
+        if fields[6] == 0 or fields[6] % 16:
+            raise ValueError(f"Invalid segment size {fields[6]}")
+        names = (
+            "key_id",
+            "channels",
+            "sample_width",
+            "sample_rate",
+            "segment_size",
+            "nonce",
+            "length",
+        )
+        return dict(zip(names, fields[2:]))
+
+    def segment_crypt(self, data, nonce, offset):
+        """
+        Encrypt or decrypt data of a segmented file found at an offset.
+
+        AES-CTR is symmetric, the same call decrypts what it encrypted.
+        The call holds no state, so segments can run on several threads.
+
+        Parameters
+        ----------
+        data : bytes
+            The data to process.
+        nonce : bytes
+            The 8-byte nonce of the file.
+        offset : int
+            Position of the data in the audio.
+
+        Returns
+        -------
+        bytes
+            The processed data, the same length as the input.
+        """
+        counter = nonce + struct.pack(">Q", offset // 16)
+        context = Cipher(
+            algorithms.AES(self.key), modes.CTR(counter)
+        ).encryptor()
+        # Skip the keystream before the offset within its first block
+        context.update(bytes(offset % 16))
+        return context.update(data) + context.finalize()
+
+    def transform_segments(
+        self,
+        read,
+        write,
+        nonce,
+        offset=0,
+        workers=FILE_WORKERS,
+        segment_size=SEGMENT_SIZE,
+    ):
+        """
+        Encrypt or decrypt a segmented stream on a thread pool.
+
+        OpenSSL releases the GIL, so segments are processed on several
+        cores at once. At most two segments per worker are held in memory
+        and they are written back in order.
+
+        Parameters
+        ----------
+        read : callable
+            Called with ``segment_size``, returns the next segment or an
+            empty value at the end of the stream.
+        write : callable
+            Called with each processed segment, in order.
+        nonce : bytes
+            The 8-byte nonce of the file.
+        offset : int, optional
+            Position of the first segment in the audio.
+        workers : int, optional
+            Number of worker threads.
+        segment_size : int, optional
+            Size of each segment in bytes, a multiple of 16.
+
+        Returns
+        -------
+        int
+            Number of bytes processed.
+        """
+        total = 0
+        pending = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while segment := read(segment_size):
+                pending.append(
+                    executor.submit(
+                        self.segment_crypt, segment, nonce, offset + total
+                    )
+                )
+                total += len(segment)
+                if len(pending) >= 2 * workers:
+                    write(pending.pop(0).result())
+            for future in pending:
+                write(future.result())
+        return total
+
+    def transform_stream(
+        self,
+        read,
+        write,
+        encrypt=True,
+        hybrid=False,
+        block_size=FILE_BLOCK_SIZE,
+    ):
+        """
+        Encrypt or decrypt a stream of data block by block using AES-CFB.
+
+        The blocks go through one persistent context into a reused output
+        buffer, so memory use does not grow with the stream length. The
+        output is the same as ``encrypt``/``decrypt`` (or the hybrid
+        versions) called on the whole stream at once.
+
+        Parameters
+        ----------
+        read : callable
+            Called with ``block_size``, returns the next block of data or
+            an empty value at the end of the stream.
+        write : callable
+            Called with each processed block. The data is only valid until
+            the next call.
+        encrypt : bool, optional
+            True to encrypt, False to decrypt.
+        hybrid : bool, optional
+            True to use the hybrid AES key instead of the AES key.
+        block_size : int, optional
+            Number of bytes to read at a time.
+
+        Returns
+        -------
+        int
+            Number of bytes processed.
+        """
+        cipher = self.hybrid_cipher if hybrid else self.cipher
+        session = CipherSession(cipher, encrypt=encrypt)
+        try:
+            return _stream_blocks(session, read, write, block_size)
+        finally:
+            session.close()
+
+
+register_backend(
+    CipherBackend(
+        "aes",
+        "mode_aes",
+        CryptoManager._open_aes,
+        independent_frames=True,
+        keystream=True,
+    )
+)
+register_backend(
+    CipherBackend(
+        "ctr",
+        "mode_ctr",
+        CryptoManager._open_ctr,
+        independent_frames=True,
+        keystream=True,
+    )
+)
+register_backend(
+    CipherBackend(
+        "gcm",
+        "mode_gcm",
+        CryptoManager._open_gcm,
+        independent_frames=True,
+        overhead=lambda crypto_manager: crypto_manager.tag_size,
+    )
+)
+register_backend(
+    CipherBackend(
+        "chacha20",
+        "mode_chacha",
+        CryptoManager._open_chacha,
+        independent_frames=True,
+        keystream=True,
+    )
+)
+register_backend(
+    CipherBackend(
+        "hybrid",
+        "mode_hybrid",
+        CryptoManager._open_hybrid,
+        independent_frames=True,
+        session_keys=True,
+    )
+)
+register_backend(
+    CipherBackend(
+        "rsa", "mode_rsa", lambda crypto_manager, encrypt: CipherSession()
+    )
+)
+
 
 if __name__ == "__main__":
     crypto = CryptoManager()
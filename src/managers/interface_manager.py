@@ -15,6 +15,7 @@ from src.managers.audio_manager import *
 from src.logging.logger import *
 from src.managers.thread_manager import ThreadManager
 from src.managers.rf_manager import *
+from src.utils.key_watcher import KeyWatcher
 
 
 class InterfaceManager(GPIOHandler):
@@ -123,6 +124,15 @@ class InterfaceManager(GPIOHandler):
         except Exception as e:
             self.logger.critical(f"Exception when initialing transmitter: {e}")
         ##################################################
+        # Watch for USB drives with new keys
+        try:
+            self.key_watcher = KeyWatcher(self.audio_man.crypto_manager)
+            self.thread_manager.start_thread(
+                KEY_WATCH_THREAD, self.key_watcher.run
+            )
+        except Exception as e:
+            self.logger.critical(f"Exception when initialing key watcher: {e}")
+        ##################################################
         # State that the manager initialized
         self.logger.info("InterfaceManager initialized")
 
@@ -251,27 +261,21 @@ class InterfaceManager(GPIOHandler):
                         == self.nav.CURRENT_SCREEN.SELECTIONS["AES"]
                     ):
                         if not self.audio_man.crypto_manager.mode_aes:
-                            self.audio_man.crypto_manager.mode_aes = True
-                            self.audio_man.crypto_manager.mode_rsa = False
-                            self.audio_man.crypto_manager.mode_hybrid = False
+                            self.audio_man.crypto_manager.set_backend("aes")
                             self.logger.info("AES Mode Selected")
                     elif (
                         self.position
                         == self.nav.CURRENT_SCREEN.SELECTIONS["RSA"]
                     ):
                         if not self.audio_man.crypto_manager.mode_rsa:
-                            self.audio_man.crypto_manager.mode_aes = False
-                            self.audio_man.crypto_manager.mode_rsa = True
-                            self.audio_man.crypto_manager.mode_hybrid = False
+                            self.audio_man.crypto_manager.set_backend("rsa")
                             self.logger.info("RSA Mode Selected")
                     elif (
                         self.position
                         == self.nav.CURRENT_SCREEN.SELECTIONS["HYBRID"]
                     ):
                         if not self.audio_man.crypto_manager.mode_hybrid:
-                            self.audio_man.crypto_manager.mode_aes = False
-                            self.audio_man.crypto_manager.mode_rsa = False
-                            self.audio_man.crypto_manager.mode_hybrid = True
+                            self.audio_man.crypto_manager.set_backend("hybrid")
                             self.logger.info("HYBRID Mode Selected")
 
                     # Update the display based on the selection.
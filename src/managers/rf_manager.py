@@ -1,11 +1,19 @@
 import queue
 from math import ceil
 
+import numpy as np
+
 from src.managers.thread_manager import *
 from src.managers.base_audio_manager import *
+from src.managers.crypto_manager import SessionKeySender, SessionKeyring
 from src.handlers.peripheral_drivers.rfm69 import *
 from src.utils.constants import *
-from src.utils.utils import sleep_microseconds
+from src.utils.utils import sleep_microseconds, get_proj_root
+from src.utils.latency import LatencyHistogram
+from src.utils.jitter_buffer import JitterBuffer
+from src.utils.vad import VoiceActivityDetector
+from src.utils.burst import burst_size, pack_burst, unpack_burst
+from src.utils.sequence_store import SequenceStore
 from src.logging import *
 
 
@@ -57,10 +65,68 @@ class RFManager:
 
             # Queue to store received packets
             self.packet_queue = queue.Queue()
-            # Buffer to store collected packet data before decoding
-            self.pkt_buffer = b""
+            # Two reusable buffers for collected packet data, so one frame can
+            # be reassembled while the previous one is still being decrypted.
+            # Each has a matching buffer for the decrypted frame.
+            self.rx_buffers = [bytearray(FRAME_BUFFER_SIZE) for _ in range(2)]
+            self.rx_views = [memoryview(buf) for buf in self.rx_buffers]
+            self.rx_plain_views = [
+                memoryview(bytearray(FRAME_BUFFER_SIZE)) for _ in range(2)
+            ]
+            self.rx_slot = 0
+            self.rx_fill = 0
             self.frame_len = 0
+            self.frame_seq = 0
+            # When the last packet was added to the frame
+            self.frame_time = 0.0
+            self.frame_key_id = 0
             self.opus_buffer = b""
+            # Reusable transmit buffer holding the header, the encrypted frame
+            # and the padding, sliced into packets without copying.
+            self.tx_buffer = bytearray(FRAME_BUFFER_SIZE)
+            self.tx_view = memoryview(self.tx_buffer)
+            self.tx_header_view = self.tx_view[:FRAME_HEADER_SIZE]
+            self.tx_payload_view = self.tx_view[FRAME_HEADER_SIZE:]
+            # One view per packet of the transmit buffer, made once so
+            # sending a packet allocates nothing
+            self.tx_packet_views = [
+                self.tx_view[i : i + PACKET_SIZE]
+                for i in range(0, FRAME_BUFFER_SIZE, PACKET_SIZE)
+            ]
+            # Zero padding of every length up to a packet, indexed by length
+            zero_padding = memoryview(bytes(PACKET_SIZE))
+            self.zero_padding = [
+                zero_padding[:length] for length in range(PACKET_SIZE)
+            ]
+            # Frames dropped because they failed authentication
+            self.dropped_frames = 0
+            # Sequence number of the next transmitted frame. It carries on
+            # from the mark stored with the keys, so a restart never reuses
+            # a frame nonce.
+            self.sequence_store = SequenceStore(
+                get_proj_root() / "keys" / SEQUENCE_FILE
+            )
+            self.tx_seq = self.sequence_store.start()
+            # Time spent encrypting each transmitted frame
+            self.tx_crypto_latency = LatencyHistogram("TX encrypt")
+            # Lost frames rebuilt by Opus packet loss concealment
+            self.concealed_frames = 0
+            # Lost frames recovered from the FEC data of the next frame
+            self.recovered_frames = 0
+            # Level of the comfort noise filling a received pause, None
+            # while speech is playing
+            self.comfort_noise_level = None
+            self.comfort_noise_frames = 0
+            self.comfort_noise_rng = np.random.default_rng()
+            # Pauses in the transmitted speech are replaced by comfort
+            # noise frames
+            self.silence_suppression = ENABLE_SILENCE_SUPPRESSION
+            # Packets sent for audio and comfort noise in a transmission,
+            # and the packets the same audio needs without suppression
+            self.tx_packets = 0
+            self.tx_packets_unsuppressed = 0
+            # Frame duration, frames per burst and the state sized by them
+            self.set_frame_format(FRAME_DURATION_MS, FRAMES_PER_BURST)
 
             self.rfm69.listen()
 
@@ -126,6 +192,54 @@ class RFManager:
             self.handle, G0, lgpio.RISING_EDGE, self._recv_pkt_callback
         )
 
+    def set_frame_format(self, frame_duration_ms, frames_per_burst=1):
+        """
+        Set the Opus frame duration and the frames sent in one burst.
+
+        The receiver must use the same frame duration as the transmitter,
+        bursts of any size are received. Must not be called while a
+        transmission or reception is running.
+
+        Parameters
+        ----------
+        frame_duration_ms : int
+            Duration of an Opus frame in ms, one of OPUS_FRAME_DURATIONS.
+        frames_per_burst : int, optional
+            Opus frames sent together, 1 to MAX_FRAMES_PER_BURST.
+
+        Raises
+        ------
+        ValueError
+            If the duration or the number of frames is not supported.
+        """
+        if frame_duration_ms not in OPUS_FRAME_DURATIONS:
+            raise ValueError(
+                f"Unsupported Opus frame duration: {frame_duration_ms} ms"
+            )
+        if not 1 <= frames_per_burst <= MAX_FRAMES_PER_BURST:
+            raise ValueError(
+                f"Unsupported frames per burst: {frames_per_burst}"
+            )
+        self.frame_duration_ms = frame_duration_ms
+        self.frames_per_burst = frames_per_burst
+        # Samples per channel in one Opus frame
+        self.frame_size = RATE * frame_duration_ms // 1000
+        # Received frames wait here to be played in order on a steady
+        # frame clock. A burst arrives at once, so the buffer holds the
+        # frames of one burst on top of the usual depth.
+        self.jitter_buffer = JitterBuffer(
+            frame_duration_ms / 1000,
+            min_depth=JITTER_MIN_DEPTH + frames_per_burst - 1,
+        )
+        # Silence played if a lost frame can not be concealed
+        self.silence = bytes(self.frame_size * CHANNELS * 2)
+        # The voice activity timings are kept in ms whatever the frame size
+        self.vad = VoiceActivityDetector(
+            window=VAD_NOISE_WINDOW_MS // frame_duration_ms,
+            hangover=VAD_HANGOVER_MS // frame_duration_ms,
+        )
+        self.sid_interval = max(1, SID_INTERVAL_MS // frame_duration_ms)
+
     def handle_packets(self, pause_event: threading.Event):
         """
         Handle incoming packets and decode them.
@@ -144,62 +258,583 @@ class RFManager:
         if not self.audio_manager.output_stream:
             self.audio_manager.open_output_stream()
 
+        # Open the decrypt sessions once for the whole received stream, one
+        # per peer key as frames from that peer arrive.
+        rx_sessions = self.audio_manager.crypto_manager.open_sessions(
+            encrypt=False
+        )
+
+        # Frames are decrypted as they arrive and played from the jitter
+        # buffer when their turn comes.
+        jitter_buffer = self.jitter_buffer
+        jitter_buffer.reset()
+        self.comfort_noise_level = None
+        last_arrival = last_packet = time.monotonic()
+
         while not pause_event.is_set():
+            # Wait for a packet, but no longer than until the next frame
+            # is due
+            timeout = jitter_buffer.time_to_next()
+            if timeout is None or timeout > BUFFER_TIMEOUT:
+                timeout = BUFFER_TIMEOUT
             try:
-                # Get next packet, wait up to BUFFER_TIMEOUT seconds
-                packet = self.packet_queue.get(timeout=BUFFER_TIMEOUT)
-                if packet[0:2] == START_SEQUENCE:
-                    # Check if the packet is a start sequence, if so reset the buffer
-                    # and set the frame length
-                    self.pkt_buffer = b""
-                    self.frame_len = int.from_bytes(packet[2:4], "big")
-
-                    self.pkt_buffer = packet[4:]
-                    opus_frame = None
-                else:
-                    self.pkt_buffer = self.pkt_buffer + packet
-                    if len(self.pkt_buffer) > self.frame_len:
-                        self.pkt_buffer = self.pkt_buffer[: self.frame_len]
-                        opus_frame = self.pkt_buffer
-
-                if opus_frame:
-                    # Decode and play audio
-                    try:
-                        # Check to see if data encryption is enabled.
-                        if self.audio_manager.crypto_manager.denc_en:
-                            # Check if AES is enabled.
-                            if self.audio_manager.crypto_manager.mode_aes:
-                                opus_frame = (
-                                    self.audio_manager.crypto_manager.decrypt(
-                                        opus_frame
-                                    )
-                                )
-                            # Check if RSA is enabled.
-                            elif self.audio_manager.crypto_manager.mode_rsa:
-                                # TODO: Implement RSA decryption
-                                pass
-                            # Check if Hybrid AES is enabled.
-                            elif self.audio_manager.crypto_manager.mode_hybrid:
-                                opus_frame = self.audio_manager.crypto_manager.hybrid_decrypt(
-                                    opus_frame
-                                )
-
-                        decoded_audio = self.audio_manager.decoder.decode(
-                            bytes(opus_frame), FRAME_SIZE
-                        )
-                        self.audio_manager.write_output(decoded_audio)
-                    except opuslib.exceptions.OpusError as e:
-                        self.logger.error(
-                            f"Opus decoding error: {e} | len: {len(opus_frame)}"
-                        )
+                packet = self.packet_queue.get(timeout=timeout)
+                last_packet = time.monotonic()
+                frame = self._reassemble(packet)
+                if frame is not None:
+                    last_arrival = time.monotonic()
+                    self._buffer_frame(rx_sessions, frame)
             except queue.Empty:
+                # The rest of a partial frame is lost once no packet came
+                # for BUFFER_TIMEOUT, so later packets are not added to it
+                if time.monotonic() - last_packet > BUFFER_TIMEOUT:
+                    self.frame_len = 0
+
+            released = jitter_buffer.pop()
+            for i, opus_frame in enumerate(released):
+                # A lost frame is rebuilt from the FEC data of the frame
+                # after it, if that one is already here
+                if i + 1 < len(released):
+                    next_frame = released[i + 1]
+                else:
+                    next_frame = jitter_buffer.peek()
+                self._play_frame(opus_frame, next_frame)
+
+            # The transmission has ended once nothing arrived for a while
+            # and every buffered frame was played
+            if (
+                not jitter_buffer.occupancy
+                and time.monotonic() - last_arrival > STREAM_IDLE_TIMEOUT
+            ):
+                self.logger.debug(
+                    f"{jitter_buffer.format()} | concealed "
+                    f"{self.concealed_frames} | recovered "
+                    f"{self.recovered_frames} | comfort noise "
+                    f"{self.comfort_noise_frames}"
+                )
                 self.audio_manager.close_output_stream()
                 self.thread_manager.pause_thread(RECEIVE_THREAD)
 
+        # The stream has ended, release the cipher contexts.
+        rx_sessions.close()
+
+    def _buffer_frame(self, rx_sessions, frame):
+        """
+        Decrypt a reassembled frame and add it to the jitter buffer.
+
+        Session key frames are passed to the hybrid sessions instead,
+        comfort noise frames are buffered as their noise level, marking a
+        pause, and bursts are split into their Opus frames.
+
+        Parameters
+        ----------
+        rx_sessions : KeyedSessions or SessionKeyring
+            The open decrypt sessions.
+        frame : tuple
+            ``(key_id, seq, header, frame, plain)`` from ``_reassemble``.
+        """
+        key_id, seq, header, data, _ = frame
+        if header[:2] == HANDSHAKE_SEQUENCE:
+            self._receive_session_key(rx_sessions, key_id, data)
+            return
+        if self.audio_manager.crypto_manager.denc_en:
+            data = self._decrypt_into(rx_sessions, *frame)
+            if data is None:
+                # Failed authentication, played as a lost frame
+                self.dropped_frames += 1
+                return
+        if header[:2] == COMFORT_NOISE_SEQUENCE:
+            if len(data) != struct.calcsize(COMFORT_NOISE_FORMAT):
+                self.dropped_frames += 1
+                return
+            (level,) = struct.unpack(COMFORT_NOISE_FORMAT, data)
+            self.jitter_buffer.push(seq, level, dtx=True)
+            return
+        if header[:2] == BURST_SEQUENCE:
+            try:
+                opus_frames = unpack_burst(data)
+            except ValueError as e:
+                self.logger.warning(f"Invalid burst: {e}")
+                self.dropped_frames += 1
+                return
+            for i, opus_frame in enumerate(opus_frames):
+                self.jitter_buffer.push(
+                    (seq + i) & SEQUENCE_MASK, bytes(opus_frame)
+                )
+            return
+        # The frame views are reused, the buffer keeps a copy
+        self.jitter_buffer.push(seq, bytes(data))
+
+    def _frame_header(self, seq, length, key_id=0):
+        """
+        Build the header sent in front of every frame.
+
+        Parameters
+        ----------
+        seq : int
+            The frame sequence number.
+        length : int
+            Length of the frame payload on the air.
+        key_id : int, optional
+            ID of the key the frame is encrypted with.
+
+        Returns
+        -------
+        bytes
+            The packed header.
+        """
+        return struct.pack(
+            FRAME_HEADER_FORMAT, START_SEQUENCE, key_id, seq, length
+        )
+
+    def _starts_frame(self, packet):
+        """
+        Check if a packet beginning with a start sequence starts a frame.
+
+        Any such packet with a valid header starts a new frame, dropping a
+        frame that is still incomplete. Encrypted frame data can begin with
+        a start sequence by chance, so the header must also give a length
+        that fits in a frame and, for audio frames, a key ID in the
+        keyring. About one packet in 16000 begins with a start sequence by
+        chance, and only one in 13000 of those (one in 50 under session
+        keys) also passes these checks. The others are kept as the next
+        packet of the frame.
+
+        Parameters
+        ----------
+        packet : bytes
+            The received radio packet.
+
+        Returns
+        -------
+        bool
+            True if the packet starts a new frame.
+        """
+        _, key_id, _, length = struct.unpack_from(FRAME_HEADER_FORMAT, packet)
+        if not 0 < length <= MAX_FRAME_PAYLOAD:
+            return False
+        # Session key frames carry an epoch in the key ID field, and so do
+        # the audio frames sent under a session key
+        crypto_manager = self.audio_manager.crypto_manager
+        if (
+            packet[0:2] == HANDSHAKE_SEQUENCE
+            or crypto_manager.backend.session_keys
+        ):
+            return True
+        return key_id in crypto_manager.keyring
+
+    def _reassemble(self, packet):
+        """
+        Copy a received packet into the frame being reassembled.
+
+        Frames are collected in two alternating buffers. The returned views
+        point into those buffers and stay valid until the next frame has
+        been completed.
+
+        Parameters
+        ----------
+        packet : bytes
+            The received radio packet.
+
+        Returns
+        -------
+        tuple or None
+            ``(key_id, seq, header, frame, plain)`` once the frame is
+            complete, otherwise None. ``header`` and ``frame`` are views of
+            the received data and ``plain`` is the buffer to decrypt into.
+        """
+        if packet[0:2] in (
+            START_SEQUENCE,
+            HANDSHAKE_SEQUENCE,
+            COMFORT_NOISE_SEQUENCE,
+            BURST_SEQUENCE,
+        ) and self._starts_frame(packet):
+            # Start of a new frame, reset the buffer and read the header
+            _, self.frame_key_id, self.frame_seq, self.frame_len = (
+                struct.unpack_from(FRAME_HEADER_FORMAT, packet)
+            )
+            self.rx_fill = 0
+        elif not self.frame_len:
+            # Continuation of a frame whose start was lost
+            return None
+        elif time.monotonic() - self.frame_time > BUFFER_TIMEOUT:
+            # The rest of the frame was lost, drop it
+            self.frame_len = 0
+            return None
+        self.frame_time = time.monotonic()
+
+        rx_buffer = self.rx_buffers[self.rx_slot]
+        rx_buffer[self.rx_fill : self.rx_fill + len(packet)] = packet
+        self.rx_fill += len(packet)
+
+        end = FRAME_HEADER_SIZE + self.frame_len
+        if self.rx_fill < end:
+            return None
+
+        # The frame is complete, the next one goes in the other buffer
+        slot = self.rx_slot
+        self.rx_slot ^= 1
+        self.frame_len = 0
+        rx_view = self.rx_views[slot]
+        return (
+            self.frame_key_id,
+            self.frame_seq,
+            rx_view[:FRAME_HEADER_SIZE],
+            rx_view[FRAME_HEADER_SIZE:end],
+            self.rx_plain_views[slot],
+        )
+
+    def _receive_session_key(self, rx_sessions, epoch, wrapped):
+        """
+        Pass a received session key frame to the hybrid receive sessions.
+
+        Parameters
+        ----------
+        rx_sessions : SessionKeyring or KeyedSessions
+            The open decrypt sessions.
+        epoch : int
+            Epoch of the session key, from the key ID field.
+        wrapped : memoryview
+            The RSA-wrapped session key.
+        """
+        if isinstance(rx_sessions, SessionKeyring):
+            rx_sessions.receive(epoch, wrapped)
+        else:
+            self.logger.debug(
+                f"Ignoring session key {epoch}, hybrid mode is off."
+            )
+
+    def _decrypt_into(self, rx_sessions, key_id, seq, header, frame, plain):
+        """
+        Decrypt a reassembled frame into its plaintext buffer.
+
+        Parameters
+        ----------
+        rx_sessions : KeyedSessions
+            The open decrypt sessions.
+        key_id : int
+            ID of the key the frame was encrypted with.
+        seq : int
+            The frame sequence number.
+        header : memoryview
+            The received frame header, authenticated in GCM mode.
+        frame : memoryview
+            The encrypted frame.
+        plain : memoryview
+            Buffer receiving the decrypted frame.
+
+        Returns
+        -------
+        memoryview or None
+            The decrypted frame, or None if its key is unknown or it failed
+            authentication.
+        """
+        rx_session = rx_sessions.get(key_id)
+        if rx_session is None:
+            return None
+        written = rx_session.update_into(frame, plain, seq, header)
+        if written is None:
+            return None
+        return plain[:written]
+
+    def _pack_frame(self, tx_session, encoded, seq, start=START_SEQUENCE):
+        """
+        Write a frame into the transmit buffer, ready to be sent.
+
+        The header is packed in place and the (encrypted) frame is written
+        directly behind it, followed by zero padding to a whole number of
+        packets.
+
+        Parameters
+        ----------
+        tx_session : CipherSession
+            The open encrypt session.
+        encoded : bytes
+            The Opus frame.
+        seq : int
+            The frame sequence number.
+        start : bytes, optional
+            Start sequence of the frame, COMFORT_NOISE_SEQUENCE for a
+            comfort noise frame or BURST_SEQUENCE for a burst.
+
+        Returns
+        -------
+        int
+            Number of packets the frame occupies in ``tx_view``.
+        """
+        denc_en = self.audio_manager.crypto_manager.denc_en
+        length = len(encoded)
+        if denc_en:
+            length += tx_session.overhead
+
+        # Write the header first (to aid decoding): start sequence, key ID,
+        # frame sequence number and the length of the frame payload.
+        struct.pack_into(
+            FRAME_HEADER_FORMAT,
+            self.tx_buffer,
+            0,
+            start,
+            tx_session.key_id,
+            seq,
+            length,
+        )
+        if denc_en:
+            # If encryption is enabled, encrypt straight into the buffer
+            start_time = time.perf_counter()
+            tx_session.update_into(
+                encoded, self.tx_payload_view, seq, self.tx_header_view
+            )
+            self.tx_crypto_latency.record(time.perf_counter() - start_time)
+        else:
+            self.tx_payload_view[:length] = encoded
+
+        return self._pad_packets(FRAME_HEADER_SIZE + length)
+
+    def _send_burst(self, tx_session, burst, seq):
+        """
+        Send the Opus frames waiting for a burst and empty the list.
+
+        Several frames are sent as one frame holding a table of contents
+        and the frames, encrypted together under the sequence number of
+        the first. A single frame is sent as an ordinary frame.
+
+        Parameters
+        ----------
+        tx_session : CipherSession
+            The open encrypt session.
+        burst : list of bytes
+            The Opus frames, in order. Emptied once they are sent.
+        seq : int
+            Sequence number of the first frame.
+        """
+        if not burst:
+            return
+        if len(burst) == 1:
+            req_pkts = self._pack_frame(tx_session, burst[0], seq)
+        else:
+            req_pkts = self._pack_frame(
+                tx_session, pack_burst(burst), seq, BURST_SEQUENCE
+            )
+        burst.clear()
+        self.tx_packets += req_pkts
+        self._send_packets(req_pkts)
+
+    def _pack_session_key(self, epoch, wrapped, seq):
+        """
+        Write a session key frame into the transmit buffer.
+
+        Parameters
+        ----------
+        epoch : int
+            Epoch of the session key, sent in the key ID field.
+        wrapped : bytes
+            The RSA-wrapped session key.
+        seq : int
+            Sequence number of the audio frame that follows.
+
+        Returns
+        -------
+        int
+            Number of packets the frame occupies in ``tx_view``.
+        """
+        struct.pack_into(
+            FRAME_HEADER_FORMAT,
+            self.tx_buffer,
+            0,
+            HANDSHAKE_SEQUENCE,
+            epoch,
+            seq,
+            len(wrapped),
+        )
+        self.tx_payload_view[: len(wrapped)] = wrapped
+        return self._pad_packets(FRAME_HEADER_SIZE + len(wrapped))
+
+    def _frame_packets(self, tx_session, length):
+        """
+        Number of packets an audio frame or burst needs on the air.
+
+        Parameters
+        ----------
+        tx_session : CipherSession
+            The open encrypt session.
+        length : int
+            Length of the Opus frame or burst payload.
+
+        Returns
+        -------
+        int
+            Packets for the header, the (encrypted) frame and padding.
+        """
+        if self.audio_manager.crypto_manager.denc_en:
+            length += tx_session.overhead
+        return ceil((FRAME_HEADER_SIZE + length) / PACKET_SIZE)
+
+    def _burst_fits(self, tx_session, lengths):
+        """
+        Check if Opus frames of the given lengths fit in one burst.
+
+        Parameters
+        ----------
+        tx_session : CipherSession
+            The open encrypt session.
+        lengths : list of int
+            Length of each frame.
+
+        Returns
+        -------
+        bool
+            True if the (encrypted) burst is within MAX_FRAME_PAYLOAD.
+        """
+        length = burst_size(lengths)
+        if self.audio_manager.crypto_manager.denc_en:
+            length += tx_session.overhead
+        return length <= MAX_FRAME_PAYLOAD
+
+    @property
+    def airtime_saved(self):
+        """
+        Fraction of audio packets silence suppression saved in the last
+        transmission.
+        """
+        if not self.tx_packets_unsuppressed:
+            return 0.0
+        return 1 - self.tx_packets / self.tx_packets_unsuppressed
+
+    def _pad_packets(self, end):
+        """Zero the transmit buffer from end to a whole packet."""
+        req_pkts = ceil(end / PACKET_SIZE)
+        padded_end = req_pkts * PACKET_SIZE
+        self.tx_view[end:padded_end] = self.zero_padding[padded_end - end]
+        return req_pkts
+
+    def _send_packets(self, req_pkts):
+        """
+        Send the packets of the frame in the transmit buffer.
+
+        Parameters
+        ----------
+        req_pkts : int
+            Number of packets to send.
+        """
+        for i in range(0, req_pkts):
+            # Send the packet straight from the transmit buffer
+            self.rfm69.send(self.tx_packet_views[i])
+            # Delay to allow the transceiver to process the packet
+            sleep_microseconds(1400)
+
+    def _play_frame(self, opus_frame, next_frame=None):
+        """
+        Decode an Opus frame and write it to the output stream.
+
+        A lost frame is recovered from the in-band FEC data of the next
+        frame when that frame has arrived, otherwise the decoder conceals
+        it by extending the audio before it. A frame that fails to decode
+        is concealed the same way. During a pause, comfort noise is played
+        in place of the frames that were not sent.
+
+        Parameters
+        ----------
+        opus_frame : bytes, int or None
+            The decrypted Opus frame, the noise level of a comfort noise
+            frame, or None if it was lost, failed authentication or not
+            sent during a pause.
+        next_frame : bytes, optional
+            The frame after it, if it has arrived.
+        """
+        if isinstance(opus_frame, int):
+            # The transmitter paused, fill the pause with its noise level
+            self.comfort_noise_level = opus_frame
+            self._play_comfort_noise()
+            return
+        if opus_frame is None:
+            if self.comfort_noise_level is not None:
+                self._play_comfort_noise()
+            else:
+                if not isinstance(next_frame, bytes):
+                    next_frame = None
+                self._conceal_frame(next_frame)
+            return
+        self.comfort_noise_level = None
+        try:
+            decoded_audio = self.audio_manager.decoder.decode(
+                bytes(opus_frame), self.frame_size
+            )
+        except opuslib.exceptions.OpusError as e:
+            self.logger.error(
+                f"Opus decoding error: {e} | len: {len(opus_frame)}"
+            )
+            self._conceal_frame(None)
+            return
+        self.audio_manager.write_output(decoded_audio)
+
+    def _play_comfort_noise(self):
+        """
+        Play one frame of noise at the level of the transmitter's pause.
+        """
+        noise = self.comfort_noise_rng.normal(
+            0.0, self.comfort_noise_level, self.frame_size * CHANNELS
+        )
+        self.audio_manager.write_output(
+            np.clip(noise, -32768, 32767).astype(np.int16).tobytes()
+        )
+        self.comfort_noise_frames += 1
+
+    def _conceal_frame(self, next_frame):
+        """
+        Play audio in place of a lost frame.
+
+        Parameters
+        ----------
+        next_frame : bytes or None
+            The frame after the lost one, whose FEC data rebuilds it.
+        """
+        decoder = self.audio_manager.decoder
+        try:
+            if next_frame is not None:
+                decoded_audio = decoder.decode(
+                    bytes(next_frame), self.frame_size, decode_fec=True
+                )
+                self.recovered_frames += 1
+            else:
+                # An empty packet makes the decoder conceal the loss
+                decoded_audio = decoder.decode(b"", self.frame_size)
+                self.concealed_frames += 1
+        except opuslib.exceptions.OpusError as e:
+            self.logger.error(f"Opus concealment error: {e}")
+            decoded_audio = self.silence
+        self.audio_manager.write_output(decoded_audio)
+
+    def _open_tx_session(self):
+        """
+        Open the encrypt session of a transmission.
+
+        In counter modes the keystream is made ahead of time on another
+        thread, so encrypting a frame is a single XOR. In hybrid mode
+        the session sends its own RSA-wrapped session keys.
+
+        Returns
+        -------
+        CipherSession, KeystreamRing or SessionKeySender
+            The open session.
+        """
+        crypto_manager = self.audio_manager.crypto_manager
+        if crypto_manager.backend.session_keys:
+            return crypto_manager.open_session_sender()
+        if PRECOMPUTE_KEYSTREAM:
+            # Keystream is made for the first frame of each burst
+            return crypto_manager.open_keystream_session(
+                self.tx_seq, stride=self.frames_per_burst
+            )
+        return crypto_manager.open_session(encrypt=True)
+
     def handle_input_stream(self, stop_event: threading.Event):
         """
         Handle input audio stream, encode and send packets.
 
+        Up to ``frames_per_burst`` encoded frames are collected and sent
+        as one burst. A burst is sent early if the next frame would not
+        fit, and before a pause or a key change.
+
         Parameters
         ----------
         stop_event : threading.Event
@@ -208,63 +843,109 @@ class RFManager:
         if not self.audio_manager.input_stream:
             self.audio_manager.open_input_stream()
 
+        # Open the encrypt session once for the whole transmission
+        crypto_manager = self.audio_manager.crypto_manager
+        generation = crypto_manager.key_generation
+        tx_session = self._open_tx_session()
+        self.tx_crypto_latency.reset()
+        self.vad.reset()
+        self.tx_packets = 0
+        self.tx_packets_unsuppressed = 0
+        # Encoded frames waiting to be sent as one burst, the sequence
+        # number of the first, and the lengths of the frames the same audio
+        # sends per burst without suppression
+        burst = []
+        burst_seq = 0
+        unsuppressed = []
+
         while not stop_event.is_set():
             try:
                 # Read the data from the input stream
                 data = self.audio_manager.input_stream.read(
-                    FRAME_SIZE, exception_on_overflow=False
+                    self.frame_size, exception_on_overflow=False
                 )
                 # Encode the data
-                encoded = self.audio_manager.encoder.encode(data, FRAME_SIZE)
-                # Add the length of the encoded frame, packs two bytes big
-                # endian, unsigned short to the front of the encoded data.
-                encoded_size = struct.pack(">H", len(encoded))
-
-                if self.audio_manager.crypto_manager.denc_en:
-                    # Check if in AES mode
-                    if self.audio_manager.crypto_manager.mode_aes:
-                        # Encrypt the encoded data if encryption is enabled
-                        enc_encoded = (
-                            self.audio_manager.crypto_manager.encrypt(encoded)
-                        )
-                    elif self.audio_manager.crypto_manager.mode_rsa:
-                        # TODO: Implemenet RSA encryption
-                        enc_encoded = encoded  #! Remove when implemented
-                        pass
-                    # Check if in hybrid mode
-                    elif self.audio_manager.crypto_manager.mode_hybrid:
-                        # Encrypt the encoded data if encryption is enabled
-                        enc_encoded = (
-                            self.audio_manager.crypto_manager.hybrid_encrypt(
-                                encoded
-                            )
+                encoded = self.audio_manager.encoder.encode(
+                    data, self.frame_size
+                )
+
+                # Switch to reloaded keys between two frames
+                if crypto_manager.key_generation != generation:
+                    generation = crypto_manager.key_generation
+                    self._send_burst(tx_session, burst, burst_seq)
+                    tx_session.close()
+                    tx_session = self._open_tx_session()
+
+                # Sequence number of this frame, carried in the header
+                seq = self.tx_seq
+                self.tx_seq = (self.tx_seq + 1) & SEQUENCE_MASK
+                self.sequence_store.claim(seq)
+
+                # Announce new hybrid session keys ahead of their frames
+                if isinstance(tx_session, SessionKeySender):
+                    session_key = tx_session.next_frame()
+                    if session_key is not None:
+                        self._send_packets(
+                            self._pack_session_key(*session_key, seq)
                         )
-                    # If encryption is enabled, use the encrypted data
-                    pkt_data = enc_encoded
-                else:
-                    # If encryption is not enabled, use the original encoded data
-                    pkt_data = encoded
-
-                # Write the length of the encoded frame first (to aid decoding)
-                pkt_buffer = START_SEQUENCE + encoded_size + pkt_data
-                req_pkts = ceil(len(pkt_buffer) / 60)
-                req_padding_len = (req_pkts * 60) - len(pkt_buffer)
-                pkt_buffer = pkt_buffer + (b"\x00" * req_padding_len)
-
-                for i in range(0, req_pkts):
-                    # Get the packet data
-                    pkt = pkt_buffer[i * PACKET_SIZE : (i + 1) * PACKET_SIZE]
-                    # # Encrypt the packet if encryption is enabled
-                    # if self.audio_manager.crypto_manager.denc_en:
-                    #     pkt = self.audio_manager.crypto_manager.encrypt(pkt)
-                    # Send the packet
-                    self.rfm69.send(pkt)
-                    # Delay to allow the transceiver to process the packet
-                    sleep_microseconds(1400)
+
+                unsuppressed.append(len(encoded))
+                if len(unsuppressed) == self.frames_per_burst:
+                    self.tx_packets_unsuppressed += self._frame_packets(
+                        tx_session, burst_size(unsuppressed)
+                    )
+                    unsuppressed.clear()
+                if self.silence_suppression and not self.vad.is_speech(
+                    data, encoded
+                ):
+                    # The speech before the pause goes out first
+                    self._send_burst(tx_session, burst, burst_seq)
+                    # Only the start of a pause and every sid_interval-th
+                    # frame of it are sent, as comfort noise frames
+                    if (self.vad.pause_frames - 1) % self.sid_interval:
+                        continue
+                    level = min(round(self.vad.noise_rms), 0xFFFF)
+                    req_pkts = self._pack_frame(
+                        tx_session,
+                        struct.pack(COMFORT_NOISE_FORMAT, level),
+                        seq,
+                        COMFORT_NOISE_SEQUENCE,
+                    )
+                    self.tx_packets += req_pkts
+                    self._send_packets(req_pkts)
+                    continue
+
+                # Send the burst early if this frame would not fit in it
+                if burst and not self._burst_fits(
+                    tx_session, [len(f) for f in burst] + [len(encoded)]
+                ):
+                    self._send_burst(tx_session, burst, burst_seq)
+                if not burst:
+                    burst_seq = seq
+                burst.append(encoded)
+                if len(burst) >= self.frames_per_burst:
+                    self._send_burst(tx_session, burst, burst_seq)
             except Exception as e:
                 self.logger.error(f"Packet error: {e}")
 
-        # Cleaning up the input stream.
+        # Send what is left, then clean up the cipher context and the
+        # input stream.
+        try:
+            self._send_burst(tx_session, burst, burst_seq)
+        except Exception as e:
+            self.logger.error(f"Packet error: {e}")
+        if unsuppressed:
+            self.tx_packets_unsuppressed += self._frame_packets(
+                tx_session, burst_size(unsuppressed)
+            )
+        tx_session.close()
+        self.logger.debug(self.tx_crypto_latency.format())
+        if self.silence_suppression:
+            self.logger.debug(
+                f"Silence suppression: speech in {self.vad.activity:.0%} "
+                f"of {self.vad.frames} frames | "
+                f"{self.airtime_saved:.1%} airtime saved"
+            )
         self.audio_manager.close_input_stream()
 
 
@@ -0,0 +1,384 @@
+"""
+Senior Project : Hardware Encryption Device
+Team 312
+File : audio_container.py
+Description: Seekable encrypted audio container. Audio is cut into segments
+    of a fixed number of frames, each sealed with AES-GCM under its own
+    nonce, and a trailing index maps the first frame of every segment to
+    its byte offset. Playing from any time only reads and decrypts the
+    segments that overlap it.
+"""
+
+import os
+import struct
+from bisect import bisect_right
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.exceptions import InvalidTag
+
+from src.utils.constants import CONTAINER_SEGMENT_MS
+
+# Container file format:
+#   magic | version | key ID | channels | sample width | sample rate |
+#   frames per segment                            (CONTAINER_HEADER_FORMAT)
+#   segments, each:
+#       GCM nonce | ciphertext length             (CONTAINER_SEGMENT_FORMAT)
+#       AES-GCM ciphertext
+#       16-byte GCM tag
+#   index, one entry per segment:
+#       first frame | byte offset                 (CONTAINER_INDEX_FORMAT)
+#   footer: index offset | segment count | magic  (CONTAINER_FOOTER_FORMAT)
+# Each segment authenticates the file header and its first frame, so
+# segments can not be moved between files or positions.
+CONTAINER_MAGIC = b"SD3C"
+CONTAINER_INDEX_MAGIC = b"SD3I"
+CONTAINER_VERSION = 1
+CONTAINER_HEADER_FORMAT = ">4sBBBBII"
+CONTAINER_HEADER_SIZE = struct.calcsize(CONTAINER_HEADER_FORMAT)
+CONTAINER_SEGMENT_FORMAT = ">12sI"
+CONTAINER_SEGMENT_SIZE = struct.calcsize(CONTAINER_SEGMENT_FORMAT)
+CONTAINER_INDEX_FORMAT = ">QQ"
+CONTAINER_INDEX_SIZE = struct.calcsize(CONTAINER_INDEX_FORMAT)
+CONTAINER_FOOTER_FORMAT = ">QI4s"
+CONTAINER_FOOTER_SIZE = struct.calcsize(CONTAINER_FOOTER_FORMAT)
+CONTAINER_TAG_SIZE = 16
+
+
+def is_container(path):
+    """
+    Check if a file is an encrypted audio container.
+
+    Parameters
+    ----------
+    path : str
+        Path of the file.
+
+    Returns
+    -------
+    bool
+        True if the file starts with the container magic.
+    """
+    with open(path, "rb") as f:
+        return f.read(len(CONTAINER_MAGIC)) == CONTAINER_MAGIC
+
+
+class ContainerWriter:
+    """
+    Write audio to an encrypted container as it is recorded.
+
+    Audio is buffered until a segment is full, then sealed and written, so
+    at most one segment is held in memory. The index is written by
+    ``close``.
+
+    Attributes
+    ----------
+    num_frames : int
+        Number of audio frames written so far.
+    index : list of tuple
+        ``(first frame, byte offset)`` of every written segment.
+    """
+
+    def __init__(
+        self,
+        crypto_manager,
+        f,
+        channels,
+        sample_width,
+        sample_rate,
+        segment_ms=CONTAINER_SEGMENT_MS,
+    ):
+        """
+        Write the container header.
+
+        Parameters
+        ----------
+        crypto_manager : CryptoManager
+            The manager whose key seals the segments.
+        f : file object
+            Binary file opened for writing.
+        channels : int
+            Number of audio channels.
+        sample_width : int
+            Bytes per sample.
+        sample_rate : int
+            Frames per second.
+        segment_ms : int, optional
+            Length of each segment in milliseconds.
+        """
+        self.crypto_manager = crypto_manager
+        self.f = f
+        self.frame_bytes = channels * sample_width
+        self.segment_frames = max(1, sample_rate * segment_ms // 1000)
+        self.header = struct.pack(
+            CONTAINER_HEADER_FORMAT,
+            CONTAINER_MAGIC,
+            CONTAINER_VERSION,
+            crypto_manager.key_id,
+            channels,
+            sample_width,
+            sample_rate,
+            self.segment_frames,
+        )
+        self.f.write(self.header)
+        self.offset = CONTAINER_HEADER_SIZE
+        self.buffer = bytearray()
+        self.num_frames = 0
+        self.index = []
+        self.closed = False
+
+    def write(self, data):
+        """
+        Add audio to the container.
+
+        Parameters
+        ----------
+        data : bytes
+            Raw audio frames.
+        """
+        self.buffer += data
+        segment_bytes = self.segment_frames * self.frame_bytes
+        while len(self.buffer) >= segment_bytes:
+            self._write_segment(bytes(self.buffer[:segment_bytes]))
+            del self.buffer[:segment_bytes]
+
+    def _write_segment(self, data):
+        """Seal one segment and append it to the file."""
+        nonce = os.urandom(12)
+        encryptor = Cipher(
+            algorithms.AES(self.crypto_manager.key), modes.GCM(nonce)
+        ).encryptor()
+        encryptor.authenticate_additional_data(
+            self.header + struct.pack(">Q", self.num_frames)
+        )
+        ciphertext = encryptor.update(data) + encryptor.finalize()
+
+        self.f.write(
+            struct.pack(CONTAINER_SEGMENT_FORMAT, nonce, len(ciphertext))
+        )
+        self.f.write(ciphertext)
+        self.f.write(encryptor.tag)
+        self.index.append((self.num_frames, self.offset))
+        self.offset += (
+            CONTAINER_SEGMENT_SIZE + len(ciphertext) + CONTAINER_TAG_SIZE
+        )
+        self.num_frames += len(data) // self.frame_bytes
+
+    def flush(self):
+        """
+        Push the written segments to the disk.
+        """
+        self.f.flush()
+
+    def close(self):
+        """
+        Write the last partial segment, the index and the footer.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        if self.buffer:
+            self._write_segment(bytes(self.buffer))
+            self.buffer.clear()
+        index_offset = self.offset
+        for entry in self.index:
+            self.f.write(struct.pack(CONTAINER_INDEX_FORMAT, *entry))
+        self.f.write(
+            struct.pack(
+                CONTAINER_FOOTER_FORMAT,
+                index_offset,
+                len(self.index),
+                CONTAINER_INDEX_MAGIC,
+            )
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ContainerReader:
+    """
+    Read audio from an encrypted container, from any point in time.
+
+    Attributes
+    ----------
+    key_id : int
+        Keyring entry the container was sealed with.
+    channels : int
+        Number of audio channels.
+    sample_width : int
+        Bytes per sample.
+    sample_rate : int
+        Frames per second.
+    segment_frames : int
+        Frames per segment.
+    index : list of tuple
+        ``(first frame, byte offset)`` of every segment.
+    num_frames : int
+        Number of audio frames in the container.
+    """
+
+    def __init__(self, crypto_manager, f):
+        """
+        Read the header and the index.
+
+        If the footer is missing, for example because the recorder stopped
+        before closing the file, the index is rebuilt by walking the
+        segment headers.
+
+        Parameters
+        ----------
+        crypto_manager : CryptoManager
+            The manager holding the keyring.
+        f : file object
+            Binary file opened for reading.
+
+        Raises
+        ------
+        ValueError
+            If the file is not a container or its key is unknown.
+        """
+        self.f = f
+        self.header = f.read(CONTAINER_HEADER_SIZE)
+        if len(self.header) < CONTAINER_HEADER_SIZE:
+            raise ValueError("Unsupported container format")
+        (
+            magic,
+            version,
+            self.key_id,
+            self.channels,
+            self.sample_width,
+            self.sample_rate,
+            self.segment_frames,
+        ) = struct.unpack(CONTAINER_HEADER_FORMAT, self.header)
+        if magic != CONTAINER_MAGIC or version != CONTAINER_VERSION:
+            raise ValueError("Unsupported container format")
+        self.crypto_manager = crypto_manager.with_key(self.key_id)
+        if self.crypto_manager is None:
+            raise ValueError(f"Unknown key ID {self.key_id}")
+        self.frame_bytes = self.channels * self.sample_width
+
+        self.index, self.end_offset = self._read_index()
+        self.num_frames = 0
+        if self.index:
+            # Only the last segment can be shorter than the others
+            last_frame, last_offset = self.index[-1]
+            self.f.seek(last_offset)
+            _, length = struct.unpack(
+                CONTAINER_SEGMENT_FORMAT, self.f.read(CONTAINER_SEGMENT_SIZE)
+            )
+            self.num_frames = last_frame + length // self.frame_bytes
+        self.starts = [start for start, _ in self.index]
+
+    def _read_index(self):
+        """Read the trailing index, or rebuild it from the segments."""
+        size = self.f.seek(0, os.SEEK_END)
+        if size >= CONTAINER_HEADER_SIZE + CONTAINER_FOOTER_SIZE:
+            self.f.seek(size - CONTAINER_FOOTER_SIZE)
+            index_offset, count, magic = struct.unpack(
+                CONTAINER_FOOTER_FORMAT, self.f.read(CONTAINER_FOOTER_SIZE)
+            )
+            index_size = count * CONTAINER_INDEX_SIZE
+            if (
+                magic == CONTAINER_INDEX_MAGIC
+                and index_offset + index_size + CONTAINER_FOOTER_SIZE == size
+            ):
+                self.f.seek(index_offset)
+                data = self.f.read(index_size)
+                return (
+                    list(struct.iter_unpack(CONTAINER_INDEX_FORMAT, data)),
+                    index_offset,
+                )
+
+        index = []
+        offset = CONTAINER_HEADER_SIZE
+        start = 0
+        while offset + CONTAINER_SEGMENT_SIZE + CONTAINER_TAG_SIZE <= size:
+            self.f.seek(offset)
+            _, length = struct.unpack(
+                CONTAINER_SEGMENT_FORMAT, self.f.read(CONTAINER_SEGMENT_SIZE)
+            )
+            end = offset + CONTAINER_SEGMENT_SIZE + length + CONTAINER_TAG_SIZE
+            if end > size:
+                break
+            index.append((start, offset))
+            start += length // (self.channels * self.sample_width)
+            offset = end
+        return index, offset
+
+    @property
+    def duration(self):
+        """
+        Length of the audio in seconds.
+        """
+        return self.num_frames / self.sample_rate
+
+    def read_segment(self, i):
+        """
+        Read and decrypt one segment.
+
+        Parameters
+        ----------
+        i : int
+            Index of the segment.
+
+        Returns
+        -------
+        bytes
+            The audio frames of the segment.
+
+        Raises
+        ------
+        ValueError
+            If the segment was modified.
+        """
+        start, offset = self.index[i]
+        self.f.seek(offset)
+        nonce, length = struct.unpack(
+            CONTAINER_SEGMENT_FORMAT, self.f.read(CONTAINER_SEGMENT_SIZE)
+        )
+        ciphertext = self.f.read(length)
+        tag = self.f.read(CONTAINER_TAG_SIZE)
+        try:
+            decryptor = Cipher(
+                algorithms.AES(self.crypto_manager.key), modes.GCM(nonce, tag)
+            ).decryptor()
+            decryptor.authenticate_additional_data(
+                self.header + struct.pack(">Q", start)
+            )
+            return decryptor.update(ciphertext) + decryptor.finalize()
+        except InvalidTag:
+            raise ValueError(f"Segment {i} failed authentication")
+
+    def read(self, start=0.0, end=None):
+        """
+        Decrypt the audio between two times.
+
+        Only the segments overlapping the range are read.
+
+        Parameters
+        ----------
+        start : float, optional
+            Start time in seconds.
+        end : float, optional
+            End time in seconds. Defaults to the end of the audio.
+
+        Yields
+        ------
+        bytes
+            Audio frames in order, trimmed to the range.
+        """
+        first = max(0, min(int(start * self.sample_rate), self.num_frames))
+        last = self.num_frames
+        if end is not None:
+            last = max(first, min(int(end * self.sample_rate), last))
+
+        i = max(0, bisect_right(self.starts, first) - 1)
+        while i < len(self.index) and self.starts[i] < last:
+            segment_start = self.starts[i]
+            data = self.read_segment(i)
+            lo = max(0, first - segment_start) * self.frame_bytes
+            hi = (last - segment_start) * self.frame_bytes
+            yield data[lo:hi]
+            i += 1
@@ -0,0 +1,426 @@
+"""
+Senior Project : Hardware Encryption Device
+Team 312
+File : benchmark.py
+Description: Microbenchmarks for the CryptoManager. Every cipher operation is
+    timed over payload sizes ranging from a single low-bitrate Opus frame to a
+    WAV file. Results can be saved as JSON and compared against a stored
+    baseline to catch performance regressions.
+
+Usage:
+    python -m src.utils.benchmark                    # Run and print results
+    python -m src.utils.benchmark --save             # Store a new baseline
+    python -m src.utils.benchmark --output out.json  # Compare and save run
+    python -m src.utils.benchmark --backends         # Pick a cipher backend
+"""
+
+import sys
+import json
+import time
+import platform
+import argparse
+import tracemalloc
+from datetime import datetime
+
+from src.utils.utils import get_proj_root
+from src.managers.crypto_manager import CryptoManager, CIPHER_BACKENDS
+
+# Payload sizes in bytes: low and high bitrate Opus frames, a 20 ms PCM
+# chunk, then WAV file sizes.
+PAYLOAD_SIZES = [20, 120, 1920, 64 * 1024, 1024 * 1024, 4 * 1024 * 1024]
+
+# RSA encrypts 446 byte chunks one at a time, larger payloads take minutes.
+RSA_MAX_PAYLOAD = 64 * 1024
+
+# Each case runs for at least TIME_BUDGET seconds (and MIN_ITERATIONS runs)
+TIME_BUDGET = 0.25
+MIN_ITERATIONS = 5
+MAX_ITERATIONS = 5000
+
+# A case regresses if it is this much slower than the baseline (20%)
+REGRESSION_THRESHOLD = 0.2
+
+BASELINE_FILE = "/docs/crypto_baseline.json"
+
+# Frame sizes used to compare the radio cipher backends: low, typical and
+# high bitrate Opus frames
+BACKEND_FRAME_SIZES = [40, 120, 240]
+
+
+def _operations(crypto_manager):
+    """
+    List the operations to benchmark.
+
+    Each decrypt operation is given a payload encrypted by its partner.
+
+    Parameters
+    ----------
+    crypto_manager : CryptoManager
+        The manager whose operations are benchmarked.
+
+    Returns
+    -------
+    list of tuple
+        ``(name, function, prepare, max_size)`` where ``prepare`` turns
+        a plaintext payload into the input of ``function``.
+    """
+    cm = crypto_manager
+    plain = lambda data: data
+    return [
+        ("encrypt", cm.encrypt, plain, None),
+        ("decrypt", cm.decrypt, cm.encrypt, None),
+        ("hybrid_encrypt", cm.hybrid_encrypt, plain, None),
+        ("hybrid_decrypt", cm.hybrid_decrypt, cm.hybrid_encrypt, None),
+        ("rsa_encrypt", cm.rsa_encrypt, plain, RSA_MAX_PAYLOAD),
+        ("rsa_decrypt", cm.rsa_decrypt, cm.rsa_encrypt, RSA_MAX_PAYLOAD),
+    ]
+
+
+def _percentile(samples, percent):
+    """
+    Return the given percentile of a sorted list of samples.
+    """
+    index = round(percent / 100 * (len(samples) - 1))
+    return samples[index]
+
+
+def measure(function, payload, time_budget=TIME_BUDGET):
+    """
+    Time a function over one payload.
+
+    After a warm-up call, the function is called repeatedly until
+    ``time_budget`` seconds have passed, then once more under tracemalloc
+    to find the bytes allocated. Tracing is kept out of the timed calls
+    because it slows them down.
+
+    Parameters
+    ----------
+    function : callable
+        The function to time, called with ``payload``.
+    payload : bytes
+        The input data.
+    time_budget : float, optional
+        Minimum number of seconds to spend timing.
+
+    Returns
+    -------
+    dict
+        ``ops_per_sec``, ``p50_us``, ``p99_us``, ``mb_per_sec``,
+        ``bytes_allocated`` and ``iterations``.
+    """
+    # Warm up, the first call also loads the keys the operation needs
+    function(payload)
+
+    samples = []
+    end = time.perf_counter() + time_budget
+    while len(samples) < MIN_ITERATIONS or (
+        time.perf_counter() < end and len(samples) < MAX_ITERATIONS
+    ):
+        start_time = time.perf_counter()
+        function(payload)
+        samples.append(time.perf_counter() - start_time)
+    samples.sort()
+
+    tracemalloc.start()
+    function(payload)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    mean = sum(samples) / len(samples)
+    return {
+        "ops_per_sec": 1 / mean,
+        "p50_us": _percentile(samples, 50) * 1e6,
+        "p99_us": _percentile(samples, 99) * 1e6,
+        "mb_per_sec": len(payload) / mean / (1024 * 1024),
+        "bytes_allocated": peak,
+        "iterations": len(samples),
+    }
+
+
+def run_benchmarks(
+    crypto_manager=None,
+    sizes=PAYLOAD_SIZES,
+    operations=None,
+    time_budget=TIME_BUDGET,
+):
+    """
+    Benchmark the CryptoManager operations over every payload size.
+
+    Parameters
+    ----------
+    crypto_manager : CryptoManager, optional
+        The manager to benchmark. A new one is created if not given.
+    sizes : list of int, optional
+        Payload sizes in bytes.
+    operations : list of str, optional
+        Names of the operations to run. Defaults to all of them.
+    time_budget : float, optional
+        Minimum number of seconds to spend on each case.
+
+    Returns
+    -------
+    dict
+        ``machine`` information and ``results`` keyed by operation name
+        and payload size (as a string, to survive JSON).
+    """
+    if crypto_manager is None:
+        crypto_manager = CryptoManager()
+
+    results = {}
+    for name, function, prepare, max_size in _operations(crypto_manager):
+        if operations is not None and name not in operations:
+            continue
+        results[name] = {}
+        for size in sizes:
+            if max_size is not None and size > max_size:
+                continue
+            payload = prepare(bytes(size))
+            results[name][str(size)] = measure(function, payload, time_budget)
+
+    return {
+        "machine": {
+            "platform": platform.platform(),
+            "processor": platform.machine(),
+            "python": platform.python_version(),
+            "date": datetime.now().isoformat(timespec="seconds"),
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    Find the cases that got slower than the baseline.
+
+    A case regresses if its ops/sec dropped or its p99 latency grew by more
+    than ``threshold``. Cases missing from either run are skipped.
+
+    Parameters
+    ----------
+    current : dict
+        Results of ``run_benchmarks``.
+    baseline : dict
+        Stored results to compare against.
+    threshold : float, optional
+        Allowed slowdown as a fraction, 0.2 is 20%.
+
+    Returns
+    -------
+    list of dict
+        One entry per regressed metric, with the ``operation``, ``size``,
+        ``metric``, ``baseline`` and ``current`` values and the ``change``.
+    """
+    regressions = []
+    for name, sizes in current["results"].items():
+        for size, result in sizes.items():
+            base = baseline["results"].get(name, {}).get(size)
+            if base is None:
+                continue
+            # Lower ops/sec is worse, higher p99 is worse
+            changes = {
+                "ops_per_sec": base["ops_per_sec"] / result["ops_per_sec"] - 1,
+                "p99_us": result["p99_us"] / base["p99_us"] - 1,
+            }
+            for metric, change in changes.items():
+                if change > threshold:
+                    regressions.append(
+                        {
+                            "operation": name,
+                            "size": int(size),
+                            "metric": metric,
+                            "baseline": base[metric],
+                            "current": result[metric],
+                            "change": change,
+                        }
+                    )
+    return regressions
+
+
+def save_results(results, path):
+    """
+    Write benchmark results to a JSON file.
+    """
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+
+
+def load_results(path):
+    """
+    Read benchmark results from a JSON file.
+    """
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def format_results(results):
+    """
+    Format benchmark results as a table.
+
+    Parameters
+    ----------
+    results : dict
+        Results of ``run_benchmarks``.
+
+    Returns
+    -------
+    str
+        One line per operation and payload size.
+    """
+    lines = [
+        f"{'operation':<15} {'bytes':>8} {'ops/s':>10} {'p50 µs':>10} "
+        f"{'p99 µs':>10} {'MB/s':>8} {'alloc B':>9}"
+    ]
+    for name, sizes in results["results"].items():
+        for size, r in sizes.items():
+            lines.append(
+                f"{name:<15} {size:>8} {r['ops_per_sec']:>10.0f} "
+                f"{r['p50_us']:>10.1f} {r['p99_us']:>10.1f} "
+                f"{r['mb_per_sec']:>8.1f} {r['bytes_allocated']:>9}"
+            )
+    return "\n".join(lines)
+
+
+def run_backend_benchmarks(
+    crypto_manager=None, frame_sizes=BACKEND_FRAME_SIZES, num_frames=2000
+):
+    """
+    Time every radio cipher backend over audio sized frames.
+
+    Parameters
+    ----------
+    crypto_manager : CryptoManager, optional
+        The manager to benchmark. A new one is created if not given.
+    frame_sizes : list of int, optional
+        Frame sizes in bytes.
+    num_frames : int, optional
+        Number of frames to run through each backend per size.
+
+    Returns
+    -------
+    dict
+        Frames per second of each backend, keyed by frame size.
+    """
+    if crypto_manager is None:
+        crypto_manager = CryptoManager()
+    return {
+        size: crypto_manager.benchmark_backends(
+            frame_size=size, num_frames=num_frames
+        )
+        for size in frame_sizes
+    }
+
+
+def fastest_backend(results):
+    """
+    Pick the backend with the highest mean frame rate.
+
+    Parameters
+    ----------
+    results : dict
+        Results of ``run_backend_benchmarks``.
+
+    Returns
+    -------
+    str
+        Name of the fastest backend.
+    """
+    names = next(iter(results.values()))
+    return max(names, key=lambda name: sum(r[name] for r in results.values()))
+
+
+def format_backend_results(results):
+    """
+    Format backend results as a table, followed by the fastest backend.
+
+    Parameters
+    ----------
+    results : dict
+        Results of ``run_backend_benchmarks``.
+
+    Returns
+    -------
+    str
+        One line per backend and the mode flag to set.
+    """
+    sizes = list(results)
+    lines = [f"{'backend':<10}" + "".join(f"{size:>10} B" for size in sizes)]
+    for name in results[sizes[0]]:
+        lines.append(
+            f"{name:<10}"
+            + "".join(f"{results[size][name]:>12.0f}" for size in sizes)
+        )
+    fastest = fastest_backend(results)
+    lines.append(
+        f"Fastest backend: {fastest}. Set "
+        f"{CIPHER_BACKENDS[fastest].flag.upper()} = True on every radio."
+    )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CryptoManager benchmarks")
+    parser.add_argument(
+        "--baseline",
+        default=str(get_proj_root()) + BASELINE_FILE,
+        help="Baseline JSON file to compare against",
+    )
+    parser.add_argument("--output", help="Write the results to this file")
+    parser.add_argument(
+        "--save", action="store_true", help="Store the run as the baseline"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=REGRESSION_THRESHOLD,
+        help="Allowed slowdown before a case is flagged (0.2 = 20%%)",
+    )
+    parser.add_argument(
+        "--quick",
+        action="store_true",
+        help="Skip the payloads larger than 64 KB",
+    )
+    parser.add_argument(
+        "--backends",
+        action="store_true",
+        help="Compare the radio cipher backends (frames/s) and exit",
+    )
+    args = parser.parse_args()
+
+    if args.backends:
+        print(format_backend_results(run_backend_benchmarks()))
+        return 0
+
+    sizes = PAYLOAD_SIZES
+    if args.quick:
+        sizes = [size for size in sizes if size <= RSA_MAX_PAYLOAD]
+
+    results = run_benchmarks(sizes=sizes)
+    print(format_results(results))
+
+    if args.output:
+        save_results(results, args.output)
+    if args.save:
+        save_results(results, args.baseline)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    try:
+        baseline = load_results(args.baseline)
+    except FileNotFoundError:
+        print(f"No baseline at {args.baseline}, run with --save to store one")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    for r in regressions:
+        print(
+            f"REGRESSION {r['operation']} {r['size']} bytes: {r['metric']} "
+            f"{r['baseline']:.1f} -> {r['current']:.1f} "
+            f"({r['change']:+.0%})"
+        )
+    if not regressions:
+        print(f"No regressions beyond {args.threshold:.0%} of the baseline")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""
+Senior Project : Hardware Encryption Device
+Team 312
+File : burst.py
+Description: Packing of several Opus frames into one radio burst. The
+    frames share one frame header, one authentication tag and one run of
+    padding, and a compact table of contents gives their lengths.
+"""
+
+# Burst payload format:
+#   frame count                                   (1 byte)
+#   length of every frame but the last, coded as in Opus (RFC 6716 3.2.1):
+#       below 252: one byte
+#       otherwise: two bytes, 252 + (length & 3) and (length - first) / 4
+#   the frames, back to back, the last one runs to the end of the payload
+# The frames have consecutive sequence numbers, starting with the one in
+# the frame header.
+BURST_SHORT_LENGTH = 252
+# Largest length the two byte code can hold
+BURST_MAX_LENGTH = 255 + 4 * 255
+
+
+def _length_size(length):
+    """Bytes the table of contents uses for one frame length."""
+    return 1 if length < BURST_SHORT_LENGTH else 2
+
+
+def burst_size(lengths):
+    """
+    Size of the payload holding frames of the given lengths.
+
+    A single frame is sent on its own, without a table of contents.
+
+    Parameters
+    ----------
+    lengths : list of int
+        Length of each frame.
+
+    Returns
+    -------
+    int
+        Bytes of the payload.
+    """
+    if len(lengths) == 1:
+        return lengths[0]
+    return 1 + sum(lengths) + sum(_length_size(n) for n in lengths[:-1])
+
+
+def pack_burst(frames):
+    """
+    Pack Opus frames into one burst payload.
+
+    Parameters
+    ----------
+    frames : list of bytes
+        The frames, at least two and at most 255.
+
+    Returns
+    -------
+    bytes
+        The table of contents followed by the frames.
+
+    Raises
+    ------
+    ValueError
+        If there are too few or too many frames, or a frame is too long.
+    """
+    if not 2 <= len(frames) <= 255:
+        raise ValueError(f"Can not pack {len(frames)} frames in a burst")
+    toc = bytearray([len(frames)])
+    for frame in frames[:-1]:
+        length = len(frame)
+        if length < BURST_SHORT_LENGTH:
+            toc.append(length)
+        elif length <= BURST_MAX_LENGTH:
+            first = BURST_SHORT_LENGTH + (length & 3)
+            toc += bytes([first, (length - first) >> 2])
+        else:
+            raise ValueError(f"Frame of {length} bytes is too long")
+    return bytes(toc) + b"".join(frames)
+
+
+def unpack_burst(payload):
+    """
+    Split a burst payload into its frames.
+
+    Parameters
+    ----------
+    payload : bytes-like
+        The table of contents followed by the frames.
+
+    Returns
+    -------
+    list of memoryview
+        The frames in order, as views of the payload.
+
+    Raises
+    ------
+    ValueError
+        If the table of contents does not match the payload.
+    """
+    view = memoryview(payload)
+    if len(view) < 1 or view[0] < 2:
+        raise ValueError("Invalid burst frame count")
+    count = view[0]
+    pos = 1
+    lengths = []
+    for _ in range(count - 1):
+        if pos >= len(view):
+            raise ValueError("Truncated burst table of contents")
+        first = view[pos]
+        if first < BURST_SHORT_LENGTH:
+            lengths.append(first)
+            pos += 1
+        else:
+            if pos + 1 >= len(view):
+                raise ValueError("Truncated burst table of contents")
+            lengths.append(first + 4 * view[pos + 1])
+            pos += 2
+
+    frames = []
+    for length in lengths:
+        if pos + length > len(view):
+            raise ValueError("Burst is shorter than its table of contents")
+        frames.append(view[pos : pos + length])
+        pos += length
+    if pos >= len(view):
+        raise ValueError("Burst has no last frame")
+    frames.append(view[pos:])
+    return frames
@@ -0,0 +1,326 @@
+"""
+Senior Project : Hardware Encryption Device
+Team 312
+File : callback_stream.py
+Description: Callback mode audio streams. PortAudio calls back on its own
+    thread to move audio between the device and a preallocated ring buffer,
+    and the encode and decode loops read from and write to the ring. A loop
+    held up by the GIL (display rendering, logging) no longer stalls the
+    device, it only lets the ring fill or drain.
+"""
+
+import abc
+import time
+
+import pyaudio
+
+from src.utils.constants import AUDIO_RING_MS, AUDIO_STREAM_TIMEOUT
+from src.utils.latency import LatencyHistogram
+from src.utils.ring_buffer import RingBuffer
+
+
+class CallbackStream(abc.ABC):
+    """
+    PyAudio stream in callback mode, buffered by a ring buffer.
+
+    Used in place of a blocking ``pyaudio.Stream``: the capture and
+    playback streams keep its ``read``, ``write``, ``stop_stream`` and
+    ``close`` methods. Each counter is only written by one thread, the
+    callback or the loop using the stream.
+
+    Attributes
+    ----------
+    ring : RingBuffer
+        Audio between the device and the loop.
+    device_xruns : int
+        Overflows and underflows PortAudio reported to the callback.
+    latency : LatencyHistogram
+        Time audio spends buffered between the loop and the device.
+    device_latency : float
+        Latency PortAudio reports for the device, in seconds.
+    """
+
+    name = "Stream"
+
+    def __init__(
+        self,
+        audio,
+        format,
+        channels,
+        rate,
+        frames_per_buffer,
+        device_index=None,
+        buffer_ms=AUDIO_RING_MS,
+        timeout=AUDIO_STREAM_TIMEOUT,
+    ):
+        """
+        Allocate the ring buffer and open the stream.
+
+        Parameters
+        ----------
+        audio : pyaudio.PyAudio
+            The PyAudio instance.
+        format : int
+            PyAudio sample format.
+        channels : int
+            Number of audio channels.
+        rate : int
+            Sampling rate in Hz.
+        frames_per_buffer : int
+            Frames per callback.
+        device_index : int, optional
+            Index of the device, None for the default.
+        buffer_ms : int, optional
+            Audio the ring buffer holds, in ms.
+        timeout : float, optional
+            Seconds a read or write waits for the device.
+        """
+        self.frame_bytes = channels * audio.get_sample_size(format)
+        self.bytes_per_second = rate * self.frame_bytes
+        self.timeout = timeout
+        self.ring = RingBuffer(rate * buffer_ms // 1000 * self.frame_bytes)
+        # Reused by the callback for the audio it hands to PortAudio
+        self.callback_buffer = bytearray(frames_per_buffer * self.frame_bytes)
+        self.silence = bytes(len(self.callback_buffer))
+        self.device_xruns = 0
+        self.latency = LatencyHistogram(f"{self.name} buffering")
+        self.closed = False
+        self.stream = audio.open(
+            format=format,
+            channels=channels,
+            rate=rate,
+            frames_per_buffer=frames_per_buffer,
+            stream_callback=self._callback,
+            **self._open_args(device_index),
+        )
+        self.device_latency = self._device_latency()
+
+    @abc.abstractmethod
+    def _open_args(self, device_index):
+        """Direction and device arguments of ``PyAudio.open``."""
+
+    @abc.abstractmethod
+    def _device_latency(self):
+        """Latency PortAudio reports for the device."""
+
+    @abc.abstractmethod
+    def _callback(self, in_data, frame_count, time_info, status_flags):
+        """PortAudio callback, moves audio between device and ring."""
+
+    @property
+    def buffered(self):
+        """
+        Seconds of audio in the ring buffer.
+        """
+        return self.ring.available / self.bytes_per_second
+
+    def _wait(self, missing):
+        """Sleep until the device has moved the missing bytes."""
+        time.sleep(max(missing / self.bytes_per_second, 0.001))
+
+    def is_active(self):
+        """
+        Check if the stream is running.
+        """
+        return not self.closed and self.stream.is_active()
+
+    def stop_stream(self):
+        """
+        Stop the stream.
+        """
+        self.stream.stop_stream()
+
+    def close(self):
+        """
+        Close the stream. Waiting reads and writes return.
+        """
+        self.closed = True
+        self.stream.close()
+
+    def format(self):
+        """
+        Format the xrun counts and buffering latency as one line.
+
+        Returns
+        -------
+        str
+            The counters and the mean and largest latency.
+        """
+        return (
+            f"{self.name}: device xruns {self.device_xruns} | "
+            f"buffering mean {self.latency.mean_us / 1000:.1f} ms, "
+            f"max {self.latency.max * 1000:.1f} ms | device latency "
+            f"{self.device_latency * 1000:.1f} ms"
+        )
+
+
+class CaptureStream(CallbackStream):
+    """
+    Input stream whose callback writes captured audio to the ring buffer.
+
+    Attributes
+    ----------
+    overruns : int
+        Callbacks whose audio was dropped because the ring was full, the
+        reading loop had fallen behind.
+    """
+
+    name = "Capture"
+
+    def __init__(self, *args, **kwargs):
+        self.overruns = 0
+        self.read_buffer = bytearray()
+        super().__init__(*args, **kwargs)
+
+    def _open_args(self, device_index):
+        return {"input": True, "input_device_index": device_index}
+
+    def _device_latency(self):
+        return float(self.stream.get_input_latency())
+
+    def _callback(self, in_data, frame_count, time_info, status_flags):
+        if status_flags & pyaudio.paInputOverflow:
+            self.device_xruns += 1
+        if self.ring.write(in_data) < len(in_data):
+            self.overruns += 1
+        return None, pyaudio.paContinue
+
+    def read(self, num_frames, exception_on_overflow=False):
+        """
+        Read captured audio, waiting until enough has arrived.
+
+        Parameters
+        ----------
+        num_frames : int
+            Number of frames to read.
+        exception_on_overflow : bool, optional
+            Ignored, overruns are counted instead. Kept for the blocking
+            stream's signature.
+
+        Returns
+        -------
+        bytes
+            The audio.
+
+        Raises
+        ------
+        OSError
+            If the stream is closed or no audio arrives in time.
+        """
+        size = num_frames * self.frame_bytes
+        deadline = None
+        while self.ring.available < size:
+            if self.closed:
+                raise OSError("Capture stream closed")
+            now = time.monotonic()
+            if deadline is None:
+                deadline = now + self.timeout
+            elif now > deadline:
+                raise OSError("Capture stream timed out")
+            self._wait(size - self.ring.available)
+
+        # The oldest frame read waited this long since it was captured
+        self.latency.record(self.buffered + self.device_latency)
+        if len(self.read_buffer) != size:
+            self.read_buffer = bytearray(size)
+        self.ring.read_into(memoryview(self.read_buffer))
+        return bytes(self.read_buffer)
+
+    def format(self):
+        return f"{super().format()} | overruns {self.overruns}"
+
+
+class PlaybackStream(CallbackStream):
+    """
+    Output stream whose callback plays audio from the ring buffer.
+
+    Attributes
+    ----------
+    underruns : int
+        Times the ring ran empty while playing, the gap is played as
+        silence.
+    overruns : int
+        Writes that timed out waiting for room, their rest was dropped.
+    """
+
+    name = "Playback"
+
+    def __init__(self, *args, **kwargs):
+        self.underruns = 0
+        self.overruns = 0
+        self.playing = False
+        super().__init__(*args, **kwargs)
+
+    def _open_args(self, device_index):
+        return {"output": True, "output_device_index": device_index}
+
+    def _device_latency(self):
+        return float(self.stream.get_output_latency())
+
+    def _callback(self, in_data, frame_count, time_info, status_flags):
+        if status_flags & pyaudio.paOutputUnderflow:
+            self.device_xruns += 1
+        size = frame_count * self.frame_bytes
+        if len(self.callback_buffer) < size:
+            self.callback_buffer = bytearray(size)
+            self.silence = bytes(size)
+        out = memoryview(self.callback_buffer)[:size]
+        count = self.ring.read_into(out)
+        if count < size:
+            out[count:] = self.silence[: size - count]
+            # Only a ring that ran dry mid-stream is an underrun, not one
+            # still waiting for the first audio
+            if self.playing:
+                self.underruns += 1
+            self.playing = False
+        else:
+            self.playing = True
+        return bytes(out), pyaudio.paContinue
+
+    def write(self, data, num_frames=None, exception_on_underflow=False):
+        """
+        Queue audio for playback, waiting while the ring is full.
+
+        Parameters
+        ----------
+        data : bytes
+            The audio.
+        num_frames : int, optional
+            Ignored, kept for the blocking stream's signature.
+        exception_on_underflow : bool, optional
+            Ignored, underruns are counted instead.
+        """
+        view = memoryview(data)
+        written = self.ring.write(view)
+        deadline = None
+        while written < len(view) and not self.closed:
+            now = time.monotonic()
+            if deadline is None:
+                deadline = now + self.timeout
+            elif now > deadline:
+                self.overruns += 1
+                break
+            self._wait(len(view) - written)
+            written += self.ring.write(view[written:])
+
+        # The last frame written plays after this long
+        self.latency.record(self.buffered + self.device_latency)
+
+    def stop_stream(self):
+        """
+        Play the queued audio, then stop the stream.
+        """
+        deadline = time.monotonic() + self.timeout
+        while (
+            self.ring.available
+            and not self.closed
+            and time.monotonic() < deadline
+        ):
+            self._wait(self.ring.available)
+        super().stop_stream()
+
+    def format(self):
+        return (
+            f"{super().format()} | underruns {self.underruns} | "
+            f"overruns {self.overruns}"
+        )
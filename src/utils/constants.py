@@ -12,8 +12,36 @@ Option to enable logging to the terminal/console.
 """
 EN_CONSOLE_LOGGING = True
 MODE_AES = True  # AES mode
+MODE_CTR = False  # AES-CTR mode, nonce from the frame sequence number
+MODE_GCM = False  # AES-GCM mode, authenticated frames with a truncated tag
+MODE_CHACHA = False  # ChaCha20 mode, for CPUs without AES instructions
+AEAD_TAG_SIZE = 8  # Bytes of GCM tag kept per frame (4 to 16)
 MODE_RSA = False  # RSA mode
 MODE_HYBRID = False  # Hybrid mode
+# Keyring entry this radio transmits with (0 is keys/aes.txt). Frame nonces
+# are built from the key, the key ID and the sequence number. A radio never
+# repeats its own sequence numbers (see SEQUENCE_FILE), but every radio
+# sharing a key must transmit with its own key ID, or two of them can reuse
+# a nonce.
+KEY_ID = 0
+MAX_KEY_ID = 255  # Key IDs are sent as one byte in the frame header
+RSA_WORKERS = 4  # Processes used for per-chunk RSA files (one per Pi core)
+FILE_BLOCK_SIZE = 64 * 1024  # Bytes per block when streaming files
+SEGMENT_SIZE = 256 * 1024  # Bytes per segment of segmented AES-CTR files
+FILE_WORKERS = 4  # Threads used for segmented files (one per Pi core)
+PRECOMPUTE_KEYSTREAM = True  # Make counter mode keystream ahead of sending
+KEYSTREAM_DEPTH = 8  # Packets of keystream kept ready (160 ms at 20 ms)
+CONTAINER_SEGMENT_MS = 1000  # Audio per segment of encrypted containers
+RECORDER_QUEUE_SIZE = 50  # Chunks waiting for the recorder's disk writer (1 s)
+RECORDER_BATCH_SIZE = 10  # Chunks the recorder writes per flush (200 ms)
+KEY_WATCH_INTERVAL = 1.0  # Seconds between checks for a new USB key drive
+USB_MOUNT_ROOTS = ("/media", "/run/media", "/mnt")  # Where USB drives mount
+HYBRID_POOL_SIZE = 2  # Pre-generated RSA-4096 keys kept in keys/hybrid_pool
+REKEY_INTERVAL = 60.0  # Seconds per hybrid session key (0 for no limit)
+REKEY_FRAMES = 3000  # Frames per hybrid session key (0 for no limit)
+REKEY_LEAD_FRAMES = 5  # Old key frames sent after a new key is announced
+SESSION_KEYS_KEPT = 3  # Session keys a receiver keeps for late frames
+SESSION_KEY_HOLD = 10.0  # Seconds an epoch in use can not get a new key
 
 """
 Application threads
@@ -22,6 +50,7 @@ MAIN_THREAD = "MAIN"
 DEBUG_THREAD = "DEBUG THREAD"
 TRANSMIT_THREAD = "TRANSMIT THREAD"
 RECEIVE_THREAD = "RECEIVE THREAD"
+KEY_WATCH_THREAD = "KEY WATCH THREAD"
 
 """
 Device Settings
@@ -67,8 +96,44 @@ ENCRYPTION_KEY = (
 
 # 2-byte start sequence (can be any unique marker)
 START_SEQUENCE = b"\xa5\x5a"
+# Start sequence of hybrid session key frames, which use the same header
+# with the key epoch in the key ID field
+HANDSHAKE_SEQUENCE = b"\xa5\x5b"
+# Start sequence of comfort noise frames, sent in place of audio during a
+# pause with the background noise level as their payload
+COMFORT_NOISE_SEQUENCE = b"\xa5\x5c"
+COMFORT_NOISE_FORMAT = ">H"
+# Start sequence of bursts, several Opus frames sent as one frame with a
+# table of contents (see src/utils/burst.py). The sequence number in the
+# header is that of the first Opus frame.
+BURST_SEQUENCE = b"\xa5\x5d"
+# Frame header: start sequence, 1-byte key ID, 4-byte frame sequence number,
+# 2-byte length
+FRAME_HEADER_FORMAT = ">2sBIH"
+FRAME_HEADER_SIZE = 9
+SEQUENCE_MASK = 0xFFFFFFFF  # Frame sequence numbers wrap at 32 bits
+# File in the keys folder holding the transmit sequence high-water mark
+# (see src/utils/sequence_store.py), and the sequence numbers reserved by
+# each write of it (3000 frames is 60 s at 20 ms)
+SEQUENCE_FILE = "tx_sequence.txt"
+SEQUENCE_LEASE = 3000
+MAX_OPUS_FRAME = 1275  # Largest Opus packet in bytes
+# Size of the reusable frame buffers: header + largest Opus frame + full tag,
+# rounded up to whole packets, plus one packet of room for padding and the
+# slack OpenSSL needs for update_into.
+FRAME_BUFFER_SIZE = 1380
 PACKET_SIZE = 60  # Radio transceiver byte limit
+# Largest frame payload, including the authentication tag
+MAX_FRAME_PAYLOAD = FRAME_BUFFER_SIZE - FRAME_HEADER_SIZE - PACKET_SIZE
+# Opus frames sent together in one burst, sharing the header, the tag and
+# the padding of the last packet. More frames send fewer packets per second
+# but each burst waits for its last frame. 1 sends every frame on its own.
+FRAMES_PER_BURST = 1
+MAX_FRAMES_PER_BURST = 6
 BUFFER_TIMEOUT = 0.1  # Max seconds to wait for a missing packet
+JITTER_MIN_DEPTH = 2  # Frames buffered before playout starts (40 ms)
+JITTER_MAX_DEPTH = 10  # Largest jitter buffer target depth (200 ms)
+STREAM_IDLE_TIMEOUT = 0.5  # Seconds without frames before playout stops
 
 """
 SSD1306 Display constants.
@@ -87,10 +152,27 @@ Audio configuration and processing constants.
 FORMAT = pyaudio.paInt16
 CHANNELS = 1
 RATE = 48000
-FRAME_SIZE = 960  # 20ms Opus frame at 48kHz
+# Opus frame duration in ms, one of OPUS_FRAME_DURATIONS. Longer frames
+# need fewer packets per second but add latency. MUST match on both the
+# transmitter and receiver.
+FRAME_DURATION_MS = 20
+OPUS_FRAME_DURATIONS = (10, 20, 40, 60)
+FRAME_SIZE = RATE * FRAME_DURATION_MS // 1000  # Samples per Opus frame
+# Opus in-band forward error correction: each packet carries a low-bitrate
+# copy of the frame before it, so a single lost frame can be rebuilt
+OPUS_INBAND_FEC = True
+OPUS_PACKET_LOSS_PERC = 10  # Expected packet loss (%), sets the FEC bitrate
+# Opus encoder profile, one of ENCODER_PROFILES in src/utils/encoder_profile.py
+OPUS_PROFILE = "default"
+OPUS_DTX_BYTES = 2  # Opus DTX frames are this size or smaller
 # Input and output device indices.
 INPUT_DEV_INDEX = 1
 OUTPUT_DEV_INDEX = 0
+# Callback mode streams: PortAudio moves audio between the device and ring
+# buffers on its own thread, so a busy Python loop does not stall it
+AUDIO_CALLBACK_MODE = True
+AUDIO_RING_MS = 200  # Audio each ring buffer holds
+AUDIO_STREAM_TIMEOUT = 1.0  # Max seconds a read or write waits for audio
 
 # Audio processing parameters
 ENABLE_NORMALIZATION = True
@@ -103,3 +185,15 @@ NOISE_GATE_THRESHOLD = 15
 SMOOTHING_FACTOR = 0.25
 # Starting gain for normalization
 CURRENT_GAIN = 1.0
+
+# Silence suppression: pauses in speech are not sent, the receiver plays
+# comfort noise at the level of the background noise instead
+ENABLE_SILENCE_SUPPRESSION = True
+# Lowest background noise level, frames below it are never speech
+VAD_MIN_RMS = NOISE_GATE_THRESHOLD
+VAD_NOISE_RATIO = 3.0  # Speech is this many times the noise level (~10 dB)
+VAD_NOISE_WINDOW_MS = 1000  # Time the noise level is measured over
+VAD_HANGOVER_MS = 200  # Time still sent after speech ends
+# A comfort noise frame starts a pause and is repeated this often (ms),
+# keeping the receiver's stream open
+SID_INTERVAL_MS = 160
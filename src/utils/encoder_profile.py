@@ -0,0 +1,250 @@
+"""
+Senior Project : Hardware Encryption Device
+Team 312
+File : encoder_profile.py
+Description: Named Opus encoder profiles. A profile holds the encoder
+    controls (application, bitrate, complexity, VBR, DTX, signal type,
+    bandwidth and FEC) and builds an encoder with them, so the trade
+    between audio quality, airtime and CPU can be switched at runtime.
+"""
+
+import opuslib
+import opuslib.api.ctl
+import opuslib.api.encoder
+
+from src.utils.constants import OPUS_INBAND_FEC, OPUS_PACKET_LOSS_PERC
+
+# Let the encoder pick the value (bitrate, signal type, bandwidth)
+AUTO = opuslib.constants.AUTO
+
+SIGNAL_TYPES = {
+    "auto": AUTO,
+    "voice": opuslib.constants.SIGNAL_VOICE,
+    "music": opuslib.constants.SIGNAL_MUSIC,
+}
+BANDWIDTHS = {
+    "narrowband": opuslib.constants.BANDWIDTH_NARROWBAND,
+    "mediumband": opuslib.constants.BANDWIDTH_MEDIUMBAND,
+    "wideband": opuslib.constants.BANDWIDTH_WIDEBAND,
+    "superwideband": opuslib.constants.BANDWIDTH_SUPERWIDEBAND,
+    "fullband": opuslib.constants.BANDWIDTH_FULLBAND,
+}
+
+
+def encoder_ctl(encoder, request, value):
+    """
+    Set an encoder control.
+
+    Some opuslib property setters drop their value (``inband_fec``) or
+    send the wrong request (``dtx``), so every control is set through
+    ``encoder_ctl`` directly.
+
+    Parameters
+    ----------
+    encoder : opuslib.Encoder
+        The encoder to configure.
+    request : callable
+        The opuslib.api.ctl setter, e.g. ``opuslib.api.ctl.set_bitrate``.
+    value : int
+        The value to set.
+    """
+    opuslib.api.encoder.encoder_ctl(encoder.encoder_state, request, value)
+
+
+class EncoderProfile:
+    """
+    A set of Opus encoder controls.
+
+    Profiles are kept in ``ENCODER_PROFILES`` and selected by name with
+    ``BaseAudioManager.set_encoder_profile``. The application can only be
+    set when an encoder is created, so a profile always builds a new
+    encoder.
+
+    Attributes
+    ----------
+    name : str
+        Name the profile is registered under.
+    application : str
+        "voip", "audio" or "restricted_lowdelay".
+    bitrate : int
+        Target bitrate in bits per second, or AUTO.
+    complexity : int
+        Encoder complexity, 0 (fastest) to 10 (best quality).
+    vbr : bool
+        True for variable bitrate, False for constant bitrate.
+    dtx : bool
+        True to send almost empty frames during silence.
+    signal : str
+        Signal type hint, a key of ``SIGNAL_TYPES``.
+    max_bandwidth : str or None
+        Highest audio bandwidth, a key of ``BANDWIDTHS``, or None for
+        fullband.
+    inband_fec : bool
+        True to carry FEC data for the previous frame in each frame.
+    packet_loss_perc : int
+        Expected packet loss in percent, sets the FEC bitrate.
+    """
+
+    def __init__(
+        self,
+        name,
+        application="audio",
+        bitrate=AUTO,
+        complexity=10,
+        vbr=True,
+        dtx=False,
+        signal="auto",
+        max_bandwidth=None,
+        inband_fec=OPUS_INBAND_FEC,
+        packet_loss_perc=OPUS_PACKET_LOSS_PERC,
+    ):
+        """
+        Describe a profile.
+
+        Parameters
+        ----------
+        name : str
+            Name to register the profile under.
+        application : str, optional
+            "voip", "audio" or "restricted_lowdelay".
+        bitrate : int, optional
+            Target bitrate in bits per second, or AUTO.
+        complexity : int, optional
+            Encoder complexity, 0 to 10.
+        vbr : bool, optional
+            True for variable bitrate, False for constant bitrate.
+        dtx : bool, optional
+            True to enable discontinuous transmission.
+        signal : str, optional
+            Signal type hint, "auto", "voice" or "music".
+        max_bandwidth : str, optional
+            Highest audio bandwidth, e.g. "wideband".
+        inband_fec : bool, optional
+            True to enable in-band FEC.
+        packet_loss_perc : int, optional
+            Expected packet loss in percent (0-100).
+        """
+        if application not in opuslib.APPLICATION_TYPES_MAP:
+            raise ValueError(f"Unknown Opus application: {application}")
+        if signal not in SIGNAL_TYPES:
+            raise ValueError(f"Unknown Opus signal type: {signal}")
+        if max_bandwidth is not None and max_bandwidth not in BANDWIDTHS:
+            raise ValueError(f"Unknown Opus bandwidth: {max_bandwidth}")
+        self.name = name
+        self.application = application
+        self.bitrate = bitrate
+        self.complexity = complexity
+        self.vbr = vbr
+        self.dtx = dtx
+        self.signal = signal
+        self.max_bandwidth = max_bandwidth
+        self.inband_fec = inband_fec
+        self.packet_loss_perc = packet_loss_perc
+
+    def create_encoder(self, sample_rate, channels):
+        """
+        Build an encoder with the profile's controls.
+
+        Parameters
+        ----------
+        sample_rate : int
+            Frames per second.
+        channels : int
+            Number of audio channels.
+
+        Returns
+        -------
+        opuslib.Encoder
+            The configured encoder.
+        """
+        encoder = opuslib.Encoder(sample_rate, channels, self.application)
+        ctl = opuslib.api.ctl
+        encoder_ctl(encoder, ctl.set_bitrate, self.bitrate)
+        encoder_ctl(encoder, ctl.set_complexity, self.complexity)
+        encoder_ctl(encoder, ctl.set_vbr, int(self.vbr))
+        encoder_ctl(encoder, ctl.set_dtx, int(self.dtx))
+        encoder_ctl(encoder, ctl.set_signal, SIGNAL_TYPES[self.signal])
+        encoder_ctl(
+            encoder,
+            ctl.set_max_bandwidth,
+            BANDWIDTHS[self.max_bandwidth or "fullband"],
+        )
+        encoder_ctl(encoder, ctl.set_inband_fec, int(self.inband_fec))
+        encoder_ctl(encoder, ctl.set_packet_loss_perc, self.packet_loss_perc)
+        return encoder
+
+    def format(self):
+        """
+        Format the controls as one line.
+
+        Returns
+        -------
+        str
+            The profile name and its controls.
+        """
+        bitrate = "auto" if self.bitrate == AUTO else f"{self.bitrate} bps"
+        return (
+            f"{self.name}: {self.application} | {bitrate} | "
+            f"complexity {self.complexity} | {'VBR' if self.vbr else 'CBR'} | "
+            f"DTX {'on' if self.dtx else 'off'} | signal {self.signal} | "
+            f"{self.max_bandwidth or 'fullband'} | "
+            f"FEC {'on' if self.inband_fec else 'off'}"
+        )
+
+
+ENCODER_PROFILES = {}
+
+
+def register_profile(profile):
+    """
+    Add an encoder profile to the registry.
+
+    Parameters
+    ----------
+    profile : EncoderProfile
+        The profile to register.
+
+    Returns
+    -------
+    EncoderProfile
+        The registered profile.
+    """
+    ENCODER_PROFILES[profile.name] = profile
+    return profile
+
+
+# Library defaults, the encoder picks the bitrate
+register_profile(EncoderProfile("default"))
+# Wideband speech, about half the packets per frame of the defaults
+register_profile(
+    EncoderProfile(
+        "voice",
+        application="voip",
+        bitrate=24000,
+        signal="voice",
+        max_bandwidth="wideband",
+    )
+)
+# Constant 12 kbps narrowband speech, every frame fits one radio packet
+# even with a full GCM tag
+register_profile(
+    EncoderProfile(
+        "low_airtime",
+        application="voip",
+        bitrate=12000,
+        vbr=False,
+        signal="voice",
+        max_bandwidth="narrowband",
+    )
+)
+# Voice profile at low complexity, for a loaded CPU
+register_profile(
+    EncoderProfile(
+        "low_cpu",
+        application="voip",
+        bitrate=24000,
+        complexity=2,
+        signal="voice",
+        max_bandwidth="wideband",
+    )
+)
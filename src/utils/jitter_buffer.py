@@ -0,0 +1,327 @@
+"""
+Senior Project : Hardware Encryption Device
+Team 312
+File : jitter_buffer.py
+Description: Adaptive jitter buffer for the receive path. Frames are held
+    by sequence number and played out on a steady frame clock, so bursty
+    radio delivery and reordered frames reach the decoder evenly and in
+    order. The buffer depth follows the measured inter-arrival jitter.
+"""
+
+import time
+
+from src.utils.constants import (
+    FRAME_DURATION_MS,
+    SEQUENCE_MASK,
+    JITTER_MIN_DEPTH,
+    JITTER_MAX_DEPTH,
+)
+
+# The target depth covers this many times the measured jitter
+JITTER_FACTOR = 3
+# Frames above the target depth before the oldest are discarded
+JITTER_SLACK = 2
+# Half of the sequence number space, differences above it are negative
+HALF_SEQUENCE = (SEQUENCE_MASK + 1) // 2
+# Frames a sequence number may jump before it is taken as a new stream
+RESYNC_FRAMES = 50
+
+
+class JitterBuffer:
+    """
+    Reorder received frames and release them on a steady frame clock.
+
+    The buffer fills until it holds ``target_depth`` frames, then releases
+    one frame per frame period in sequence order. A frame that is still
+    missing when its turn comes is reported as lost (None) so the caller
+    can conceal it, and a frame arriving after its turn is late and
+    dropped. If the buffer runs dry it counts an underrun and fills up to
+    the target depth again.
+
+    A frame pushed with ``dtx`` set marks a pause: the transmitter sends
+    nothing more until speech resumes. Once it is released the clock keeps
+    running on an empty buffer, each missing frame is released as None
+    and counted as suppressed rather than lost, and the speech after the
+    pause plays with the same delay as before it.
+
+    The jitter is estimated as in RFC 3550, from the difference between the
+    arrival spacing and the sequence spacing of consecutive frames. The
+    target depth is ``JITTER_FACTOR`` times the jitter in frames, plus one,
+    kept between ``min_depth`` and ``max_depth``. The buffer grows on an
+    underrun and shrinks by discarding the oldest frames once it holds
+    ``JITTER_SLACK`` frames more than the target.
+
+    Attributes
+    ----------
+    target_depth : int
+        Number of frames to hold before playing.
+    jitter : float
+        Estimated inter-arrival jitter in seconds.
+    played : int
+        Frames released in order.
+    lost : int
+        Frames missing when their turn came.
+    late : int
+        Frames that arrived after their turn and were dropped.
+    duplicates : int
+        Frames received twice.
+    discarded : int
+        Frames dropped to shrink the buffer.
+    underruns : int
+        Times the buffer ran dry while playing.
+    suppressed : int
+        Frames not sent during pauses.
+    max_occupancy : int
+        Largest number of frames held at once.
+    """
+
+    def __init__(
+        self,
+        frame_duration=FRAME_DURATION_MS / 1000,
+        min_depth=JITTER_MIN_DEPTH,
+        max_depth=JITTER_MAX_DEPTH,
+        clock=time.monotonic,
+    ):
+        """
+        Start empty.
+
+        Parameters
+        ----------
+        frame_duration : float, optional
+            Seconds of audio in one frame.
+        min_depth : int, optional
+            Smallest target depth in frames.
+        max_depth : int, optional
+            Largest target depth in frames.
+        clock : callable, optional
+            Returns the current time in seconds.
+        """
+        self.frame_duration = frame_duration
+        self.min_depth = min_depth
+        self.max_depth = max_depth
+        self.clock = clock
+        self.reset()
+
+    def reset(self):
+        """
+        Drop every frame and counter, for a new stream.
+        """
+        self.frames = {}
+        self.next_seq = None
+        self.playing = False
+        self.play_time = 0.0
+        self.last_seq = None
+        self.last_arrival = 0.0
+        self.jitter = 0.0
+        self.target_depth = self.min_depth
+        self.played = 0
+        self.lost = 0
+        self.late = 0
+        self.duplicates = 0
+        self.discarded = 0
+        self.underruns = 0
+        self.suppressed = 0
+        self.max_occupancy = 0
+        # Sequence numbers of held frames that start a pause
+        self.dtx_frames = set()
+        self.dtx = False
+
+    @property
+    def occupancy(self):
+        """
+        Number of frames held.
+        """
+        return len(self.frames)
+
+    def _distance(self, seq, base):
+        """Frames from base to seq, negative if seq comes first."""
+        diff = (seq - base) & SEQUENCE_MASK
+        return diff - (SEQUENCE_MASK + 1) if diff >= HALF_SEQUENCE else diff
+
+    def _update_jitter(self, seq, now):
+        """Update the jitter estimate and target depth with an arrival."""
+        if self.last_seq is not None:
+            spacing = self._distance(seq, self.last_seq) * self.frame_duration
+            d = (now - self.last_arrival) - spacing
+            self.jitter += (abs(d) - self.jitter) / 16
+            depth = 1 + int(
+                JITTER_FACTOR * self.jitter / self.frame_duration + 0.999
+            )
+            self.target_depth = max(self.min_depth, min(depth, self.max_depth))
+        self.last_seq = seq
+        self.last_arrival = now
+
+    def push(self, seq, frame, now=None, dtx=False):
+        """
+        Add a received frame.
+
+        Parameters
+        ----------
+        seq : int
+            Sequence number of the frame.
+        frame : bytes
+            The frame. Kept as is, so it must not be a reused buffer.
+        now : float, optional
+            Arrival time. Defaults to the clock.
+        dtx : bool, optional
+            True if the transmitter pauses after this frame.
+
+        Returns
+        -------
+        bool
+            True if the frame was added, False if it was late or a
+            duplicate.
+        """
+        if now is None:
+            now = self.clock()
+        if (
+            self.next_seq is not None
+            and abs(self._distance(seq, self.next_seq)) > RESYNC_FRAMES
+        ):
+            # The transmitter started a new stream, follow it
+            self.frames.clear()
+            self.dtx_frames.clear()
+            self.dtx = False
+            self.next_seq = None
+            self.last_seq = None
+            self.playing = False
+        self._update_jitter(seq, now)
+
+        if (
+            self.next_seq is not None
+            and self._distance(seq, self.next_seq) < 0
+        ):
+            self.late += 1
+            return False
+        if seq in self.frames:
+            self.duplicates += 1
+            return False
+        self.frames[seq] = frame
+        if dtx:
+            self.dtx_frames.add(seq)
+        if len(self.frames) > self.max_occupancy:
+            self.max_occupancy = len(self.frames)
+
+        if not self.playing and len(self.frames) >= self.target_depth:
+            self._start(now)
+        return True
+
+    def _oldest(self):
+        """Sequence number of the oldest frame held."""
+        base = self.next_seq if self.next_seq is not None else self.last_seq
+        return min(self.frames, key=lambda seq: self._distance(seq, base))
+
+    def _start(self, now):
+        """Start playing from the oldest frame held."""
+        oldest = self._oldest()
+        if self.next_seq is not None:
+            gap = self._distance(oldest, self.next_seq)
+            # Frames skipped over since the underrun
+            if gap > 0:
+                self.lost += gap
+        self.next_seq = oldest
+        self.playing = True
+        self.play_time = now
+
+    def time_to_next(self, now=None):
+        """
+        Seconds until the next frame is due.
+
+        Parameters
+        ----------
+        now : float, optional
+            The current time. Defaults to the clock.
+
+        Returns
+        -------
+        float or None
+            Seconds to wait, 0 if a frame is already due, or None while
+            the buffer is filling.
+        """
+        if not self.playing:
+            return None
+        if now is None:
+            now = self.clock()
+        return max(0.0, self.play_time - now)
+
+    def pop(self, now=None):
+        """
+        Release the frames whose turn has come.
+
+        Parameters
+        ----------
+        now : float, optional
+            The current time. Defaults to the clock.
+
+        Returns
+        -------
+        list
+            The frames in sequence order, None for each lost frame.
+        """
+        if not self.playing:
+            return []
+        if now is None:
+            now = self.clock()
+        # After a long stall, play on from now instead of in a burst
+        if now - self.play_time > self.max_depth * self.frame_duration:
+            self.play_time = now
+
+        # Shrink towards the target by dropping the oldest frames
+        while len(self.frames) > self.target_depth + JITTER_SLACK:
+            oldest = self._oldest()
+            self.frames.pop(oldest)
+            self.dtx_frames.discard(oldest)
+            self.discarded += 1
+            self.next_seq = self._oldest()
+
+        released = []
+        while self.play_time <= now:
+            if not self.frames and not self.dtx:
+                self.underruns += 1
+                self.playing = False
+                break
+            frame = self.frames.pop(self.next_seq, None)
+            if frame is not None:
+                self.played += 1
+                # A pause starts after this frame or speech has resumed
+                self.dtx = self.next_seq in self.dtx_frames
+                self.dtx_frames.discard(self.next_seq)
+            elif self.dtx:
+                self.suppressed += 1
+            else:
+                self.lost += 1
+            released.append(frame)
+            self.next_seq = (self.next_seq + 1) & SEQUENCE_MASK
+            self.play_time += self.frame_duration
+        return released
+
+    def peek(self):
+        """
+        The frame due next, without releasing it.
+
+        Returns
+        -------
+        bytes or None
+            The next frame, or None if it has not arrived.
+        """
+        if self.next_seq is None:
+            return None
+        return self.frames.get(self.next_seq)
+
+    def format(self):
+        """
+        Format the counters as one line.
+
+        Returns
+        -------
+        str
+            The depth, jitter and frame counters.
+        """
+        return (
+            f"Jitter buffer: depth {self.occupancy}/{self.target_depth} "
+            f"(max {self.max_occupancy}) | jitter "
+            f"{self.jitter * 1000:.1f} ms | played {self.played} | "
+            f"lost {self.lost} | late {self.late} | "
+            f"suppressed {self.suppressed} | "
+            f"underruns {self.underruns} | discarded {self.discarded}"
+        )
@@ -2,23 +2,63 @@
 Senior Project : Hardware Encryption Device
 Team 312
 File : key_creator.py
-Description: Utility for creating hybrid encryption keys using existing AES and RSA keys.
+Description: Utility for creating hybrid encryption keys using existing AES and RSA keys,
+    and for provisioning the AES keyring used to talk to several peers.
 """
 
+import re
+import time
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from cryptography.hazmat.primitives.asymmetric import rsa, padding
 from cryptography.hazmat.primitives import serialization, hashes
 from pathlib import Path
 from src.utils.utils import get_proj_root
+from src.utils.constants import USB_MOUNT_ROOTS, HYBRID_POOL_SIZE
 from src.logging.logger import *
 import os
 
+MOUNTINFO = "/proc/self/mountinfo"
+REQUIRED_FILES = ["aes.txt", "public_key.pem", "private_key.pem"]
+HYBRID_FILES = ["hybrid_private.pem", "hybrid_public.pem", "hybrid.txt"]
+
+
+def read_mount_points(mountinfo=MOUNTINFO, mount_roots=USB_MOUNT_ROOTS):
+    """
+    List the mounted file systems that may be USB drives.
+
+    Parameters
+    ----------
+    mountinfo : str
+        The mount table to read, /proc/self/mountinfo by default
+    mount_roots : tuple
+        Only mount points inside these folders are returned
+
+    Returns
+    -------
+    list
+        Paths of the mount points, in mount order
+    """
+    mount_points = []
+    with open(mountinfo, "r") as f:
+        for line in f:
+            fields = line.split()
+            if len(fields) < 5:
+                continue
+            # The mount point is the fifth field, with spaces escaped as \040
+            mount_point = re.sub(r"\\([0-7]{3})", lambda m: chr(int(m.group(1), 8)), fields[4])
+            if any(mount_point == root or mount_point.startswith(root.rstrip("/") + "/") for root in mount_roots):
+                mount_points.append(Path(mount_point))
+    return mount_points
+
 
 class KeyCreator:
     def __init__(self):
         """Initialize KeyCreator with project keys directory."""
         self.keys_dir = Path(get_proj_root()) / "keys"
         self.keys_dir.mkdir(exist_ok=True)
+        # Background worker creating hybrid keys and filling the key pool
+        self.executor = None
         
         # Set up logging
         self.logger: logging = Logger(
@@ -38,7 +78,9 @@ class KeyCreator:
         """
         Search USB drives and copy required key files to the Keys folder.
         If no USB is found, check if keys exist in the system.
-        After getting keys from either source, create hybrid keys.
+        After getting keys from either source, create hybrid keys. If a set
+        of hybrid keys already exists it stays in use while the new set is
+        made in the background, so startup does not wait for RSA-4096.
 
         Parameters
         ----------
@@ -50,24 +92,15 @@ class KeyCreator:
         None
             Returns None if successful, raises FileNotFoundError if files are missing
         """        
-        from string import ascii_uppercase
-        drive_options = [Path(f"{letter}:\\") for letter in ascii_uppercase]    #cycle through connected USB devices, store them in drive_options
-
-        required_files = ["aes.txt", "public_key.pem", "private_key.pem"]
-        hybrid_files = ["hybrid_private.pem", "hybrid_public.pem", "hybrid.txt"]
+        required_files = REQUIRED_FILES
+        hybrid_files = HYBRID_FILES
 
         # First check USB drives
-        for drive in drive_options:     #cycle through all USB devices
+        for drive in self.usb_drives():     #cycle through all USB devices
             missing_files = [f for f in required_files if not (drive / f).exists()]     #check if any required files are missing
             if not missing_files:
                 missing = False
-                for file in required_files:     #if no required files missing, make copies and send to the Keys folder
-                    src = drive / file
-                    dest  = self.keys_dir / file
-                    shutil.copy2(src, dest)
-                self.logger.info("Successfully copied key files from USB")
-                # Create hybrid keys after getting keys from USB
-                self.create_hybrid_keys(force=True)
+                self.copy_keys(drive)
                 return None
         
         # If no USB keys found, check system keys
@@ -79,6 +112,7 @@ class KeyCreator:
             if not hybrid_keys_exist:
                 self.logger.info("Creating hybrid keys from system keys")
                 self.create_hybrid_keys(force=True)
+            self.fill_pool_async()
             return None
         
         if missing:
@@ -88,6 +122,223 @@ class KeyCreator:
             )
         return None
 
+    def usb_drives(self):
+        """
+        List the connected drives that may hold keys.
+        On Linux these are the mounted file systems under USB_MOUNT_ROOTS,
+        on Windows the drive letters.
+
+        Returns
+        -------
+        list
+            Paths of the drives
+        """
+        if os.name == "nt":
+            from string import ascii_uppercase
+            return [Path(f"{letter}:\\") for letter in ascii_uppercase]
+        try:
+            return read_mount_points()
+        except OSError as e:
+            self.logger.warning(f"Could not read the mount table: {e}")
+            return []
+
+    def validate_key_dir(self, drive):
+        """
+        Check that a drive holds a complete and readable set of keys,
+        without copying anything.
+
+        Parameters
+        ----------
+        drive : Path
+            Folder holding the key files
+
+        Raises
+        ------
+        ValueError
+            If a required file is missing or can not be parsed
+        """
+        drive = Path(drive)
+        missing_files = [f for f in REQUIRED_FILES if not (drive / f).exists()]
+        if missing_files:
+            raise ValueError(f"Missing key files: {', '.join(missing_files)}")
+
+        key_files = [drive / "aes.txt"]
+        if (drive / "keyring").is_dir():
+            key_files += sorted((drive / "keyring").glob("*.txt"))
+        for path in key_files:
+            with open(path, "r") as f:
+                key = bytes.fromhex(f.readline().strip())
+                iv = bytes.fromhex(f.readline().strip())
+            if len(key) != 32 or len(iv) != 16:
+                raise ValueError(f"{path.name} must hold a 32 byte key and a 16 byte IV")
+
+        with open(drive / "public_key.pem", "rb") as f:
+            serialization.load_pem_public_key(f.read())
+        with open(drive / "private_key.pem", "rb") as f:
+            serialization.load_pem_private_key(f.read(), password=None)
+
+    def copy_keys(self, drive, on_hybrid_ready=None):
+        """
+        Copy the key files of a drive to the keys folder and create new hybrid keys from them.
+
+        Parameters
+        ----------
+        drive : Path
+            Folder holding the key files
+        on_hybrid_ready : callable, optional
+            Called once the new hybrid keys are written, if they are made in the background
+
+        Returns
+        -------
+        Future or None
+            The background hybrid key creation, or None if it was done right away
+        """
+        drive = Path(drive)
+        for file in REQUIRED_FILES:     #make copies and send to the Keys folder
+            src = drive / file
+            dest  = self.keys_dir / file
+            shutil.copy2(src, dest)
+        if (drive / "keyring").is_dir():     #copy the peer keys too, if the USB has any
+            shutil.copytree(drive / "keyring", self.keys_dir / "keyring", dirs_exist_ok=True)
+        self.logger.info("Successfully copied key files from USB")
+        # Create hybrid keys after getting keys from USB
+        return self.refresh_hybrid_keys(on_hybrid_ready)
+
+    def refresh_hybrid_keys(self, on_ready=None):
+        """
+        Replace the hybrid keys. If a set exists it stays in use and the new set is made in the
+        background, otherwise the new set is made right away, from the key pool when possible.
+
+        Parameters
+        ----------
+        on_ready : callable, optional
+            Called once the new hybrid keys are written in the background
+
+        Returns
+        -------
+        Future or None
+            The background creation, or None if it was done right away
+        """
+        if all((self.keys_dir / f).exists() for f in HYBRID_FILES):
+            return self.create_hybrid_keys_async(force=True, on_ready=on_ready)
+        self.create_hybrid_keys(force=True)
+        self.fill_pool_async()
+        return None
+
+    def _submit(self, function, *args):
+        """Run a function on the background key worker."""
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="KEYGEN")
+        return self.executor.submit(function, *args)
+
+    def create_hybrid_keys_async(self, force=False, on_ready=None):
+        """
+        Create hybrid keys on the background worker, then top up the key pool.
+        OpenSSL releases the GIL while it generates RSA keys, so audio and radio threads keep running.
+
+        Parameters
+        ----------
+        force : bool
+            If True, overwrites existing hybrid keys
+        on_ready : callable, optional
+            Called on the worker once the new keys are written
+
+        Returns
+        -------
+        Future
+            Completes when the hybrid keys are written
+        """
+        def create():
+            self.create_hybrid_keys(force)
+            if on_ready is not None:
+                on_ready()
+
+        future = self._submit(create)
+        self.fill_pool_async()
+        return future
+
+    @property
+    def pool_dir(self):
+        """Folder of the pre-generated RSA-4096 private keys"""
+        return self.keys_dir / "hybrid_pool"
+
+    def pool_size(self):
+        """Number of pre-generated keys ready in the pool"""
+        if not self.pool_dir.is_dir():
+            return 0
+        return len(list(self.pool_dir.glob("*.pem")))
+
+    def fill_pool(self, size=HYBRID_POOL_SIZE):
+        """
+        Generate RSA-4096 private keys until the pool holds size of them.
+        Keys are written through a temporary file, so a key is never taken half written.
+
+        Parameters
+        ----------
+        size : int
+            Number of keys to keep in the pool
+
+        Returns
+        -------
+        int
+            Number of keys generated
+        """
+        self.pool_dir.mkdir(parents=True, exist_ok=True)
+        generated = 0
+        while self.pool_size() < size:
+            private_key = rsa.generate_private_key(public_exponent=65537, key_size=4096)
+            self._write_atomic(self.pool_dir / f"{time.time_ns()}.pem", private_key.private_bytes(
+                encoding=serialization.Encoding.PEM,
+                format=serialization.PrivateFormat.PKCS8,
+                encryption_algorithm=serialization.NoEncryption()
+            ))
+            generated += 1
+        if generated:
+            self.logger.info(f"Added {generated} keys to the hybrid key pool")
+        return generated
+
+    def fill_pool_async(self, size=HYBRID_POOL_SIZE):
+        """Top up the key pool on the background worker, returns the Future"""
+        return self._submit(self.fill_pool, size)
+
+    def take_pooled_key(self):
+        """
+        Take the oldest pre-generated private key out of the pool.
+
+        Returns
+        -------
+        RSAPrivateKey or None
+            The key, or None if the pool is empty
+        """
+        if not self.pool_dir.is_dir():
+            return None
+        for path in sorted(self.pool_dir.glob("*.pem")):
+            # Renaming claims the key, another creator can not take it too
+            claimed = path.with_suffix(".taken")
+            try:
+                os.rename(path, claimed)
+            except FileNotFoundError:
+                continue
+            try:
+                # The pool only holds keys written by fill_pool, checking them again costs ~0.4 s
+                with open(claimed, "rb") as f:
+                    return serialization.load_pem_private_key(
+                        f.read(), password=None, unsafe_skip_rsa_key_validation=True
+                    )
+            except ValueError as e:
+                self.logger.warning(f"Skipping bad pooled key {path.name}: {e}")
+            finally:
+                claimed.unlink()
+        return None
+
+    @staticmethod
+    def _write_atomic(path, data):
+        """Write a file through a temporary file, so readers see the old or the new content"""
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
     def create_hybrid_keys(self, force=False):
         """
         Create hybrid encryption keys using existing AES key.
@@ -113,29 +364,29 @@ class KeyCreator:
                 aes_key = bytes.fromhex(f.readline().strip())
                 iv = bytes.fromhex(f.readline().strip())
 
-            # Generate new RSA key pair for hybrid encryption
-            private_key = rsa.generate_private_key(
-                public_exponent=65537,
-                key_size=4096
-            )
+            # Take a pre-generated RSA key pair for hybrid encryption, or generate one
+            private_key = self.take_pooled_key()
+            if private_key is None:
+                private_key = rsa.generate_private_key(
+                    public_exponent=65537,
+                    key_size=4096
+                )
             public_key = private_key.public_key()
             
             self.logger.info("Creating hybrid keys")
             
-            # Save hybrid RSA private key
-            with open(hybrid_private_path, "wb") as f:
-                f.write(private_key.private_bytes(
-                    encoding=serialization.Encoding.PEM,
-                    format=serialization.PrivateFormat.PKCS8,
-                    encryption_algorithm=serialization.NoEncryption()
-                ))
+            # Save hybrid RSA private key. Each file is replaced whole, the old set may be in use.
+            self._write_atomic(hybrid_private_path, private_key.private_bytes(
+                encoding=serialization.Encoding.PEM,
+                format=serialization.PrivateFormat.PKCS8,
+                encryption_algorithm=serialization.NoEncryption()
+            ))
 
             # Save hybrid RSA public key
-            with open(hybrid_public_path, "wb") as f:
-                f.write(public_key.public_bytes(
-                    encoding=serialization.Encoding.PEM,
-                    format=serialization.PublicFormat.SubjectPublicKeyInfo
-                ))
+            self._write_atomic(hybrid_public_path, public_key.public_bytes(
+                encoding=serialization.Encoding.PEM,
+                format=serialization.PublicFormat.SubjectPublicKeyInfo
+            ))
 
             # Encrypt AES key and IV with hybrid RSA public key
             encrypted_data = public_key.encrypt(
@@ -148,8 +399,7 @@ class KeyCreator:
             )
 
             # Save encrypted AES key and IV
-            with open(hybrid_encrypted_aes_path, "wb") as f:
-                f.write(encrypted_data)
+            self._write_atomic(hybrid_encrypted_aes_path, encrypted_data)
 
             self.logger.info("Hybrid encryption keys created successfully:")
             self.logger.info(f"- Hybrid private key: {hybrid_private_path}")
@@ -167,6 +417,46 @@ class KeyCreator:
             self.logger.error(f"Error creating hybrid keys: {e}")
             raise
 
+    def create_keyring(self, count, force=False, keyring_dir=None):
+        """
+        Provision keyring entries 1 to count, each with a new AES key and IV.
+        Entry 0 is always aes.txt. Every radio that should talk to a peer
+        needs a copy of that peer's entry, under the same key ID.
+
+        Parameters
+        ----------
+        count : int
+            Number of entries to create (at most 255).
+        force : bool
+            If True, overwrites existing entries
+        keyring_dir : Path, optional
+            Folder to write the entries to, defaults to keys/keyring
+
+        Returns
+        -------
+        list
+            Paths of the entries that were created
+        """
+        if not 0 < count <= 255:
+            raise ValueError("The keyring holds 1 to 255 entries")
+
+        keyring_dir = Path(keyring_dir) if keyring_dir else self.keys_dir / "keyring"
+        keyring_dir.mkdir(parents=True, exist_ok=True)
+
+        created = []
+        for key_id in range(1, count + 1):
+            path = keyring_dir / f"{key_id}.txt"
+            if path.exists() and not force:
+                continue
+            # Same format as aes.txt: hex key on the first line, hex IV on the second
+            with open(path, "w") as f:
+                f.write(os.urandom(32).hex() + "\n")
+                f.write(os.urandom(16).hex() + "\n")
+            created.append(path)
+
+        self.logger.info(f"Created {len(created)} keyring entries in {keyring_dir}")
+        return created
+
 
 if __name__ == "__main__":
     creator = KeyCreator()
@@ -0,0 +1,151 @@
+"""
+Senior Project : Hardware Encryption Device
+Team 312
+File : key_watcher.py
+Description: Watches for USB drives being mounted while the radio runs. When
+    a drive with a complete set of keys appears, the keys are checked,
+    copied to the keys folder and swapped into the live CryptoManager,
+    without stopping the audio.
+"""
+
+from src.utils.key_creator import KeyCreator, read_mount_points, MOUNTINFO
+from src.utils.constants import *
+from src.logging.logger import *
+
+
+class KeyWatcher:
+    """
+    Polls the Linux mount table for new USB drives holding keys.
+
+    Polling ``/proc/self/mountinfo`` costs one small file read per
+    interval and needs no extra packages. Everything runs on the watcher
+    thread: reading and checking the files, copying them and loading the
+    new keys. The hybrid keys follow from the key creator's background
+    worker. The audio threads only see the final swaps.
+
+    Attributes
+    ----------
+    mounts : set
+        Mount points seen on the last poll.
+    installed : list
+        Mount points whose keys were installed, in order.
+    """
+
+    def __init__(
+        self,
+        crypto_manager,
+        key_creator=None,
+        mountinfo=MOUNTINFO,
+        mount_roots=USB_MOUNT_ROOTS,
+        interval=KEY_WATCH_INTERVAL,
+    ):
+        """
+        Record the drives that are already mounted.
+
+        Drives mounted before the watcher starts are handled by
+        ``KeyCreator.verify_base_keys_exist`` at startup.
+
+        Parameters
+        ----------
+        crypto_manager : CryptoManager
+            The live manager to swap the keys into.
+        key_creator : KeyCreator, optional
+            Used to check and copy the keys. Created on first use.
+        mountinfo : str, optional
+            The mount table to poll.
+        mount_roots : tuple, optional
+            Folders USB drives are mounted under.
+        interval : float, optional
+            Seconds between polls.
+        """
+        self.logger: logging = Logger(
+            "KeyWatcher",
+            console_level=logging.INFO,
+            console_logging=EN_CONSOLE_LOGGING,
+        )
+        self.crypto_manager = crypto_manager
+        self.key_creator = key_creator
+        self.mountinfo = mountinfo
+        self.mount_roots = mount_roots
+        self.interval = interval
+        self.mounts = set(self._read_mounts())
+        self.installed = []
+
+    def _read_mounts(self):
+        """List the current USB mount points, empty if unreadable."""
+        try:
+            return read_mount_points(self.mountinfo, self.mount_roots)
+        except OSError as e:
+            self.logger.warning(f"Could not read {self.mountinfo}: {e}")
+            return []
+
+    def poll(self):
+        """
+        Check for new drives and install the keys of the first valid one.
+
+        Returns
+        -------
+        Path or None
+            The drive whose keys were installed, or None.
+        """
+        mounts = self._read_mounts()
+        new_mounts = [m for m in mounts if m not in self.mounts]
+        self.mounts = set(mounts)
+
+        for mount in new_mounts:
+            if self.install(mount):
+                return mount
+        return None
+
+    def install(self, drive):
+        """
+        Check the keys of a drive, copy them and make them live.
+
+        Parameters
+        ----------
+        drive : Path
+            Folder holding the key files.
+
+        Returns
+        -------
+        bool
+            True if the keys were installed.
+        """
+        if self.key_creator is None:
+            self.key_creator = KeyCreator()
+        try:
+            self.key_creator.validate_key_dir(drive)
+        except (OSError, ValueError) as e:
+            self.logger.info(f"Ignoring {drive}: {e}")
+            return False
+
+        try:
+            # The hybrid keys are made in the background and swapped in
+            # with a second reload when they are ready
+            self.key_creator.copy_keys(
+                drive, on_hybrid_ready=self.crypto_manager.reload_keys
+            )
+        except Exception as e:
+            self.logger.error(f"Could not copy the keys from {drive}: {e}")
+            return False
+        if not self.crypto_manager.reload_keys():
+            return False
+
+        self.installed.append(drive)
+        self.logger.info(f"Keys from {drive} are live.")
+        return True
+
+    def run(self, stop_event):
+        """
+        Poll until the stop event is set. Target of the watcher thread.
+
+        Parameters
+        ----------
+        stop_event : threading.Event
+            Event to signal stopping the watcher.
+        """
+        while not stop_event.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                self.logger.error(f"Key watcher error: {e}")
@@ -0,0 +1,136 @@
+"""
+Senior Project : Hardware Encryption Device
+Team 312
+File : latency.py
+Description: Latency histograms for the real-time audio path. Samples are
+    counted in power of two microsecond buckets, so recording one is a few
+    integer operations and the histogram never grows.
+"""
+
+from time import perf_counter
+
+# Bucket i counts samples below 2**i µs, the last bucket everything above
+NUM_BUCKETS = 20
+
+
+class LatencyHistogram:
+    """
+    Histogram of operation latencies.
+
+    Attributes
+    ----------
+    name : str
+        Label printed with the histogram.
+    counts : list of int
+        Number of samples per bucket.
+    count : int
+        Total number of samples.
+    total : float
+        Sum of all samples in seconds.
+    max : float
+        Largest sample in seconds.
+    """
+
+    def __init__(self, name=""):
+        """
+        Start an empty histogram.
+
+        Parameters
+        ----------
+        name : str, optional
+            Label printed with the histogram.
+        """
+        self.name = name
+        self.reset()
+
+    def reset(self):
+        """
+        Remove all samples.
+        """
+        self.counts = [0] * NUM_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        """
+        Add a sample.
+
+        Parameters
+        ----------
+        seconds : float
+            The measured latency.
+        """
+        bucket = int(seconds * 1e6).bit_length()
+        self.counts[min(bucket, NUM_BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def time(self, function, *args):
+        """
+        Call a function and record how long it took.
+
+        Returns
+        -------
+        object
+            What the function returned.
+        """
+        start_time = perf_counter()
+        result = function(*args)
+        self.record(perf_counter() - start_time)
+        return result
+
+    @property
+    def mean_us(self):
+        """
+        Mean latency in microseconds, 0 if there are no samples.
+        """
+        return self.total / self.count * 1e6 if self.count else 0.0
+
+    def percentile_us(self, percent):
+        """
+        Estimate a percentile of the latency.
+
+        Parameters
+        ----------
+        percent : float
+            The percentile, 0 to 100.
+
+        Returns
+        -------
+        int
+            Upper bound in microseconds of the bucket holding the
+            percentile, 0 if there are no samples.
+        """
+        target = percent / 100 * self.count
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= target:
+                return 1 << bucket
+        return 0
+
+    def format(self):
+        """
+        Format the histogram as text, one line per non-empty bucket.
+
+        Returns
+        -------
+        str
+            A summary line followed by the buckets with a bar each.
+        """
+        lines = [
+            f"{self.name}: {self.count} samples | mean {self.mean_us:.1f} µs | "
+            f"p50 <{self.percentile_us(50)} µs | "
+            f"p99 <{self.percentile_us(99)} µs | "
+            f"max {self.max * 1e6:.1f} µs"
+        ]
+        largest = max(self.counts)
+        for bucket, count in enumerate(self.counts):
+            if not count:
+                continue
+            bar = "#" * max(1, round(40 * count / largest))
+            lines.append(f"  <{1 << bucket:>7} µs {count:>8} {bar}")
+        return "\n".join(lines)
@@ -0,0 +1,256 @@
+"""
+Senior Project : Hardware Encryption Device
+Team 312
+File : recorder.py
+Description: Streaming recorder. Audio read from the input stream is handed
+    to a writer thread through a bounded queue, and the writer encodes and
+    writes it to disk in batches. Memory stays constant however long the
+    recording runs, a crash only loses the last batch, and a slow disk
+    never blocks the input stream.
+"""
+
+import queue
+import struct
+import threading
+import wave
+
+from src.utils.constants import RECORDER_QUEUE_SIZE, RECORDER_BATCH_SIZE
+from src.logging.logger import *
+
+
+class WaveSink:
+    """
+    Write audio to a WAV file.
+
+    The WAV header is updated after every batch, so the file can be played
+    up to the last batch even if the recording never finishes.
+    """
+
+    def __init__(self, path, channels, sample_width, sample_rate):
+        """
+        Open the WAV file.
+
+        Parameters
+        ----------
+        path : str
+            Path of the WAV file.
+        channels : int
+            Number of audio channels.
+        sample_width : int
+            Bytes per sample.
+        sample_rate : int
+            Frames per second.
+        """
+        self.f = open(path, "wb")
+        self.wf = wave.open(self.f, "wb")
+        self.wf.setnchannels(channels)
+        self.wf.setsampwidth(sample_width)
+        self.wf.setframerate(sample_rate)
+
+    def write(self, data):
+        """Add audio frames to the file."""
+        self.wf.writeframes(data)
+
+    def flush(self):
+        """Push the written frames to the disk."""
+        self.f.flush()
+
+    def close(self):
+        """Finish the WAV header and close the file."""
+        self.wf.close()
+        self.f.close()
+
+
+class OpusSink:
+    """
+    Encode audio with Opus and write the frames to a file.
+
+    Each frame is written as its length (2 bytes) followed by the Opus
+    data, the format read by ``AudioManager.play_encoded_audio``.
+    """
+
+    def __init__(self, path, encoder, frame_size, frame_bytes):
+        """
+        Open the output file.
+
+        Parameters
+        ----------
+        path : str
+            Path of the output file.
+        encoder : opuslib.Encoder
+            The encoder, only used from the writer thread.
+        frame_size : int
+            Samples per channel in each Opus frame.
+        frame_bytes : int
+            Bytes per audio frame (channels * sample width).
+        """
+        self.f = open(path, "wb")
+        self.encoder = encoder
+        self.frame_size = frame_size
+        self.block = frame_size * frame_bytes
+        self.buffer = bytearray()
+        self.frames = 0
+
+    def write(self, data):
+        """Encode and write every whole Opus frame of the audio."""
+        self.buffer += data
+        start = 0
+        while len(self.buffer) - start >= self.block:
+            self._write_frame(bytes(self.buffer[start : start + self.block]))
+            start += self.block
+        del self.buffer[:start]
+
+    def _write_frame(self, pcm):
+        """Encode one frame and write it with its length."""
+        encoded = self.encoder.encode(pcm, self.frame_size)
+        self.f.write(struct.pack("H", len(encoded)))
+        self.f.write(encoded)
+        self.frames += 1
+
+    def flush(self):
+        """Push the written frames to the disk."""
+        self.f.flush()
+
+    def close(self):
+        """Encode the last partial frame, padded with silence, and close."""
+        if self.buffer:
+            self._write_frame(bytes(self.buffer.ljust(self.block, b"\x00")))
+            self.buffer.clear()
+        self.f.close()
+
+
+class StreamRecorder:
+    """
+    Hand recorded audio to a writer thread.
+
+    ``write`` only puts the chunk in a bounded queue and never waits. The
+    writer thread collects ``batch_size`` chunks, writes them to the sink
+    as one block and flushes it. If the disk falls so far behind that the
+    queue is full, chunks are dropped and counted instead of stalling the
+    input stream.
+
+    Attributes
+    ----------
+    queued : int
+        Chunks handed to the writer.
+    dropped : int
+        Chunks dropped because the queue was full.
+    written : int
+        Chunks written to the sink.
+    batches : int
+        Number of batches written and flushed.
+    max_queued : int
+        Largest number of chunks that were waiting at once.
+    error : Exception or None
+        The error that stopped the writer, if any.
+    """
+
+    def __init__(
+        self,
+        sink,
+        queue_size=RECORDER_QUEUE_SIZE,
+        batch_size=RECORDER_BATCH_SIZE,
+    ):
+        """
+        Start the writer thread.
+
+        Parameters
+        ----------
+        sink : object
+            Receives the audio, with ``write(data)``, ``flush()`` and
+            ``close()`` methods, e.g. a WaveSink, OpusSink or
+            ContainerWriter. Only used from the writer thread.
+        queue_size : int, optional
+            Largest number of chunks waiting for the writer.
+        batch_size : int, optional
+            Number of chunks written per flush.
+        """
+        self.logger: logging = Logger(
+            "StreamRecorder",
+            console_level=logging.INFO,
+            console_logging=EN_CONSOLE_LOGGING,
+        )
+        self.sink = sink
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.queued = 0
+        self.dropped = 0
+        self.written = 0
+        self.batches = 0
+        self.max_queued = 0
+        self.error = None
+        self.closed = False
+        self.writer = threading.Thread(
+            target=self._run, name="RECORDER", daemon=True
+        )
+        self.writer.start()
+
+    def write(self, data):
+        """
+        Queue a chunk of audio for the writer, without waiting.
+
+        Parameters
+        ----------
+        data : bytes
+            Raw audio frames.
+
+        Raises
+        ------
+        OSError
+            If the writer has stopped because the sink failed.
+        """
+        if self.error is not None:
+            raise OSError(f"Recorder stopped: {self.error}")
+        try:
+            self.queue.put_nowait(data)
+        except queue.Full:
+            self.dropped += 1
+            return
+        self.queued += 1
+        waiting = self.queue.qsize()
+        if waiting > self.max_queued:
+            self.max_queued = waiting
+
+    def _run(self):
+        """Writer thread: write and flush the queued chunks in batches."""
+        batch = []
+        while True:
+            data = self.queue.get()
+            if data is not None:
+                batch.append(data)
+                if len(batch) < self.batch_size:
+                    continue
+            if batch and self.error is None:
+                try:
+                    self.sink.write(b"".join(batch))
+                    self.sink.flush()
+                    self.written += len(batch)
+                    self.batches += 1
+                except Exception as e:
+                    # Keep emptying the queue so the input never blocks
+                    self.logger.error(f"Recording write failed: {e}")
+                    self.error = e
+            batch = []
+            if data is None:
+                return
+
+    def close(self):
+        """
+        Write the queued audio and close the sink.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(None)
+        self.writer.join()
+        self.sink.close()
+        if self.dropped:
+            self.logger.warning(
+                f"{self.dropped} chunks dropped, the disk was too slow."
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,121 @@
+"""
+Senior Project : Hardware Encryption Device
+Team 312
+File : ring_buffer.py
+Description: Preallocated byte ring buffer shared by one producer and one
+    consumer thread without a lock, used between the PortAudio callbacks
+    and the encode and decode loops.
+"""
+
+
+class RingBuffer:
+    """
+    Single producer, single consumer byte ring buffer without locks.
+
+    The producer only ever advances ``write_pos`` and the consumer only
+    ever advances ``read_pos``. Both count bytes since the start and are
+    never wrapped, so each side sees how much it may use from the two
+    positions alone. Data is copied in before the position that publishes
+    it is stored, and storing an attribute is atomic under the GIL, so
+    neither side can see a half written block or take a lock the other
+    holds.
+
+    Attributes
+    ----------
+    capacity : int
+        Size of the buffer in bytes.
+    write_pos : int
+        Bytes written since the start.
+    read_pos : int
+        Bytes read since the start.
+    """
+
+    def __init__(self, capacity):
+        """
+        Allocate the buffer.
+
+        Parameters
+        ----------
+        capacity : int
+            Size of the buffer in bytes.
+        """
+        self.capacity = capacity
+        self.buffer = bytearray(capacity)
+        self.view = memoryview(self.buffer)
+        self.write_pos = 0
+        self.read_pos = 0
+
+    def reset(self):
+        """
+        Empty the buffer. Only safe while neither side is running.
+        """
+        self.write_pos = 0
+        self.read_pos = 0
+
+    @property
+    def available(self):
+        """
+        Bytes waiting to be read.
+        """
+        return self.write_pos - self.read_pos
+
+    @property
+    def space(self):
+        """
+        Bytes that can be written without overwriting unread data.
+        """
+        return self.capacity - (self.write_pos - self.read_pos)
+
+    def write(self, data):
+        """
+        Copy as much of the data as fits into the buffer. Producer only.
+
+        Parameters
+        ----------
+        data : bytes-like
+            The data to add.
+
+        Returns
+        -------
+        int
+            Bytes written, less than ``len(data)`` if the buffer is full.
+        """
+        write_pos = self.write_pos
+        count = min(len(data), self.capacity - (write_pos - self.read_pos))
+        if count <= 0:
+            return 0
+        start = write_pos % self.capacity
+        first = min(count, self.capacity - start)
+        self.view[start : start + first] = data[:first]
+        if count > first:
+            self.view[: count - first] = data[first:count]
+        # Publish the data to the consumer
+        self.write_pos = write_pos + count
+        return count
+
+    def read_into(self, out):
+        """
+        Move as much data as fits into a buffer. Consumer only.
+
+        Parameters
+        ----------
+        out : memoryview
+            Writable buffer receiving the data.
+
+        Returns
+        -------
+        int
+            Bytes read, less than ``len(out)`` if the buffer ran empty.
+        """
+        read_pos = self.read_pos
+        count = min(len(out), self.write_pos - read_pos)
+        if count <= 0:
+            return 0
+        start = read_pos % self.capacity
+        first = min(count, self.capacity - start)
+        out[:first] = self.view[start : start + first]
+        if count > first:
+            out[first:count] = self.view[: count - first]
+        # Hand the space back to the producer
+        self.read_pos = read_pos + count
+        return count
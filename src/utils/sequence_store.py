@@ -0,0 +1,118 @@
+"""
+Senior Project : Hardware Encryption Device
+Team 312
+File : sequence_store.py
+Description: High-water mark of the transmitted frame sequence numbers,
+    kept in the keys folder so a radio never sends two frames with the
+    same sequence number under the same key, even across restarts.
+"""
+
+import os
+
+from src.utils.constants import SEQUENCE_LEASE, SEQUENCE_MASK
+
+
+class SequenceStore:
+    """
+    Persists how far the transmit sequence number may run.
+
+    Frame nonces are built from the key, the key ID and the sequence
+    number, so a sequence number sent twice under the same key reuses a
+    nonce. Starting at a random value does not prevent this: over a
+    32-bit counter two restarts collide after a few tens of thousands of
+    starts. Instead the store keeps a mark on disk that is always ahead
+    of every sequence number sent, and a restart carries on from it.
+
+    The mark is moved ``lease`` frames ahead of the current frame whenever
+    half of the lease has been used, so the file is written once every
+    ``lease / 2`` frames and a crash only skips unused numbers. Each write
+    goes to a temporary file that replaces the old one, so a power cut
+    leaves either the old or the new mark.
+
+    Attributes
+    ----------
+    path : str
+        The file holding the mark.
+    lease : int
+        Sequence numbers reserved ahead of the current one.
+    mark : int
+        The stored mark, above every sequence number sent.
+    base : int
+        Sequence number the mark was last moved at.
+    """
+
+    def __init__(self, path, lease=SEQUENCE_LEASE):
+        """
+        Set up the store. Nothing is read until ``start``.
+
+        Parameters
+        ----------
+        path : str or Path
+            The file holding the mark.
+        lease : int, optional
+            Sequence numbers reserved by every write.
+        """
+        self.path = str(path)
+        self.lease = lease
+        self.mark = 0
+        self.base = 0
+
+    def load(self):
+        """
+        Read the stored mark.
+
+        Returns
+        -------
+        int or None
+            The mark, or None if there is no readable file.
+        """
+        try:
+            with open(self.path, "r") as f:
+                return int(f.read().strip()) & SEQUENCE_MASK
+        except (OSError, ValueError):
+            return None
+
+    def start(self):
+        """
+        Get the first sequence number of this run and reserve a lease.
+
+        Without a stored mark, for example on the first run, the radio
+        starts at a random sequence number.
+
+        Returns
+        -------
+        int
+            The first sequence number to transmit.
+        """
+        seq = self.load()
+        if seq is None:
+            seq = int.from_bytes(os.urandom(4), "big")
+        self._reserve(seq)
+        return seq
+
+    def claim(self, seq):
+        """
+        Make sure a sequence number is below the stored mark.
+
+        Called for every transmitted frame. It only writes the file when
+        half of the lease has been used.
+
+        Parameters
+        ----------
+        seq : int
+            The sequence number about to be sent.
+        """
+        if (seq - self.base) & SEQUENCE_MASK >= self.lease // 2:
+            self._reserve(seq)
+
+    def _reserve(self, seq):
+        """Store a mark ``lease`` frames ahead of ``seq``."""
+        mark = (seq + self.lease) & SEQUENCE_MASK
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(f"{mark}\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self.base = seq
+        self.mark = mark
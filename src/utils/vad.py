@@ -0,0 +1,148 @@
+"""
+Senior Project : Hardware Encryption Device
+Team 312
+File : vad.py
+Description: Energy based voice activity detection for the transmitter.
+    Frames are compared against a running estimate of the background
+    noise, so the transmitter can stop sending during pauses in speech
+    and the receiver can fill them with comfort noise instead.
+"""
+
+from collections import deque
+
+import numpy as np
+
+from src.utils.constants import (
+    FRAME_DURATION_MS,
+    OPUS_DTX_BYTES,
+    VAD_MIN_RMS,
+    VAD_NOISE_RATIO,
+    VAD_NOISE_WINDOW_MS,
+    VAD_HANGOVER_MS,
+)
+
+
+def frame_rms(data):
+    """
+    Level of a block of 16-bit audio.
+
+    Parameters
+    ----------
+    data : bytes
+        Raw 16-bit audio frames.
+
+    Returns
+    -------
+    float
+        The root mean square of the samples.
+    """
+    audio_data = np.frombuffer(data, dtype=np.int16)
+    if not audio_data.size:
+        return 0.0
+    return float(np.sqrt(np.mean(np.square(audio_data.astype(np.float32)))))
+
+
+class VoiceActivityDetector:
+    """
+    Decide frame by frame whether the operator is speaking.
+
+    The noise floor is the quietest frame level of the last ``window``
+    frames (minimum statistics), so it follows a changing background
+    without rising during speech, which always has short dips. A frame is
+    speech if its level is ``ratio`` times the noise floor, and the
+    decision is held for ``hangover`` frames after speech ends so the
+    quiet ends of words are still sent.
+
+    Attributes
+    ----------
+    noise_rms : float
+        Estimated level of the background noise.
+    frames : int
+        Frames checked.
+    speech_frames : int
+        Frames found to be speech, including the hangover.
+    pause_frames : int
+        Consecutive silent frames up to the last one, 0 during speech.
+    """
+
+    def __init__(
+        self,
+        min_rms=VAD_MIN_RMS,
+        ratio=VAD_NOISE_RATIO,
+        window=VAD_NOISE_WINDOW_MS // FRAME_DURATION_MS,
+        hangover=VAD_HANGOVER_MS // FRAME_DURATION_MS,
+    ):
+        """
+        Start with no noise estimate.
+
+        Parameters
+        ----------
+        min_rms : float, optional
+            Lowest noise floor, below it everything is background.
+        ratio : float, optional
+            Level above the noise floor that counts as speech.
+        window : int, optional
+            Frames the noise floor is taken over.
+        hangover : int, optional
+            Frames still sent after speech ends.
+        """
+        self.min_rms = min_rms
+        self.ratio = ratio
+        self.hangover = hangover
+        self.levels = deque(maxlen=window)
+        self.reset()
+
+    def reset(self):
+        """
+        Forget the noise estimate and counters, for a new transmission.
+        """
+        self.levels.clear()
+        self.noise_rms = self.min_rms
+        self.hold = 0
+        self.frames = 0
+        self.speech_frames = 0
+        self.pause_frames = 0
+
+    def is_speech(self, data, encoded=None):
+        """
+        Check a captured frame.
+
+        Parameters
+        ----------
+        data : bytes
+            The raw frame.
+        encoded : bytes, optional
+            The frame encoded with Opus. An Opus DTX frame is always
+            silence.
+
+        Returns
+        -------
+        bool
+            True if the frame should be sent.
+        """
+        level = frame_rms(data)
+        self.frames += 1
+        # Compared against the noise of the frames before it
+        speech = level >= self.ratio * self.noise_rms and not (
+            encoded is not None and len(encoded) <= OPUS_DTX_BYTES
+        )
+        self.levels.append(max(level, self.min_rms))
+        self.noise_rms = min(self.levels)
+
+        if speech:
+            self.hold = self.hangover
+        elif self.hold:
+            self.hold -= 1
+        else:
+            self.pause_frames += 1
+            return False
+        self.speech_frames += 1
+        self.pause_frames = 0
+        return True
+
+    @property
+    def activity(self):
+        """
+        Fraction of frames found to be speech.
+        """
+        return self.speech_frames / self.frames if self.frames else 0.0
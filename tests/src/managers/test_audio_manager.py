@@ -1,6 +1,11 @@
+import os
+import time
+import wave
+import tracemalloc
 import pytest
 from src.managers.thread_manager import ThreadManager
-from src.managers.audio_manager import AudioManager
+from src.managers.audio_manager import AudioManager, PATH
+from src.utils.utils import get_proj_root
 
 
 @pytest.fixture()
@@ -15,3 +20,310 @@ def audio_manager():
 
 def test_creation(audio_manager):
     assert audio_manager is not None
+
+
+@pytest.fixture()
+def wav_file(audio_manager):
+    """A 16 MB WAV file in the audio files folder, removed afterwards"""
+    output_dir = os.path.join(get_proj_root(), PATH)
+    os.makedirs(output_dir, exist_ok=True)
+    names = {
+        "input": "stream_test.wav",
+        "encrypted": "stream_test.bin",
+        "encrypted_stream": "stream_test_stream.bin",
+        "decrypted": "stream_test_decrypted.wav",
+    }
+    paths = {
+        key: os.path.join(output_dir, name) for key, name in names.items()
+    }
+
+    with wave.open(paths["input"], "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(48000)
+        for _ in range(16):
+            wf.writeframes(os.urandom(1024 * 1024))
+
+    yield names, paths
+    for path in paths.values():
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def read_frames(path):
+    with wave.open(path, "rb") as wf:
+        return wf.readframes(wf.getnframes())
+
+
+def measure(function, *args):
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    result = function(*args)
+    duration = time.perf_counter() - start_time
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, duration, peak
+
+
+def test_stream_file_encryption(audio_manager, wav_file, capfd):
+    names, paths = wav_file
+    size_mb = os.path.getsize(paths["input"]) / (1024 * 1024)
+
+    # Whole-file and streamed encryption write the same file
+    _, whole_time, whole_peak = measure(
+        audio_manager.encrypt_file, names["input"], names["encrypted"]
+    )
+    mb_per_sec, stream_time, stream_peak = measure(
+        audio_manager.encrypt_file_stream,
+        names["input"],
+        names["encrypted_stream"],
+    )
+    assert read_file(paths["encrypted_stream"]) == read_file(
+        paths["encrypted"]
+    )
+    assert mb_per_sec > 0
+
+    _, decrypt_time, decrypt_peak = measure(
+        audio_manager.decrypt_audio_file_stream,
+        names["encrypted_stream"],
+        names["decrypted"],
+    )
+    assert read_frames(paths["decrypted"]) == read_file(paths["input"])
+
+    # Memory stays at a few blocks instead of copies of the file
+    assert stream_peak < 1024 * 1024
+    assert decrypt_peak < 1024 * 1024
+    assert whole_peak > 2 * size_mb * 1024 * 1024
+
+    with capfd.disabled():
+        print(f"\n--- Streamed file encryption ({size_mb:.0f} MB) ---")
+        for label, duration, peak in (
+            ("whole file encrypt", whole_time, whole_peak),
+            ("streamed encrypt", stream_time, stream_peak),
+            ("streamed decrypt", decrypt_time, decrypt_peak),
+        ):
+            print(
+                f"{label:>18}: {size_mb / duration:7.1f} MB/s | "
+                f"peak {peak / 1024:8.0f} KB"
+            )
+
+
+def test_stream_hybrid_file_encryption(audio_manager, wav_file, capfd):
+    names, paths = wav_file
+    size_mb = os.path.getsize(paths["input"]) / (1024 * 1024)
+    # Load the hybrid key first so it is not part of the timing
+    audio_manager.crypto_manager.hybrid_cipher
+
+    _, whole_time, whole_peak = measure(
+        audio_manager.encrypt_hybrid_file, names["input"], names["encrypted"]
+    )
+    _, stream_time, stream_peak = measure(
+        audio_manager.encrypt_hybrid_file_stream,
+        names["input"],
+        names["encrypted_stream"],
+    )
+    assert read_file(paths["encrypted_stream"]) == read_file(
+        paths["encrypted"]
+    )
+
+    _, decrypt_time, decrypt_peak = measure(
+        audio_manager.decrypt_hybrid_audio_file_stream,
+        names["encrypted_stream"],
+        names["decrypted"],
+    )
+    assert read_frames(paths["decrypted"]) == read_frames(paths["input"])
+    assert stream_peak < 1024 * 1024
+    assert decrypt_peak < 1024 * 1024
+
+    with capfd.disabled():
+        print(f"\n--- Streamed hybrid file encryption ({size_mb:.0f} MB) ---")
+        for label, duration, peak in (
+            ("whole file encrypt", whole_time, whole_peak),
+            ("streamed encrypt", stream_time, stream_peak),
+            ("streamed decrypt", decrypt_time, decrypt_peak),
+        ):
+            print(
+                f"{label:>18}: {size_mb / duration:7.1f} MB/s | "
+                f"peak {peak / 1024:8.0f} KB"
+            )
+
+
+def test_stream_rsa_file_encryption(audio_manager, wav_file):
+    names, paths = wav_file
+
+    # The envelope is written and read block by block
+    _, _, encrypt_peak = measure(
+        audio_manager.encrypt_rsa_file, names["input"], names["encrypted"]
+    )
+    _, _, decrypt_peak = measure(
+        audio_manager.decrypt_rsa_audio_file,
+        names["encrypted"],
+        names["decrypted"],
+    )
+    assert read_frames(paths["decrypted"]) == read_frames(paths["input"])
+    assert encrypt_peak < 1024 * 1024
+    assert decrypt_peak < 1024 * 1024
+
+    # A modified file leaves no decrypted audio behind
+    with open(paths["encrypted"], "r+b") as f:
+        f.seek(-100, os.SEEK_END)
+        byte = f.read(1)
+        f.seek(-100, os.SEEK_END)
+        f.write(bytes([byte[0] ^ 0x01]))
+    os.remove(paths["decrypted"])
+    audio_manager.decrypt_rsa_audio_file(
+        names["encrypted"], names["decrypted"]
+    )
+    assert not os.path.exists(paths["decrypted"])
+
+
+def test_parallel_file_encryption(audio_manager, wav_file, capfd):
+    names, paths = wav_file
+    size_mb = os.path.getsize(paths["input"]) / (1024 * 1024)
+    frames = read_frames(paths["input"])
+    # Load the key first so it is not part of the timing
+    audio_manager.crypto_manager.cipher
+
+    results = {}
+    for workers in (1, 2, 4):
+        results[workers] = audio_manager.encrypt_file_parallel(
+            names["input"], names["encrypted"], workers=workers
+        )
+        assert results[workers] > 0
+    audio_manager.decrypt_audio_file_parallel(
+        names["encrypted"], names["decrypted"]
+    )
+    assert read_frames(paths["decrypted"]) == frames
+
+    # Decryption can start at any segment
+    segment_size = audio_manager.crypto_manager.unpack_segment_header(
+        read_file(paths["encrypted"])
+    )["segment_size"]
+    audio_manager.decrypt_audio_file_parallel(
+        names["encrypted"], names["decrypted"], start_segment=10
+    )
+    assert read_frames(paths["decrypted"]) == frames[10 * segment_size :]
+
+    with capfd.disabled():
+        print(
+            f"\n--- Parallel file encryption ({size_mb:.0f} MB, "
+            f"{os.cpu_count()} CPUs) ---"
+        )
+        for workers, mb_per_sec in results.items():
+            print(
+                f"{workers} workers: {mb_per_sec:7.1f} MB/s | "
+                f"speedup {mb_per_sec / results[1]:4.2f}x"
+            )
+
+
+def test_container_seek(audio_manager, wav_file, capfd):
+    names, paths = wav_file
+    frames = read_frames(paths["input"])
+    # 16 MB of 48 kHz mono audio is close to three minutes
+    duration = len(frames) / 2 / 48000
+
+    audio_manager.encrypt_file_container(names["input"], names["encrypted"])
+
+    start_time = time.perf_counter()
+    audio_manager.decrypt_audio_file_chunked(
+        names["encrypted"], names["decrypted"]
+    )
+    full_time = time.perf_counter() - start_time
+    assert read_frames(paths["decrypted"]) == frames
+
+    start_time = time.perf_counter()
+    audio_manager.decrypt_audio_file_chunked(
+        names["encrypted"], names["decrypted"], start=120.5, end=122.25
+    )
+    seek_time = time.perf_counter() - start_time
+    first, last = int(120.5 * 48000) * 2, int(122.25 * 48000) * 2
+    assert read_frames(paths["decrypted"]) == frames[first:last]
+    assert seek_time < full_time
+
+    with capfd.disabled():
+        print(f"\n--- Container seek ({duration:.0f} s of audio) ---")
+        print(f"   whole file: {full_time * 1000:8.1f} ms")
+        print(f"1.75 s at 2:00: {seek_time * 1000:8.1f} ms")
+
+
+def test_legacy_chunked_range(audio_manager, wav_file):
+    names, paths = wav_file
+    frames = read_frames(paths["input"])[: 48000 * 2 * 4]
+    chunk_bytes = audio_manager.CHUNK * 2
+
+    # The older format: a WAV of chunks encrypted one at a time
+    with wave.open(paths["encrypted"], "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(48000)
+        for i in range(0, len(frames), chunk_bytes):
+            wf.writeframes(
+                audio_manager.crypto_manager.encrypt(
+                    frames[i : i + chunk_bytes]
+                )
+            )
+
+    audio_manager.decrypt_audio_file_chunked(
+        names["encrypted"], names["decrypted"], start=1.01, end=2.5
+    )
+    first, last = int(1.01 * 48000) * 2, int(2.5 * 48000) * 2
+    assert read_frames(paths["decrypted"]) == frames[first:last]
+
+
+class FakeInputStream:
+    """Input stream returning recorded chunks, then Ctrl+C"""
+
+    def __init__(self, chunks, delay=0.0005):
+        self.chunks = iter(chunks)
+        self.delay = delay
+
+    def read(self, num_frames, exception_on_overflow=True):
+        # A microphone returns a chunk every 20 ms, here sped up 40 times
+        time.sleep(self.delay)
+        try:
+            return next(self.chunks)
+        except StopIteration:
+            raise KeyboardInterrupt
+
+    def stop_stream(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_record_audio_streams_to_disk(audio_manager, monkeypatch, capfd):
+    chunks = [os.urandom(audio_manager.CHUNK * 2) for _ in range(1500)]
+    stream = FakeInputStream(chunks)
+    monkeypatch.setattr(
+        audio_manager,
+        "open_streams",
+        lambda: setattr(audio_manager, "input_stream", stream),
+    )
+    monkeypatch.setattr(audio_manager, "close_streams", lambda: None)
+    path = os.path.join(get_proj_root(), PATH, "record_test.wav")
+
+    try:
+        tracemalloc.start()
+        audio_manager.record_audio(path)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert read_frames(path) == b"".join(chunks)
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+    # 30 s of audio is recorded without holding it in memory
+    recorded = len(chunks) * len(chunks[0])
+    assert peak < recorded / 10
+
+    with capfd.disabled():
+        print(
+            f"\n--- Recorded {recorded / 1e6:.1f} MB with a "
+            f"{peak / 1e3:.0f} KB peak of new memory ---"
+        )
@@ -1,10 +1,12 @@
 import pytest
 import time
+import math
 import sys
 from src.managers.thread_manager import ThreadManager
 from src.managers.base_audio_manager import *
 from tests.mocks.mock_base_audio_manager import *
 from src.utils.constants import *
+from src.utils.encoder_profile import ENCODER_PROFILES
 
 
 @pytest.fixture()
@@ -232,3 +234,54 @@ def test_decryption_performance(base_audio_manager, capfd):
 
     # Simple assertion to make the test pass
     assert duration > 0, "Decryption timing should be measurable"
+
+
+def test_encoder_profiles(base_audio_manager, capfd):
+    """Compare airtime and encode time of the Opus encoder profiles"""
+    with capfd.disabled():
+        print("\n--- Starting encoder profile comparison ---")
+
+    # Reference speech clip, looped for steadier timings
+    with wave.open("tests/src/audio/48k_960.wav", "rb") as wf:
+        raw_file_data = wf.readframes(wf.getnframes())
+    chunk_size = FRAME_SIZE * 2
+    chunks = [
+        raw_file_data[i : i + chunk_size]
+        for i in range(0, len(raw_file_data) - chunk_size + 1, chunk_size)
+    ] * 5
+    overhead = (
+        FRAME_HEADER_SIZE + base_audio_manager.crypto_manager.frame_overhead
+    )
+
+    results = {}
+    for name in ENCODER_PROFILES:
+        base_audio_manager.set_encoder_profile(name)
+        encoder = base_audio_manager.encoder
+        start_time = time.perf_counter()
+        frames = [encoder.encode(chunk, FRAME_SIZE) for chunk in chunks]
+        duration = time.perf_counter() - start_time
+        packets = [
+            math.ceil((len(f) + overhead) / PACKET_SIZE) for f in frames
+        ]
+        results[name] = (
+            sum(map(len, frames)) / len(frames),
+            max(map(len, frames)),
+            sum(packets) / len(packets),
+            duration * 1e6 / len(frames),
+        )
+
+    with capfd.disabled():
+        print(f"Frames: {len(chunks)} | header + crypto: {overhead} bytes")
+        print("Profile     | bytes/frame (max) | packets/frame | encode")
+        for name, (size, largest, packets, encode_us) in results.items():
+            print(
+                f"{name:<11} | {size:>6.1f} ({largest:>4})     | "
+                f"{packets:>13.2f} | {encode_us:>6.1f} µs/frame"
+            )
+        print("\n--- Ending encoder profile comparison ---")
+
+    base_audio_manager.set_encoder_profile(OPUS_PROFILE)
+    assert results["voice"][2] < results["default"][2]
+    assert results["low_airtime"][2] == 1
+    with pytest.raises(ValueError):
+        base_audio_manager.set_encoder_profile("unknown")
@@ -1,5 +1,25 @@
+import io
+import os
+import time
+import queue
+import threading
 import pytest
-from src.managers.crypto_manager import CryptoManager
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from src.managers.crypto_manager import (
+    CryptoManager,
+    KeyStore,
+    CipherBackend,
+    CipherSession,
+    KeystreamRing,
+    SessionKeySender,
+    SessionKeyring,
+    CIPHER_BACKENDS,
+    register_backend,
+)
+from src.utils.key_creator import KeyCreator
+from src.utils.latency import LatencyHistogram
+from src.utils.constants import FRAME_BUFFER_SIZE, MAX_FRAME_PAYLOAD
 
 
 @pytest.fixture()
@@ -9,3 +29,845 @@ def crypto_manager():
 
 def test_creation(crypto_manager):
     assert crypto_manager is not None
+
+
+def test_session_round_trip(crypto_manager):
+    frames = [os.urandom(size) for size in (3, 40, 97, 120, 160, 17)]
+
+    tx_session = crypto_manager.open_session(encrypt=True)
+    rx_session = crypto_manager.open_session(encrypt=False)
+    encrypted = [tx_session.update(f, seq) for seq, f in enumerate(frames)]
+    decrypted = [rx_session.update(f, seq) for seq, f in enumerate(encrypted)]
+    tx_session.close()
+    rx_session.close()
+
+    assert decrypted == frames
+    assert encrypted != frames
+    assert tx_session.frames == len(frames)
+
+
+def test_session_performance(crypto_manager, capfd):
+    with capfd.disabled():
+        print("\n--- Starting session performance test ---")
+
+    num_frames = 5000
+    for size in (20, 60, 120, 240):
+        frame = os.urandom(size)
+
+        # Current path: a new encryptor and finalize per frame
+        start_time = time.perf_counter()
+        for _ in range(num_frames):
+            crypto_manager.encrypt(frame)
+        per_frame_duration = time.perf_counter() - start_time
+
+        # Session path: one encryptor re-keyed per numbered frame
+        session = crypto_manager.open_session(encrypt=True)
+        start_time = time.perf_counter()
+        for seq in range(num_frames):
+            session.update(frame, seq)
+        session_duration = time.perf_counter() - start_time
+        session.close()
+
+        with capfd.disabled():
+            print(
+                f"{size:>4} byte frames | "
+                f"per-frame: {num_frames / per_frame_duration:>10.0f} frames/s "
+                f"{per_frame_duration * 1e6 / num_frames:>6.2f} µs/frame | "
+                f"session: {num_frames / session_duration:>10.0f} frames/s "
+                f"{session_duration * 1e6 / num_frames:>6.2f} µs/frame"
+            )
+
+    with capfd.disabled():
+        print("\n---  Ending session performance test  ---")
+
+    assert per_frame_duration > 0 and session_duration > 0
+
+
+def test_ctr_frames_decrypt_independently(crypto_manager):
+    crypto_manager.set_backend("ctr")
+    frames = [os.urandom(size) for size in (12, 56, 80, 133, 160)]
+    seqs = [7, 8, 9, 10, 0xFFFFFFFF]
+    tx_session = crypto_manager.open_session(encrypt=True)
+    encrypted = [
+        tx_session.update(frame, seq) for frame, seq in zip(frames, seqs)
+    ]
+
+    # Frames decrypt in any order, and a frame can be skipped entirely
+    rx_session = crypto_manager.open_session(encrypt=False)
+    for i in (4, 2, 0, 3):
+        assert rx_session.update(encrypted[i], seqs[i]) == frames[i]
+
+    # Identical data with different sequence numbers gives different ciphertext
+    assert tx_session.update(frames[0], 1) != tx_session.update(frames[0], 2)
+    tx_session.close()
+    rx_session.close()
+
+
+def test_gcm_truncated_tag(crypto_manager):
+    crypto_manager.mode_aes, crypto_manager.mode_gcm = False, True
+    frame = os.urandom(97)
+    header = b"\xa5\x5a" + (5).to_bytes(4, "big") + (105).to_bytes(2, "big")
+
+    sealed = crypto_manager.seal_frame(frame, 5, header)
+    assert len(sealed) == len(frame) + crypto_manager.tag_size
+    assert crypto_manager.frame_overhead == crypto_manager.tag_size
+    assert crypto_manager.open_frame(sealed, 5, header) == frame
+
+    # A flipped bit, the wrong sequence number or a changed header are rejected
+    corrupted = bytearray(sealed)
+    corrupted[10] ^= 0x01
+    assert crypto_manager.open_frame(bytes(corrupted), 5, header) is None
+    assert crypto_manager.open_frame(sealed, 6, header) is None
+    assert crypto_manager.open_frame(sealed, 5, header[:-1] + b"\x00") is None
+
+    # Sessions use the same per-frame functions
+    tx_session = crypto_manager.open_session(encrypt=True)
+    rx_session = crypto_manager.open_session(encrypt=False)
+    assert rx_session.update(tx_session.update(frame, 9), 9) == frame
+
+
+def test_update_into_matches_update(crypto_manager):
+    frame = os.urandom(120)
+    buf = bytearray(256)
+
+    for mode in ("mode_aes", "mode_ctr", "mode_gcm"):
+        crypto_manager.mode_aes = crypto_manager.mode_ctr = False
+        crypto_manager.mode_gcm = False
+        setattr(crypto_manager, mode, True)
+        expected = crypto_manager.open_session(encrypt=True).update(frame, 3)
+
+        written = crypto_manager.open_session(encrypt=True).update_into(
+            frame, buf, 3
+        )
+        assert bytes(buf[:written]) == expected
+
+        plain = bytearray(256)
+        rx_session = crypto_manager.open_session(encrypt=False)
+        written = rx_session.update_into(expected, plain, 3)
+        assert bytes(plain[:written]) == frame
+
+
+def test_envelope_round_trip(crypto_manager):
+    data = os.urandom(100_000)
+
+    encrypted = crypto_manager.envelope_encrypt(data)
+    assert crypto_manager.is_envelope(encrypted)
+    assert crypto_manager.envelope_decrypt(encrypted) == data
+
+    # Each call uses a fresh data key
+    assert crypto_manager.envelope_encrypt(data) != encrypted
+
+    # Modified data is rejected
+    corrupted = bytearray(encrypted)
+    corrupted[-100] ^= 0x01
+    assert crypto_manager.envelope_decrypt(bytes(corrupted)) is None
+
+    # Legacy chunked files are not mistaken for envelopes
+    assert not crypto_manager.is_envelope(
+        crypto_manager.rsa_encrypt(data[:1000])
+    )
+
+
+def test_envelope_stream(crypto_manager):
+    data = os.urandom(300_000)
+    out = io.BytesIO()
+
+    # Small blocks give the same format as the whole-buffer call
+    total = crypto_manager.envelope_encrypt_stream(
+        io.BytesIO(data).read, out.write, block_size=4096
+    )
+    encrypted = out.getvalue()
+    assert total == len(data)
+    assert crypto_manager.envelope_decrypt(encrypted) == data
+
+    out = io.BytesIO()
+    crypto_manager.envelope_decrypt_stream(
+        io.BytesIO(encrypted).read, out.write, len(encrypted), 4096
+    )
+    assert out.getvalue() == data
+
+    # A modified block or a missing tag is caught at the end
+    corrupted = bytearray(encrypted)
+    corrupted[1000] ^= 0x01
+    with pytest.raises(InvalidTag):
+        crypto_manager.envelope_decrypt_stream(
+            io.BytesIO(corrupted).read, io.BytesIO().write, len(corrupted)
+        )
+    with pytest.raises(ValueError):
+        crypto_manager.envelope_decrypt_stream(
+            io.BytesIO(encrypted[:-20]).read,
+            io.BytesIO().write,
+            len(encrypted),
+        )
+
+
+def test_envelope_performance(crypto_manager, capfd):
+    with capfd.disabled():
+        print("\n--- Starting RSA envelope performance test ---")
+
+    data = os.urandom(2 * 1024 * 1024)
+    total_mb = len(data) / (1024 * 1024)
+    results = {}
+
+    for name, encrypt, decrypt in (
+        ("per-chunk", crypto_manager.rsa_encrypt, crypto_manager.rsa_decrypt),
+        (
+            "envelope",
+            crypto_manager.envelope_encrypt,
+            crypto_manager.envelope_decrypt,
+        ),
+    ):
+        start_time = time.perf_counter()
+        encrypted = encrypt(data)
+        encrypt_duration = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        decrypted = decrypt(encrypted)
+        decrypt_duration = time.perf_counter() - start_time
+
+        assert decrypted == data
+        results[name] = (encrypt_duration, decrypt_duration, len(encrypted))
+
+    with capfd.disabled():
+        for name, (enc, dec, size) in results.items():
+            print(
+                f"{name:>9}: encrypt {enc:8.3f} s ({total_mb / enc:8.2f} MB/s) | "
+                f"decrypt {dec:8.3f} s ({total_mb / dec:8.2f} MB/s) | "
+                f"output {size / len(data):.3f}x input"
+            )
+        print("\n---  Ending RSA envelope performance test  ---")
+
+    assert results["envelope"][1] < results["per-chunk"][1]
+
+
+def test_rsa_parallel_matches_serial(crypto_manager):
+    data = os.urandom(446 * 9 + 100)
+
+    encrypted = crypto_manager.rsa_encrypt_parallel(data, workers=2)
+    assert len(encrypted) == 512 * 10
+    assert crypto_manager.rsa_decrypt(encrypted) == data
+    assert crypto_manager.rsa_decrypt_parallel(encrypted, workers=3) == data
+
+    # Streamed pieces arrive in order
+    pieces = list(crypto_manager.rsa_decrypt_stream(encrypted, workers=2))
+    assert len(pieces) > 1
+    assert b"".join(pieces) == data
+
+
+def test_rsa_parallel_performance(crypto_manager, capfd):
+    with capfd.disabled():
+        print("\n--- Starting parallel RSA performance test ---")
+
+    data = os.urandom(256 * 1024)
+    encrypted = crypto_manager.rsa_encrypt(data)
+    num_chunks = len(encrypted) // 512
+
+    start_time = time.perf_counter()
+    assert crypto_manager.rsa_decrypt(encrypted) == data
+    serial_duration = time.perf_counter() - start_time
+
+    with capfd.disabled():
+        print(
+            f"CPU cores: {os.cpu_count()} | {num_chunks} RSA-4096 chunks\n"
+            f"   serial: {serial_duration:7.3f} s"
+        )
+
+    for workers in (1, 2, 4):
+        start_time = time.perf_counter()
+        decrypted = crypto_manager.rsa_decrypt_parallel(encrypted, workers)
+        duration = time.perf_counter() - start_time
+        assert decrypted == data
+        with capfd.disabled():
+            print(
+                f"{workers} worker{'s' if workers > 1 else ' '}: "
+                f"{duration:7.3f} s | speedup {serial_duration / duration:.2f}x"
+            )
+
+    with capfd.disabled():
+        print("\n---  Ending parallel RSA performance test  ---")
+
+
+def test_key_store_shared(crypto_manager):
+    other = CryptoManager()
+
+    assert other.cipher is crypto_manager.cipher
+    assert other.private_key is crypto_manager.private_key
+    assert other.hybrid_aes_key is crypto_manager.hybrid_aes_key
+
+
+def test_startup_time(capfd):
+    with capfd.disabled():
+        print("\n--- Starting startup time test ---")
+
+    for label, rsa, hybrid in (
+        ("AES only", False, False),
+        ("RSA mode", True, False),
+        ("hybrid mode", False, True),
+        ("RSA + hybrid", True, True),
+    ):
+        KeyStore.clear()
+        start_time = time.perf_counter()
+        manager = CryptoManager()
+        manager.mode_rsa = rsa
+        manager.mode_hybrid = hybrid
+        manager.preload()
+        cold = time.perf_counter() - start_time
+
+        # A second instance reuses the keys already in the store
+        start_time = time.perf_counter()
+        manager = CryptoManager()
+        manager.mode_rsa = rsa
+        manager.mode_hybrid = hybrid
+        manager.preload()
+        warm = time.perf_counter() - start_time
+
+        with capfd.disabled():
+            print(
+                f"{label:>12}: cold {cold * 1000:7.2f} ms | "
+                f"cached {warm * 1000:6.3f} ms"
+            )
+
+    with capfd.disabled():
+        print("\n---  Ending startup time test  ---")
+
+
+@pytest.mark.parametrize("backend", ["aes", "hybrid"])
+def test_aes_frames_survive_loss(crypto_manager, backend):
+    crypto_manager.set_backend(backend)
+    frames = [os.urandom(size) for size in (40, 97, 120, 3, 160, 80)]
+
+    tx_session = crypto_manager.open_session(encrypt=True)
+    encrypted = [tx_session.update(f, seq) for seq, f in enumerate(frames)]
+    tx_session.close()
+    buf = bytearray(200)
+    rx_session = crypto_manager.open_session(encrypt=False)
+    assert rx_session.independent_frames
+    # Frame 2 is lost and the rest arrive out of order
+    for seq in (0, 1, 4, 3, 5):
+        assert rx_session.update(encrypted[seq], seq) == frames[seq]
+        written = rx_session.update_into(encrypted[seq], buf, seq)
+        assert bytes(buf[:written]) == frames[seq]
+
+    # A second transmission opens a new session, the receiver keeps its own
+    tx_session = crypto_manager.open_session(encrypt=True)
+    second = tx_session.update(frames[0], 100)
+    tx_session.close()
+    assert second != encrypted[0]
+    assert rx_session.update(second, 100) == frames[0]
+    rx_session.close()
+
+
+def test_chacha_frames_decrypt_independently(crypto_manager):
+    crypto_manager.set_backend("chacha20")
+    frames = [os.urandom(120) for _ in range(6)]
+
+    tx_session = crypto_manager.open_session(encrypt=True)
+    encrypted = [tx_session.update(f, seq) for seq, f in enumerate(frames)]
+
+    # Drop a frame and reorder the rest
+    rx_session = crypto_manager.open_session(encrypt=False)
+    assert rx_session.independent_frames
+    for seq in (5, 0, 3, 1, 4):
+        assert rx_session.update(encrypted[seq], seq) == frames[seq]
+    assert encrypted[0][:16] != encrypted[1][:16]
+
+
+def test_backend_registry(crypto_manager):
+    assert crypto_manager.backend.name == "aes"
+
+    crypto_manager.set_backend("gcm")
+    assert crypto_manager.mode_gcm and not crypto_manager.mode_aes
+    assert crypto_manager.frame_overhead == crypto_manager.tag_size
+    tx_session = crypto_manager.open_session(encrypt=True)
+    rx_session = crypto_manager.open_session(encrypt=False)
+    sealed = [tx_session.update(b"frame %d" % seq, seq) for seq in range(3)]
+    for seq in (2, 0, 1):
+        assert rx_session.update(sealed[seq], seq) == b"frame %d" % seq
+
+    # A registered backend can be selected like the built-in ones
+    register_backend(
+        CipherBackend("test", "mode_test", lambda cm, encrypt: CipherSession())
+    )
+    try:
+        crypto_manager.set_backend("test")
+        session = crypto_manager.open_session(encrypt=True)
+        assert session.update(b"frame", 0) == b"frame"
+        assert crypto_manager.backend.name == "test"
+    finally:
+        del CIPHER_BACKENDS["test"]
+
+    with pytest.raises(ValueError):
+        crypto_manager.set_backend("missing")
+
+
+@pytest.mark.parametrize("mode", ["aes", "ctr", "gcm", "chacha20"])
+def test_concurrent_tx_rx(crypto_manager, mode, capfd):
+    crypto_manager.set_backend(mode)
+    num_frames = 3000
+    frames = [os.urandom(40 + seq % 120) for seq in range(num_frames)]
+    air = queue.Queue()
+    errors = []
+
+    # Frames sent to the peer and frames received from it, each stream
+    # with its own sessions, all running at once.
+    def transmit():
+        tx_session = crypto_manager.open_session(encrypt=True)
+        for seq, frame in enumerate(frames):
+            air.put((seq, tx_session.update(frame, seq)))
+        air.put(None)
+        tx_session.close()
+
+    def receive():
+        rx_session = crypto_manager.open_session(encrypt=False)
+        while (item := air.get()) is not None:
+            seq, data = item
+            if rx_session.update(data, seq) != frames[seq]:
+                errors.append(seq)
+        rx_session.close()
+
+    def monitor():
+        for frame in frames[:500]:
+            decrypted = crypto_manager.decrypt(crypto_manager.encrypt(frame))
+            if decrypted != frame:
+                errors.append("monitor")
+
+    def loopback():
+        tx_session = crypto_manager.open_session(encrypt=True)
+        rx_session = crypto_manager.open_session(encrypt=False)
+        for seq, frame in enumerate(frames):
+            if rx_session.update(tx_session.update(frame, seq), seq) != frame:
+                errors.append("loopback")
+
+    threads = [
+        threading.Thread(target=fn)
+        for fn in (transmit, receive, monitor, loopback)
+    ]
+    start_time = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - start_time
+
+    assert errors == []
+    with capfd.disabled():
+        print(
+            f"\n{mode:>8}: {2 * num_frames + 500} frames on 4 threads in "
+            f"{duration * 1000:.1f} ms"
+        )
+
+
+def test_keyring(crypto_manager, tmp_path):
+    KeyCreator().create_keyring(3, keyring_dir=tmp_path)
+    (tmp_path / "bad.txt").write_text("not a key")
+    (tmp_path / "300.txt").write_text("00\n00\n")
+    crypto_manager.keyring_dir = str(tmp_path)
+    crypto_manager.set_backend("gcm")
+    crypto_manager.preload()
+
+    assert sorted(crypto_manager.keyring) == [0, 1, 2, 3]
+    assert crypto_manager.with_key(0) is crypto_manager
+    assert crypto_manager.with_key(2) is crypto_manager.with_key(2)
+    assert crypto_manager.with_key(2).key != crypto_manager.key
+    assert crypto_manager.with_key(4) is None
+
+    frame = os.urandom(80)
+    sealed = {
+        key_id: crypto_manager.open_session(True, key_id).update(frame, 7)
+        for key_id in (0, 1, 2, 3)
+    }
+    assert len(set(sealed.values())) == 4
+
+    rx_sessions = crypto_manager.open_sessions(encrypt=False)
+    for key_id in (3, 0, 2, 1, 3):
+        rx_session = rx_sessions.get(key_id)
+        assert rx_session.update(sealed[key_id], 7) == frame
+    # The wrong key fails authentication, an unknown one has no session
+    assert rx_sessions.get(1).update(sealed[2], 7) is None
+    assert rx_sessions.get(4) is None
+    rx_sessions.close()
+
+
+@pytest.mark.parametrize("backend", ["aes", "ctr", "gcm", "chacha20"])
+def test_key_id_separates_nonces(crypto_manager, tmp_path, backend):
+    # Two radios sharing key material, each transmitting with its own key ID
+    KeyCreator().create_keyring(2, keyring_dir=tmp_path)
+    (tmp_path / "2.txt").write_text((tmp_path / "1.txt").read_text())
+    crypto_manager.keyring_dir = str(tmp_path)
+    crypto_manager.set_backend(backend)
+    assert crypto_manager.with_key(1).key == crypto_manager.with_key(2).key
+
+    frames = [os.urandom(120), os.urandom(120)]
+    encrypted = [
+        crypto_manager.open_session(True, key_id).update(frame, 7)
+        for key_id, frame in zip((1, 2), frames)
+    ]
+
+    # The same sequence number does not give both the same keystream, in
+    # CFB mode only the first block is keystream alone
+    keystreams = [
+        bytes(a ^ b for a, b in zip(frame, data))
+        for frame, data in zip(frames, encrypted)
+    ]
+    assert keystreams[0][:16] != keystreams[1][:16]
+    if backend == "gcm":
+        # Neither frame authenticates under the other radio's nonce
+        assert crypto_manager.with_key(2).open_frame(encrypted[0], 7) is None
+    rx_sessions = crypto_manager.open_sessions(encrypt=False)
+    assert rx_sessions.get(1).update(encrypted[0], 7) == frames[0]
+    assert rx_sessions.get(2).update(encrypted[1], 7) == frames[1]
+    rx_sessions.close()
+
+
+def test_keyring_lookup_performance(crypto_manager, tmp_path, capfd):
+    with capfd.disabled():
+        print("\n--- Starting keyring lookup test ---")
+
+    KeyCreator().create_keyring(255, keyring_dir=tmp_path)
+    crypto_manager.keyring_dir = str(tmp_path)
+    crypto_manager.set_backend("ctr")
+
+    start_time = time.perf_counter()
+    crypto_manager.preload()
+    preload = time.perf_counter() - start_time
+
+    frame = os.urandom(120)
+    num_frames = 20000
+    rx_sessions = crypto_manager.open_sessions(encrypt=False)
+    for key_id in range(256):
+        rx_sessions.get(key_id)
+
+    results = {}
+    for label, key_ids in (
+        ("1 peer", [0] * num_frames),
+        ("256 peers", [seq % 256 for seq in range(num_frames)]),
+    ):
+        start_time = time.perf_counter()
+        for seq, key_id in enumerate(key_ids):
+            rx_sessions.get(key_id).update(frame, seq)
+        results[label] = (time.perf_counter() - start_time) / num_frames
+
+    with capfd.disabled():
+        print(f"Keyring preload (256 keys): {preload * 1000:.1f} ms")
+        for label, duration in results.items():
+            print(
+                f"{label:>9}: {duration * 1e6:.2f} µs/frame (lookup + decrypt)"
+            )
+        print("\n---  Ending keyring lookup test  ---")
+
+
+def test_segment_crypt_at_offset(crypto_manager):
+    nonce = os.urandom(8)
+    data = os.urandom(4096)
+    whole = crypto_manager.segment_crypt(data, nonce, 0)
+
+    # Any slice encrypts on its own to the same bytes, aligned or not
+    for start, end in ((0, 1024), (1024, 4096), (37, 1500), (4000, 4096)):
+        segment = crypto_manager.segment_crypt(data[start:end], nonce, start)
+        assert segment == whole[start:end]
+    assert crypto_manager.segment_crypt(whole, nonce, 0) == data
+
+    chunks = [data[i : i + 1000] for i in range(0, len(data), 1000)]
+    written = []
+    total = crypto_manager.transform_segments(
+        lambda size: chunks.pop(0) if chunks else b"",
+        written.append,
+        nonce,
+        workers=2,
+        segment_size=1000,
+    )
+    assert total == len(data)
+    assert b"".join(written) == whole
+
+    header = crypto_manager.pack_segment_header(nonce, 4096, (1, 2, 48000))
+    fields = crypto_manager.unpack_segment_header(header)
+    assert fields["nonce"] == nonce and fields["sample_rate"] == 48000
+    with pytest.raises(ValueError):
+        crypto_manager.unpack_segment_header(b"SD3E" + header[4:])
+
+
+@pytest.mark.parametrize("mode", ["ctr", "chacha20"])
+def test_keystream_ring_matches_session(crypto_manager, mode):
+    crypto_manager.set_backend(mode)
+    frames = [os.urandom(size) for size in (20, 120, 1275, 60) * 5]
+    start_seq = 0xFFFFFFF0
+    session = crypto_manager.open_session(encrypt=True)
+    ring = crypto_manager.open_keystream_session(start_seq, depth=4)
+    assert isinstance(ring, KeystreamRing)
+
+    # Let the producer fill the ring, then also send faster than it
+    time.sleep(0.05)
+    for i, frame in enumerate(frames):
+        seq = (start_seq + i) & 0xFFFFFFFF
+        assert ring.update(frame, seq) == session.update(frame, seq)
+
+    # A jump forward moves the ring past the skipped frames
+    for seq in (100, 101, 102):
+        assert ring.update(frames[1], seq) == session.update(frames[1], seq)
+    time.sleep(0.05)
+    assert ring.update(frames[1], 103) == session.update(frames[1], 103)
+    assert ring.hits > 0 and ring.hits + ring.misses == ring.frames
+    ring.close()
+    assert not ring.producer.is_alive()
+
+    # Modes whose output depends on the audio get a normal session
+    crypto_manager.set_backend("gcm")
+    assert isinstance(crypto_manager.open_keystream_session(0), CipherSession)
+
+
+def test_keystream_ring_gaps(crypto_manager):
+    crypto_manager.set_backend("ctr")
+    frame = os.urandom(120)
+    session = crypto_manager.open_session(encrypt=True)
+    ring = crypto_manager.open_keystream_session(0, depth=8)
+
+    # Gaps within the ring hit, a longer one only misses its first frame,
+    # and a frame behind the ring restarts it
+    expected_hits = {0: True, 3: True, 7: True, 1000: False, 1001: True}
+    expected_hits.update({500: False, 501: True, 505: True})
+    for seq, hit in expected_hits.items():
+        # Leave the producer time to fill the ring
+        time.sleep(0.05)
+        hits = ring.hits
+        assert ring.update(frame, seq) == session.update(frame, seq)
+        assert (ring.hits > hits) == hit, seq
+    ring.close()
+    session.close()
+
+
+def test_keystream_ring_bursts(crypto_manager):
+    crypto_manager.set_backend("ctr")
+    session = crypto_manager.open_session(encrypt=True)
+    ring = crypto_manager.open_keystream_session(10, depth=4, stride=3)
+
+    # Bursts of three frames, up to the largest payload, then a short
+    # burst that is off the stride until the ring restarts
+    expected_hits = {10: True, 13: True, 16: True, 22: True, 25: True}
+    expected_hits.update({27: False, 30: True, 33: True})
+    for seq, hit in expected_hits.items():
+        time.sleep(0.05)
+        payload = os.urandom(MAX_FRAME_PAYLOAD if seq == 16 else 180)
+        hits = ring.hits
+        assert ring.update(payload, seq) == session.update(payload, seq)
+        assert (ring.hits > hits) == hit, seq
+    ring.close()
+    session.close()
+
+
+def test_keystream_latency(crypto_manager, capfd):
+    crypto_manager.set_backend("ctr")
+    frame = os.urandom(120)
+    buf = bytearray(FRAME_BUFFER_SIZE)
+    num_frames = 2000
+    histograms = {}
+
+    session = crypto_manager.open_session(encrypt=True)
+    ring = crypto_manager.open_keystream_session(0)
+    for name, tx_session in (("inline", session), ("precomputed", ring)):
+        histogram = LatencyHistogram(name)
+        for seq in range(num_frames):
+            # Leave the producer time to refill, as the 20 ms frame gap does
+            if seq % 4 == 0:
+                time.sleep(0.0005)
+            histogram.time(tx_session.update_into, frame, buf, seq)
+        histograms[name] = histogram
+    ring.close()
+
+    assert histograms["precomputed"].count == num_frames
+    assert ring.hits > num_frames // 2
+
+    with capfd.disabled():
+        print("\n--- Frame encryption latency, inline vs precomputed ---")
+        for histogram in histograms.values():
+            print(histogram.format())
+        print(f"keystream hits {ring.hits} | misses {ring.misses}")
+
+
+def write_key(path):
+    key, iv = os.urandom(32), os.urandom(16)
+    path.write_text(key.hex() + "\n" + iv.hex() + "\n")
+    return key, iv
+
+
+def test_reload_keys(crypto_manager, tmp_path):
+    crypto_manager.key_file = str(tmp_path / "aes.txt")
+    crypto_manager.keyring_dir = str(tmp_path / "keyring")
+    crypto_manager.set_backend("ctr")
+    old_key, _ = write_key(tmp_path / "aes.txt")
+    frame = os.urandom(120)
+
+    tx_session = crypto_manager.open_session(encrypt=True)
+    rx_sessions = crypto_manager.open_sessions(encrypt=False)
+    old_frame = tx_session.update(frame, 1)
+    assert rx_sessions.get(0).update(old_frame, 1) == frame
+
+    generation = crypto_manager.key_generation
+    new_key, _ = write_key(tmp_path / "aes.txt")
+    # Nothing changes until the reload
+    assert crypto_manager.key == old_key
+    assert crypto_manager.reload_keys()
+    assert crypto_manager.key == new_key
+    assert crypto_manager.key_generation == generation + 1
+
+    # Open sessions keep their key, receive sessions reopen on next frame
+    assert tx_session.update(frame, 2) != crypto_manager.encrypt(frame)
+    new_frame = crypto_manager.open_session(encrypt=True).update(frame, 2)
+    assert rx_sessions.get(0).update(new_frame, 2) == frame
+
+    # A bad key file is rejected and the live keys stay
+    (tmp_path / "aes.txt").write_text("not a key\n")
+    assert not crypto_manager.reload_keys()
+    assert crypto_manager.key == new_key
+    assert crypto_manager.key_generation == generation + 1
+
+
+def test_reload_keys_while_streaming(crypto_manager, tmp_path, capfd):
+    crypto_manager.key_file = str(tmp_path / "aes.txt")
+    crypto_manager.keyring_dir = str(tmp_path / "keyring")
+    crypto_manager.set_backend("ctr")
+    keys = [write_key(tmp_path / "aes.txt")]
+    crypto_manager.preload()
+    frame = os.urandom(120)
+    stop = threading.Event()
+    sent = []
+    frame_times = []
+
+    def transmit():
+        # Same loop shape as RFManager.handle_input_stream
+        generation = crypto_manager.key_generation
+        tx_session = crypto_manager.open_session(encrypt=True)
+        seq = 0
+        while not stop.is_set():
+            start_time = time.perf_counter()
+            if crypto_manager.key_generation != generation:
+                generation = crypto_manager.key_generation
+                tx_session.close()
+                tx_session = crypto_manager.open_session(encrypt=True)
+            sent.append((seq, tx_session.update(frame, seq)))
+            frame_times.append(time.perf_counter() - start_time)
+            seq += 1
+            time.sleep(0.001)
+        tx_session.close()
+
+    thread = threading.Thread(target=transmit)
+    thread.start()
+    for _ in range(5):
+        time.sleep(0.02)
+        keys.append(write_key(tmp_path / "aes.txt"))
+        assert crypto_manager.reload_keys()
+    time.sleep(0.02)
+    stop.set()
+    thread.join()
+
+    # Every frame was sent whole, with one of the keys, in key order
+    used = []
+    for seq, encrypted in sent:
+        for i, (key, iv) in enumerate(keys):
+            nonce = iv[:7] + bytes(1) + seq.to_bytes(4, "big") + bytes(4)
+            cipher = Cipher(algorithms.AES(key), modes.CTR(nonce))
+            if cipher.decryptor().update(encrypted) == frame:
+                used.append(i)
+                break
+        else:
+            pytest.fail(f"Frame {seq} was not sent with any key")
+    assert used == sorted(used) and used[-1] == len(keys) - 1
+
+    with capfd.disabled():
+        print(
+            f"\n--- Key reload while streaming: {len(sent)} frames, "
+            f"{len(keys) - 1} reloads, slowest frame "
+            f"{max(frame_times) * 1e6:.0f} µs ---"
+        )
+
+
+def test_session_key_wrap(crypto_manager):
+    key = os.urandom(32)
+    wrapped = crypto_manager.wrap_session_key(key, 7)
+    assert crypto_manager.unwrap_session_key(wrapped, 7) == key
+
+    # A key replayed under another epoch or modified is rejected
+    with pytest.raises(ValueError):
+        crypto_manager.unwrap_session_key(wrapped, 8)
+    with pytest.raises(ValueError):
+        crypto_manager.unwrap_session_key(bytes(len(wrapped)), 7)
+
+
+def test_session_key_rotation(crypto_manager, capfd):
+    crypto_manager.set_backend("hybrid")
+    sender = crypto_manager.open_session_sender()
+    sender.interval, sender.max_frames, sender.lead = 0, 20, 5
+    receiver = crypto_manager.open_sessions(encrypt=False)
+    assert isinstance(sender, SessionKeySender)
+    assert isinstance(receiver, SessionKeyring)
+
+    histogram = LatencyHistogram("TX next_frame + encrypt")
+    epochs = []
+    for seq in range(100, 200):
+        frame = os.urandom(120)
+        start_time = time.perf_counter()
+        session_key = sender.next_frame()
+        encrypted = sender.update(frame, seq)
+        histogram.record(time.perf_counter() - start_time)
+
+        if session_key is not None:
+            receiver.receive(*session_key)
+        if not epochs or epochs[-1] != sender.key_id:
+            epochs.append(sender.key_id)
+        assert receiver.get(sender.key_id).update(encrypted, seq) == frame
+        # Frames are 20 ms apart on the air
+        time.sleep(0.005)
+
+    # Only the first frame waited for its key to be unwrapped
+    assert receiver.waits <= 1
+    assert sender.rekeys >= 3
+    assert len(epochs) == sender.rekeys + 1
+    assert all((b - a) & 0xFF == 1 for a, b in zip(epochs, epochs[1:]))
+    # Only the last SESSION_KEYS_KEPT keys are held
+    assert len(receiver.sessions) <= receiver.kept
+
+    start_time = time.perf_counter()
+    wrapped = crypto_manager.wrap_session_key(os.urandom(32), 0)
+    wrap_time = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    crypto_manager.unwrap_session_key(wrapped, 0)
+    unwrap_time = time.perf_counter() - start_time
+    sender.close()
+    receiver.close()
+
+    with capfd.disabled():
+        print("\n--- Hybrid session keys ---")
+        print(histogram.format())
+        print(
+            f"{sender.rekeys} rekeys | RSA wrap {wrap_time * 1e6:.0f} µs | "
+            f"RSA unwrap {unwrap_time * 1e6:.0f} µs (both off the frame path)"
+        )
+
+
+def test_session_key_replay(crypto_manager):
+    crypto_manager.set_backend("hybrid")
+    sender = crypto_manager.open_session_sender()
+    receiver = crypto_manager.open_sessions(encrypt=False)
+    epoch, wrapped = sender.next_frame()
+    frame = os.urandom(120)
+    encrypted = sender.update(frame, 5)
+    assert receiver.receive(epoch, wrapped)
+    assert receiver.get(epoch).update(encrypted, 5) == frame
+
+    # A replayed key frame changes nothing, a conflicting one is rejected
+    other = crypto_manager.wrap_session_key(os.urandom(32), epoch)
+    assert not receiver.receive(epoch, wrapped)
+    assert not receiver.receive(epoch, other)
+    assert receiver.rejected == 1
+    assert receiver.get(epoch).update(encrypted, 5) == frame
+
+    # A new transmission carries on with the next epoch
+    sender.close()
+    sender = crypto_manager.open_session_sender()
+    assert sender.next_frame()[0] == (epoch + 1) & 0xFF
+    sender.close()
+
+    # Once the epoch is idle, a restarted transmitter can reuse it
+    receiver.hold = 0
+    assert receiver.receive(epoch, other)
+    assert receiver.get(epoch).update(encrypted, 5) != frame
+    receiver.close()
@@ -4,6 +4,12 @@ import threading
 import queue
 import math
 import sys
+import struct
+import tracemalloc
+import random
+import numpy as np
+import opuslib
+import wave
 from unittest.mock import patch, MagicMock
 
 # Import the mock classes directly
@@ -17,6 +23,8 @@ sys.modules["spidev"].SpiDev = MockSpiDev
 from src.managers.thread_manager import ThreadManager
 from src.managers.base_audio_manager import BaseAudioManager
 from src.managers.rf_manager import RFManager
+from src.utils.jitter_buffer import JitterBuffer
+from src.utils.key_creator import KeyCreator
 from tests.mocks.mock_rfm69 import MockRFM69
 from tests.mocks.mock_base_audio_manager import MockBaseAudioManager
 from src.utils.constants import *
@@ -374,5 +382,810 @@ def test_end_to_end_transmission(
     assert total_decoded_size > 0, "No audio was decoded"
 
 
+def test_reassemble_frames(rf_manager):
+    """Test that frames are rebuilt from packets and keep their sequence number"""
+    crypto_manager = rf_manager.audio_manager.crypto_manager
+    frames = [bytes([i]) * size for i, size in enumerate((10, 52, 53, 170))]
+
+    tx_session = crypto_manager.open_session(encrypt=True)
+    packets = []
+    for seq, frame in enumerate(frames, start=40):
+        pkt_data = tx_session.update(frame, seq)
+        pkt_buffer = rf_manager._frame_header(seq, len(frame)) + pkt_data
+        req_pkts = math.ceil(len(pkt_buffer) / PACKET_SIZE)
+        pkt_buffer = pkt_buffer.ljust(req_pkts * PACKET_SIZE, b"\x00")
+        packets.append(
+            [
+                pkt_buffer[i * PACKET_SIZE : (i + 1) * PACKET_SIZE]
+                for i in range(req_pkts)
+            ]
+        )
+
+    # Lose the last packet of the third frame
+    packets[2] = packets[2][:-1]
+
+    received = []
+    for frame_packets in packets:
+        for packet in frame_packets:
+            frame = rf_manager._reassemble(packet)
+            if frame is not None:
+                # The returned views are reused, so keep a copy
+                key_id, seq, header, data, _ = frame
+                assert header[:2] == START_SEQUENCE
+                assert key_id == 0
+                received.append((seq, bytes(data)))
+
+    assert [seq for seq, _ in received] == [40, 41, 43]
+    # Frames decrypt on their own even though frame 42 was lost
+    rx_session = crypto_manager.open_session(encrypt=False)
+    for seq, data in reversed(received):
+        assert rx_session.update(data, seq) == frames[seq - 40]
+
+
+def test_reassemble_start_sequence_in_data(rf_manager):
+    """Frame data that begins a packet with a start sequence is kept"""
+
+    def frame_packets(seq, frame):
+        pkt_buffer = rf_manager._frame_header(seq, len(frame)) + frame
+        return [
+            pkt_buffer[i : i + PACKET_SIZE].ljust(PACKET_SIZE, b"\x00")
+            for i in range(0, len(pkt_buffer), PACKET_SIZE)
+        ]
+
+    def reassemble(packets):
+        received = []
+        for packet in packets:
+            frame = rf_manager._reassemble(packet)
+            if frame is not None:
+                received.append((frame[1], bytes(frame[3])))
+        return received
+
+    # The second packet begins with a start sequence and a header far from
+    # the frame's sequence number
+    frame = bytearray(range(120))
+    offset = PACKET_SIZE - FRAME_HEADER_SIZE
+    frame[offset : offset + 7] = START_SEQUENCE + bytes(5)
+    packets = frame_packets(1000, bytes(frame))
+    next_frame = bytes(range(30))
+    next_packets = frame_packets(1001, next_frame)
+
+    assert reassemble(packets + next_packets) == [
+        (1000, bytes(frame)),
+        (1001, next_frame),
+    ]
+    # The next frame still starts when the last packet was lost, even from
+    # another radio far from the lost frame's sequence number
+    assert reassemble(packets[:-1] + next_packets) == [(1001, next_frame)]
+    other_packets = frame_packets(90000, next_frame)
+    assert reassemble(packets[:-1] + other_packets) == [(90000, next_frame)]
+
+    # A chance header with a valid length but an unknown key ID is data
+    key_ids = rf_manager.audio_manager.crypto_manager.keyring
+    unknown = next(k for k in range(255, 0, -1) if k not in key_ids)
+    frame[offset : offset + 9] = struct.pack(
+        FRAME_HEADER_FORMAT, START_SEQUENCE, unknown, 7, 50
+    )
+    packets = frame_packets(1002, bytes(frame))
+    assert reassemble(packets) == [(1002, bytes(frame))]
+
+    # The rest of a frame arriving after BUFFER_TIMEOUT is dropped
+    assert reassemble(packets[:1]) == []
+    time.sleep(BUFFER_TIMEOUT * 1.5)
+    assert reassemble(packets[1:] + next_packets) == [(1001, next_frame)]
+
+
+def test_corrupted_gcm_frame_dropped(rf_manager):
+    """Test that a frame failing authentication never reaches the decoder"""
+    crypto_manager = rf_manager.audio_manager.crypto_manager
+    crypto_manager.mode_aes, crypto_manager.mode_gcm = False, True
+    rf_manager.audio_manager.decoder = MagicMock()
+    rf_manager.audio_manager.decoder.decode.return_value = bytes(
+        FRAME_SIZE * 2
+    )
+
+    frame = bytes(range(80))
+    header = rf_manager._frame_header(3, len(frame) + crypto_manager.tag_size)
+    sealed = bytearray(crypto_manager.seal_frame(frame, 3, header))
+    sealed[0] ^= 0xFF
+
+    rx_sessions = crypto_manager.open_sessions(encrypt=False)
+    for i in range(0, len(header) + len(sealed), PACKET_SIZE):
+        received = rf_manager._reassemble(
+            (header + sealed)[i : i + PACKET_SIZE]
+        )
+    rf_manager._buffer_frame(rx_sessions, received)
+
+    assert rf_manager.dropped_frames == 1
+    assert rf_manager.jitter_buffer.occupancy == 0
+    # Its turn is concealed, the corrupted data never reaches the decoder
+    rf_manager._play_frame(None)
+    rf_manager.audio_manager.decoder.decode.assert_called_once_with(
+        b"", FRAME_SIZE
+    )
+    assert rf_manager.concealed_frames == 1
+
+
+def test_gcm_nonces_survive_restart(rf_manager, thread_manager):
+    """A restarted radio never reuses a GCM nonce it already sent"""
+    crypto_manager = rf_manager.audio_manager.crypto_manager
+    crypto_manager.set_backend("gcm")
+    sent = set()
+    for _ in range(2000):
+        seq = rf_manager.tx_seq
+        rf_manager.tx_seq = (seq + 1) & SEQUENCE_MASK
+        rf_manager.sequence_store.claim(seq)
+        sent.add(crypto_manager._gcm_nonce(seq))
+
+    # The radio loses power and starts again from the stored mark
+    restarted = RFManager(1, thread_manager, rf_manager.audio_manager)
+    assert restarted.tx_seq == rf_manager.sequence_store.mark
+    assert not sent & {
+        crypto_manager._gcm_nonce(restarted.tx_seq + i) for i in range(2000)
+    }
+
+
+def test_gcm_airtime(audio_manager, capfd):
+    """Compare packets per frame with and without an authentication tag"""
+    with capfd.disabled():
+        print("\n--- Starting GCM airtime comparison ---")
+
+    audio_manager.open_input_stream()
+    crypto_manager = audio_manager.crypto_manager
+
+    # Encode the reference clip
+    encoded_frames = []
+    while len(audio_manager.audio_data) >= FRAME_SIZE * 2:
+        data = audio_manager.input_stream.read(FRAME_SIZE)
+        encoded_frames.append(audio_manager.encoder.encode(data, FRAME_SIZE))
+
+    def packets_per_frame(overhead):
+        total = sum(
+            math.ceil((FRAME_HEADER_SIZE + len(f) + overhead) / PACKET_SIZE)
+            for f in encoded_frames
+        )
+        return total / len(encoded_frames)
+
+    baseline = packets_per_frame(0)
+    results = {tag: packets_per_frame(tag) for tag in (16, 8, 4)}
+
+    # Time sealing and opening every frame with the configured tag size
+    start_time = time.perf_counter()
+    for seq, frame in enumerate(encoded_frames):
+        sealed = crypto_manager.seal_frame(frame, seq)
+        assert crypto_manager.open_frame(sealed, seq) == frame
+    duration = time.perf_counter() - start_time
+
+    frames_per_second = 1000 / 20  # 20 ms Opus frames
+    with capfd.disabled():
+        print(f"Frames: {len(encoded_frames)}")
+        print(
+            f"No tag:       {baseline:.3f} packets/frame | "
+            f"{baseline * frames_per_second:.1f} packets/s"
+        )
+        for tag, value in results.items():
+            print(
+                f"{tag:>2} byte tag:  {value:.3f} packets/frame | "
+                f"{value * frames_per_second:.1f} packets/s | "
+                f"+{(value - baseline) / baseline * 100:.1f}% airtime"
+            )
+        print(
+            f"Seal + open ({crypto_manager.tag_size} byte tag): "
+            f"{duration * 1e6 / len(encoded_frames):.2f} µs/frame"
+        )
+        print("\n--- Ending GCM airtime comparison ---")
+
+    assert results[4] <= results[8] <= results[16]
+    assert baseline <= results[4]
+
+
+def test_pack_frame_round_trip(rf_manager):
+    """Test that frames packed in place decrypt on the receive side"""
+    crypto_manager = rf_manager.audio_manager.crypto_manager
+    for mode in ("mode_aes", "mode_ctr", "mode_gcm"):
+        crypto_manager.mode_aes = crypto_manager.mode_ctr = False
+        crypto_manager.mode_gcm = False
+        setattr(crypto_manager, mode, True)
+        tx_session = crypto_manager.open_session(encrypt=True)
+        rx_sessions = crypto_manager.open_sessions(encrypt=False)
+
+        for seq, size in enumerate((10, 52, 61, 300, MAX_OPUS_FRAME)):
+            encoded = bytes([seq + 1]) * size
+            req_pkts = rf_manager._pack_frame(tx_session, encoded, seq)
+            for i in range(req_pkts):
+                frame = rf_manager._reassemble(
+                    bytes(
+                        rf_manager.tx_view[
+                            i * PACKET_SIZE : (i + 1) * PACKET_SIZE
+                        ]
+                    )
+                )
+            assert frame is not None, f"{mode}: frame {seq} not complete"
+            decrypted = rf_manager._decrypt_into(rx_sessions, *frame)
+            assert bytes(decrypted) == encoded, f"{mode}: frame {seq}"
+
+
+# GCM can not re-key an open context, so it still builds one per frame
+@pytest.mark.parametrize(
+    "backend, peak_ratio", [("ctr", 0.3), ("gcm", 0.8), ("aes", 0.3)]
+)
+def test_tx_path_allocations(rf_manager, capfd, backend, peak_ratio):
+    """Compare memory allocated per frame by the copying and in-place TX paths"""
+    crypto_manager = rf_manager.audio_manager.crypto_manager
+    crypto_manager.set_backend(backend)
+    num_frames = 10000
+    encoded = bytes(range(120))
+
+    def encrypt_copy(seq, header):
+        # Each backend's frame encryption before sessions were kept open
+        if backend == "gcm":
+            return crypto_manager.seal_frame(encoded, seq, header)
+        if backend == "ctr":
+            encryptor = crypto_manager._frame_cipher(seq).encryptor()
+            return encryptor.update(encoded) + encryptor.finalize()
+        return crypto_manager.encrypt(encoded)
+
+    def copying_path(seq):
+        # The transmit path before frames were packed in place
+        length = len(encoded) + crypto_manager.frame_overhead
+        pkt_buffer = START_SEQUENCE + struct.pack(">BIH", 0, seq, length)
+        pkt_buffer = pkt_buffer + encrypt_copy(seq, pkt_buffer)
+        req_pkts = math.ceil(len(pkt_buffer) / PACKET_SIZE)
+        pkt_buffer = pkt_buffer + (
+            b"\x00" * (req_pkts * PACKET_SIZE - len(pkt_buffer))
+        )
+        for i in range(req_pkts):
+            pkt = pkt_buffer[i * PACKET_SIZE : (i + 1) * PACKET_SIZE]
+
+    tx_session = crypto_manager.open_session(encrypt=True)
+
+    def in_place_path(seq):
+        req_pkts = rf_manager._pack_frame(tx_session, encoded, seq)
+        for i in range(req_pkts):
+            pkt = rf_manager.tx_packet_views[i]
+
+    def measure(path):
+        # Warm up so one-time allocations are not counted
+        path(0)
+        start_time = time.perf_counter()
+        for seq in range(num_frames):
+            path(seq)
+        duration = time.perf_counter() - start_time
+
+        tracemalloc.start()
+        start_current, _ = tracemalloc.get_traced_memory()
+        peak_total = 0
+        for seq in range(num_frames):
+            tracemalloc.reset_peak()
+            current, _ = tracemalloc.get_traced_memory()
+            path(seq)
+            _, peak = tracemalloc.get_traced_memory()
+            peak_total += peak - current
+        end_current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return peak_total / num_frames, end_current - start_current, duration
+
+    results = {
+        "copying": measure(copying_path),
+        "in place": measure(in_place_path),
+    }
+    tx_session.close()
+
+    with capfd.disabled():
+        print(f"\n{backend} TX path allocations over {num_frames} frames:")
+        for name, (per_frame, retained, duration) in results.items():
+            print(
+                f"{name:>9}: {per_frame:8.1f} peak bytes allocated/frame | "
+                f"{retained} bytes retained | "
+                f"{duration * 1e6 / num_frames:.2f} µs/frame"
+            )
+
+    # Nothing is kept per frame, and the peak drops well below the copy's
+    per_frame, retained, _ = results["in place"]
+    assert retained < 1024
+    assert per_frame < peak_ratio * results["copying"][0]
+
+
+def test_multi_peer_frames(rf_manager, tmp_path):
+    """Test that interleaved frames from peers with different keys decrypt"""
+    KeyCreator().create_keyring(3, keyring_dir=tmp_path)
+    crypto_manager = rf_manager.audio_manager.crypto_manager
+    crypto_manager.keyring_dir = str(tmp_path)
+    crypto_manager.set_backend("ctr")
+
+    # One transmit session per peer, each keyed with its own entry
+    peers = {
+        key_id: crypto_manager.open_session(encrypt=True, key_id=key_id)
+        for key_id in (0, 1, 3)
+    }
+    rx_sessions = crypto_manager.open_sessions(encrypt=False)
+
+    for seq in range(12):
+        key_id = (0, 1, 3)[seq % 3]
+        encoded = bytes([key_id]) * (40 + seq)
+        req_pkts = rf_manager._pack_frame(peers[key_id], encoded, seq)
+        for i in range(req_pkts):
+            frame = rf_manager._reassemble(
+                bytes(
+                    rf_manager.tx_view[i * PACKET_SIZE : (i + 1) * PACKET_SIZE]
+                )
+            )
+        assert frame[0] == key_id
+        decrypted = rf_manager._decrypt_into(rx_sessions, *frame)
+        assert bytes(decrypted) == encoded
+
+    # A frame with a key ID missing from the keyring is dropped
+    frame = (9,) + frame[1:]
+    assert rf_manager._decrypt_into(rx_sessions, *frame) is None
+    assert set(rx_sessions.sessions) == {0, 1, 3, 9}
+
+
+def test_hybrid_session_key_frames(rf_manager):
+    """Test that hybrid frames decrypt across session key changes"""
+    crypto_manager = rf_manager.audio_manager.crypto_manager
+    crypto_manager.set_backend("hybrid")
+    tx_session = rf_manager._open_tx_session()
+    tx_session.interval, tx_session.max_frames, tx_session.lead = 0, 6, 2
+    rx_sessions = crypto_manager.open_sessions(encrypt=False)
+
+    def send(req_pkts):
+        for i in range(req_pkts):
+            frame = rf_manager._reassemble(
+                bytes(
+                    rf_manager.tx_view[i * PACKET_SIZE : (i + 1) * PACKET_SIZE]
+                )
+            )
+        return frame
+
+    session_key_frames = 0
+    for seq in range(30):
+        session_key = tx_session.next_frame()
+        if session_key is not None:
+            frame = send(rf_manager._pack_session_key(*session_key, seq))
+            assert frame[2][:2] == HANDSHAKE_SEQUENCE
+            rf_manager._receive_session_key(rx_sessions, frame[0], frame[3])
+            session_key_frames += 1
+
+        encoded = bytes([seq + 1]) * (40 + seq)
+        frame = send(rf_manager._pack_frame(tx_session, encoded, seq))
+        assert frame[0] == tx_session.key_id
+        decrypted = rf_manager._decrypt_into(rx_sessions, *frame)
+        assert bytes(decrypted) == encoded
+        time.sleep(0.005)
+
+    assert session_key_frames == tx_session.rekeys + 1 >= 2
+    tx_session.close()
+    rx_sessions.close()
+
+
+def test_jitter_buffered_playout(rf_manager, thread_manager, monkeypatch):
+    """Test that bursty, reordered frames play in order without stopping"""
+    crypto_manager = rf_manager.audio_manager.crypto_manager
+    crypto_manager.set_backend("ctr")
+    decoded = []
+    decoder = MagicMock()
+    decoder.decode.side_effect = lambda data, n, decode_fec=False: (
+        data and not decode_fec and decoded.append(data[0])
+    ) or bytes(n * 2)
+    rf_manager.audio_manager.decoder = decoder
+    close_output_stream = MagicMock()
+    monkeypatch.setattr(
+        rf_manager.audio_manager, "close_output_stream", close_output_stream
+    )
+
+    tx_session = crypto_manager.open_session(encrypt=True)
+    packets = []
+    for seq in range(30):
+        req_pkts = rf_manager._pack_frame(tx_session, bytes([seq]) * 50, seq)
+        packets.append(
+            [
+                bytes(
+                    rf_manager.tx_view[i * PACKET_SIZE : (i + 1) * PACKET_SIZE]
+                )
+                for i in range(req_pkts)
+            ]
+        )
+
+    thread_manager.start_thread(RECEIVE_THREAD, rf_manager.handle_packets)
+    # Bursts of three frames every 60 ms, each burst out of order
+    for first in range(0, 30, 3):
+        for seq in (first + 1, first, first + 2):
+            for packet in packets[seq]:
+                rf_manager.packet_queue.put(packet)
+        time.sleep(0.06)
+    thread_manager.threads[RECEIVE_THREAD].join(timeout=5)
+
+    # Frames play in order, a few may be lost before the depth adapts
+    assert decoded == sorted(decoded)
+    assert len(decoded) >= 25
+    assert rf_manager.jitter_buffer.target_depth > JITTER_MIN_DEPTH
+    # The output stream was only closed once the transmission ended
+    close_output_stream.assert_called_once()
+
+
+def test_partial_frame_reset_on_timeout(rf_manager, thread_manager):
+    """A frame whose packets stop coming is dropped after BUFFER_TIMEOUT"""
+    crypto_manager = rf_manager.audio_manager.crypto_manager
+    tx_session = crypto_manager.open_session(encrypt=True)
+    req_pkts = rf_manager._pack_frame(tx_session, bytes(150), 1)
+    packets = [bytes(rf_manager.tx_packet_views[i]) for i in range(req_pkts)]
+
+    # Only the first packet arrives, then the stream goes idle
+    rf_manager.packet_queue.put(packets[0])
+    thread_manager.start_thread(RECEIVE_THREAD, rf_manager.handle_packets)
+    thread_manager.threads[RECEIVE_THREAD].join(timeout=5)
+
+    assert rf_manager.frame_len == 0
+    # The rest of the frame is ignored instead of completing it
+    assert all(rf_manager._reassemble(p) is None for p in packets[1:])
+
+
+def test_packet_loss_sweep(rf_manager, capfd):
+    """Compare silence, PLC and PLC with FEC on lost frames"""
+    with capfd.disabled():
+        print("\n--- Starting packet loss sweep ---")
+
+    audio_manager = rf_manager.audio_manager
+    audio_manager.open_input_stream()
+    pcm_frames = []
+    while len(audio_manager.audio_data) >= FRAME_SIZE * 2:
+        pcm_frames.append(audio_manager.input_stream.read(FRAME_SIZE))
+    # Loop the clip for enough lost frames at low loss rates
+    pcm_frames *= 10
+
+    def encode(fec):
+        audio_manager.encoder.reset_state()
+        audio_manager.set_inband_fec(fec, OPUS_PACKET_LOSS_PERC)
+        return [
+            audio_manager.encoder.encode(f, FRAME_SIZE) for f in pcm_frames
+        ]
+
+    def decode(frames, lost, strategy):
+        played = []
+        audio_manager.decoder = opuslib.Decoder(RATE, CHANNELS)
+        audio_manager.write_output = played.append
+        for i, frame in enumerate(frames):
+            if not lost[i]:
+                rf_manager._play_frame(frame)
+            elif strategy == "silence":
+                played.append(rf_manager.silence)
+            else:
+                next_frame = None
+                if strategy == "fec" and i + 1 < len(frames):
+                    next_frame = None if lost[i + 1] else frames[i + 1]
+                rf_manager._play_frame(None, next_frame)
+        return played
+
+    window = np.hanning(FRAME_SIZE)
+    # Speech band up to 8 kHz, the band the FEC data covers
+    bins = 8000 * FRAME_SIZE // RATE + 1
+
+    def spectrum(frame):
+        samples = np.frombuffer(frame, dtype=np.int16) * window
+        power = np.abs(np.fft.rfft(samples)[:bins]) ** 2
+        return 10 * np.log10(power + 1e3)
+
+    def distance(reference, played, lost):
+        """Mean log-spectral distance (dB) of the lost frames"""
+        return np.mean(
+            [
+                np.sqrt(
+                    np.mean(
+                        (spectrum(reference[i]) - spectrum(played[i])) ** 2
+                    )
+                )
+                for i in range(len(lost))
+                if lost[i]
+            ]
+        )
+
+    streams = {False: encode(False), True: encode(True)}
+    no_loss = [False] * len(pcm_frames)
+    references = {fec: decode(f, no_loss, "plc") for fec, f in streams.items()}
+    strategies = (("silence", False), ("plc", False), ("fec", True))
+
+    rng = random.Random(312)
+    results = {}
+    for loss in (2, 5, 10, 20):
+        lost = [rng.random() < loss / 100 for _ in pcm_frames]
+        results[loss] = {
+            strategy: distance(
+                references[fec], decode(streams[fec], lost, strategy), lost
+            )
+            for strategy, fec in strategies
+        }
+        results[loss]["lost"] = sum(lost)
+
+    with capfd.disabled():
+        print(f"Frames: {len(pcm_frames)}")
+        for fec, frames in streams.items():
+            print(
+                f"FEC {'on ' if fec else 'off'}: "
+                f"{sum(map(len, frames)) / len(frames):.1f} bytes/frame"
+            )
+        print("Log-spectral distance of lost frames, 0-8 kHz:")
+        print("Loss | Lost | Silence  | PLC     | PLC + FEC")
+        for loss, row in results.items():
+            print(
+                f"{loss:>3}% | {row['lost']:>4} | {row['silence']:>5.2f} dB | "
+                f"{row['plc']:>4.2f} dB | {row['fec']:>4.2f} dB"
+            )
+        print(
+            f"Concealed: {rf_manager.concealed_frames} | "
+            f"recovered: {rf_manager.recovered_frames}"
+        )
+        print("\n--- Ending packet loss sweep ---")
+
+    for loss, row in results.items():
+        assert row["plc"] < row["silence"]
+    for loss in (10, 20):
+        assert results[loss]["fec"] < results[loss]["plc"]
+    assert rf_manager.recovered_frames > 0
+
+
+def load_recording(path, frame_size=FRAME_SIZE):
+    """Read a recording at the radio's rate, cut to whole frames"""
+    with wave.open(path, "rb") as wf:
+        samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+        rate = wf.getframerate()
+    if rate != RATE:
+        # Resample to the radio's rate
+        times = np.arange(len(samples) * RATE // rate) / RATE
+        samples = np.interp(
+            times, np.arange(len(samples)) / rate, samples
+        ).astype(np.int16)
+    data = samples.tobytes()
+    frame_bytes = frame_size * 2
+    return data[: len(data) // frame_bytes * frame_bytes]
+
+
+def transmit(rf_manager, data):
+    """Send a recording through the transmit loop into the mock radio"""
+    audio_manager = rf_manager.audio_manager
+    stop_event = threading.Event()
+
+    def read(num_frames, exception_on_overflow=False):
+        data = audio_manager.audio_data[: num_frames * 2]
+        audio_manager.audio_data = audio_manager.audio_data[num_frames * 2 :]
+        if not audio_manager.audio_data:
+            stop_event.set()
+        return data
+
+    audio_manager.audio_data = data
+    audio_manager.input_stream = MagicMock()
+    audio_manager.input_stream.read.side_effect = read
+    rf_manager.handle_input_stream(stop_event)
+
+
+def receive(rf_manager, monkeypatch):
+    """
+    Receive the frames in the mock radio on a simulated clock, each frame
+    arriving at its own frame period. Returns the played audio.
+    """
+    audio_manager = rf_manager.audio_manager
+    frame_duration = rf_manager.frame_duration_ms / 1000
+    now = [0.0]
+    rf_manager.jitter_buffer = JitterBuffer(
+        frame_duration,
+        min_depth=rf_manager.jitter_buffer.min_depth,
+        clock=lambda: now[0],
+    )
+    rf_manager.comfort_noise_frames = 0
+    played = []
+    monkeypatch.setattr(audio_manager, "write_output", played.append)
+    rx_sessions = audio_manager.crypto_manager.open_sessions(encrypt=False)
+    first_seq = None
+    while rf_manager.rfm69.payload_ready:
+        frame = rf_manager._reassemble(rf_manager.rfm69.receive())
+        if frame is None:
+            continue
+        if first_seq is None:
+            first_seq = frame[1]
+        now[0] = ((frame[1] - first_seq) & SEQUENCE_MASK) * frame_duration
+        for opus_frame in rf_manager.jitter_buffer.pop():
+            rf_manager._play_frame(opus_frame)
+        rf_manager._buffer_frame(rx_sessions, frame)
+    # Play out what is left
+    while rf_manager.jitter_buffer.occupancy:
+        now[0] += frame_duration
+        for opus_frame in rf_manager.jitter_buffer.pop():
+            rf_manager._play_frame(opus_frame)
+    rx_sessions.close()
+    return played
+
+
+def test_silence_suppression_airtime(rf_manager, capfd, monkeypatch):
+    """Measure the airtime silence suppression saves on real recordings"""
+    with capfd.disabled():
+        print("\n--- Starting silence suppression airtime test ---")
+
+    results = {}
+    for path in (
+        "tests/src/audio/48k_960.wav",
+        "tests/development/rsaTest/recorded_audio.wav",
+    ):
+        data = load_recording(path)
+        transmit(rf_manager, data)
+        played = receive(rf_manager, monkeypatch)
+
+        num_frames = len(data) // (FRAME_SIZE * 2)
+        results[path] = (
+            num_frames,
+            rf_manager.vad.activity,
+            rf_manager.tx_packets,
+            rf_manager.tx_packets_unsuppressed,
+            rf_manager.airtime_saved,
+            rf_manager.comfort_noise_frames,
+        )
+        # Every frame period plays audio or comfort noise, nothing is lost
+        assert rf_manager.jitter_buffer.lost == 0
+        assert len(played) >= num_frames - rf_manager.sid_interval
+
+    with capfd.disabled():
+        print("Recording                     | frames | speech | packets")
+        for path, (frames, activity, sent, full, saved, cn) in results.items():
+            print(
+                f"{path.split('/')[-1]:<29} | {frames:>6} | {activity:>6.0%} | "
+                f"{sent:>4} of {full:>4} | {saved:.1%} airtime saved | "
+                f"{cn} comfort noise frames"
+            )
+        print("\n--- Ending silence suppression airtime test ---")
+
+    for frames, activity, sent, full, saved, cn in results.values():
+        assert 0 < saved < 1
+        assert cn > 0
+
+
+def test_burst_round_trip(rf_manager):
+    """Test a burst of frames is received as its separate frames"""
+    audio_manager = rf_manager.audio_manager
+    crypto_manager = audio_manager.crypto_manager
+    rf_manager.set_frame_format(20, 3)
+    frames = [bytes([i]) * length for i, length in enumerate((40, 300, 7))]
+    seq = SEQUENCE_MASK - 1  # The sequence numbers wrap inside the burst
+
+    tx_session = crypto_manager.open_session(encrypt=True)
+    rf_manager._send_burst(tx_session, list(frames), seq)
+    tx_session.close()
+    # One header, table of contents and tag for the three frames
+    length = 1 + 1 + 2 + sum(map(len, frames)) + tx_session.overhead
+    assert rf_manager.tx_packets == math.ceil(
+        (FRAME_HEADER_SIZE + length) / PACKET_SIZE
+    )
+
+    rx_sessions = crypto_manager.open_sessions(encrypt=False)
+    while rf_manager.rfm69.payload_ready:
+        frame = rf_manager._reassemble(rf_manager.rfm69.receive())
+        if frame is not None:
+            assert bytes(frame[2][:2]) == BURST_SEQUENCE
+            rf_manager._buffer_frame(rx_sessions, frame)
+    rx_sessions.close()
+    assert rf_manager.jitter_buffer.frames == {
+        SEQUENCE_MASK - 1: frames[0],
+        SEQUENCE_MASK: frames[1],
+        0: frames[2],
+    }
+
+    with pytest.raises(ValueError):
+        rf_manager.set_frame_format(30)
+    with pytest.raises(ValueError):
+        rf_manager.set_frame_format(20, MAX_FRAMES_PER_BURST + 1)
+
+
+def test_keystream_ring_bursts_and_pauses(rf_manager, capfd, monkeypatch):
+    """Count keystream ring hits with bursts and silence suppression"""
+    audio_manager = rf_manager.audio_manager
+    audio_manager.crypto_manager.set_backend("ctr")
+    rf_manager.silence_suppression = True
+    # Keep the ring the transmit loop opens
+    rings = []
+    open_tx_session = rf_manager._open_tx_session
+
+    def keep_session():
+        rings.append(open_tx_session())
+        return rings[-1]
+
+    monkeypatch.setattr(rf_manager, "_open_tx_session", keep_session)
+    # Leave the producer thread some of the time a frame period would
+    encode = audio_manager.encoder.encode
+
+    def slow_encode(pcm, frame_size):
+        time.sleep(0.002)
+        return encode(pcm, frame_size)
+
+    monkeypatch.setattr(audio_manager.encoder, "encode", slow_encode)
+
+    results = {}
+    for frames_per_burst in (1, 3):
+        rf_manager.set_frame_format(FRAME_DURATION_MS, frames_per_burst)
+        data = load_recording("tests/src/audio/48k_960.wav")
+        transmit(rf_manager, data)
+        played = receive(rf_manager, monkeypatch)
+        ring = rings[-1]
+        assert ring.stride == frames_per_burst
+        # Every frame sent is played
+        assert played and rf_manager.jitter_buffer.lost == 0
+        results[frames_per_burst] = (ring.hits, ring.misses)
+
+    with capfd.disabled():
+        print("\nKeystream ring with silence suppression:")
+        for frames_per_burst, (hits, misses) in results.items():
+            print(
+                f"{frames_per_burst} frames/burst: {hits} hits | "
+                f"{misses} misses"
+            )
+
+    # Comfort noise frames and the first burst after a pause can be off
+    # the stride, the speech bursts hit
+    for hits, misses in results.values():
+        assert hits > misses
+
+
+def test_frame_duration_and_bursts(rf_manager, capfd, monkeypatch):
+    """Measure packets per second for each frame duration and burst size"""
+    with capfd.disabled():
+        print("\n--- Starting frame duration and burst test ---")
+
+    audio_manager = rf_manager.audio_manager
+    # Only the framing is compared, every frame is sent
+    rf_manager.silence_suppression = False
+    results = {}
+    for duration in OPUS_FRAME_DURATIONS:
+        for frames_per_burst in (1, 2, 3):
+            # Bursts longer than 120 ms are too late for a conversation
+            if duration * frames_per_burst > 120:
+                continue
+            rf_manager.set_frame_format(duration, frames_per_burst)
+            audio_manager.set_encoder_profile(OPUS_PROFILE)
+            # Count the Opus bytes, the rest of the airtime is overhead
+            encode = audio_manager.encoder.encode
+            opus_bytes = [0]
+
+            def counting_encode(pcm, frame_size):
+                encoded = encode(pcm, frame_size)
+                opus_bytes[0] += len(encoded)
+                return encoded
+
+            monkeypatch.setattr(
+                audio_manager.encoder, "encode", counting_encode
+            )
+            data = load_recording(
+                "tests/src/audio/48k_960.wav", rf_manager.frame_size
+            )
+            num_frames = len(data) // (rf_manager.frame_size * 2)
+            seconds = num_frames * duration / 1000
+            transmit(rf_manager, data)
+            played = receive(rf_manager, monkeypatch)
+
+            # Every frame of every burst is received and played
+            assert len(played) == num_frames
+            assert rf_manager.jitter_buffer.lost == 0
+            airtime = rf_manager.tx_packets * PACKET_SIZE
+            results[(duration, frames_per_burst)] = (
+                rf_manager.tx_packets / seconds,
+                opus_bytes[0] / num_frames,
+                1 - opus_bytes[0] / airtime,
+                # Audio collected before its burst is sent
+                duration * frames_per_burst,
+            )
+
+    with capfd.disabled():
+        print(
+            "Frame | Frames/burst | Bytes/frame | Packets/s | Overhead | "
+            "Burst latency"
+        )
+        for (duration, per_burst), row in results.items():
+            rate, frame_bytes, overhead, latency = row
+            print(
+                f"{duration:>2} ms | {per_burst:>12} | {frame_bytes:>11.1f} | "
+                f"{rate:>9.1f} | {overhead:>8.1%} | {latency:>4} ms"
+            )
+        print("\n--- Ending frame duration and burst test ---")
+
+    # Longer frames and bigger bursts need fewer packets
+    assert results[(20, 1)][0] < results[(10, 1)][0]
+    assert results[(60, 1)][0] < results[(20, 1)][0]
+    assert results[(20, 3)][0] < results[(20, 1)][0]
+
+
 if __name__ == "__main__":
     pytest.main(["-v", "test_rf_manager.py"])
@@ -0,0 +1,75 @@
+import io
+import os
+import pytest
+from src.managers.crypto_manager import CryptoManager
+from src.utils.audio_container import ContainerWriter, ContainerReader
+
+
+@pytest.fixture()
+def crypto_manager():
+    return CryptoManager()
+
+
+def write_container(crypto_manager, audio, segment_ms=100):
+    f = io.BytesIO()
+    with ContainerWriter(
+        crypto_manager, f, 1, 2, 8000, segment_ms=segment_ms
+    ) as container:
+        # Writes that do not line up with the segments
+        for i in range(0, len(audio), 700):
+            container.write(audio[i : i + 700])
+    f.seek(0)
+    return f
+
+
+def test_round_trip_and_ranges(crypto_manager):
+    audio = os.urandom(2 * 8000 * 3 + 250)
+    container = ContainerReader(
+        crypto_manager, write_container(crypto_manager, audio)
+    )
+    assert container.num_frames == len(audio) // 2
+    assert len(container.index) == 31
+    assert b"".join(container.read()) == audio
+
+    for start, end in ((0.05, 0.25), (1.0, 1.1), (2.95, None), (1.5, 1.5)):
+        first = int(start * 8000) * 2
+        last = len(audio) if end is None else int(end * 8000) * 2
+        assert b"".join(container.read(start, end)) == audio[first:last]
+
+    # Seeking only decrypts the segments overlapping the range
+    read_segment = container.read_segment
+    segments_read = []
+
+    def counting_read_segment(i):
+        segments_read.append(i)
+        return read_segment(i)
+
+    container.read_segment = counting_read_segment
+    b"".join(container.read(2.05, 2.25))
+    assert segments_read == [20, 21, 22]
+
+
+def test_truncated_index_is_rebuilt(crypto_manager):
+    audio = os.urandom(2 * 8000)
+    f = write_container(crypto_manager, audio)
+    last_offset = ContainerReader(crypto_manager, f).index[-1][1]
+
+    # Stop in the middle of the last segment, as if the recorder was
+    # killed before writing the index
+    data = f.getvalue()[: last_offset + 50]
+    container = ContainerReader(crypto_manager, io.BytesIO(data))
+    assert len(container.index) == 9
+    assert b"".join(container.read()) == audio[: 9 * 1600]
+
+
+def test_modified_segment(crypto_manager):
+    f = write_container(crypto_manager, os.urandom(2 * 8000))
+    data = bytearray(f.getvalue())
+    data[100] ^= 1
+    container = ContainerReader(crypto_manager, io.BytesIO(bytes(data)))
+    with pytest.raises(ValueError):
+        container.read_segment(0)
+    assert container.read_segment(1)
+
+    with pytest.raises(ValueError):
+        ContainerReader(crypto_manager, io.BytesIO(b"SD3E" + data[4:]))
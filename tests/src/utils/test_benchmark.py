@@ -0,0 +1,65 @@
+import pytest
+from src.utils.benchmark import (
+    run_benchmarks,
+    compare,
+    save_results,
+    load_results,
+    format_results,
+    run_backend_benchmarks,
+    fastest_backend,
+    format_backend_results,
+)
+
+
+@pytest.fixture(scope="module")
+def results():
+    return run_benchmarks(sizes=[20, 1920], time_budget=0.02)
+
+
+def test_results(results):
+    for name in ("encrypt", "decrypt", "hybrid_encrypt", "rsa_decrypt"):
+        for size in ("20", "1920"):
+            result = results["results"][name][size]
+            assert result["ops_per_sec"] > 0
+            assert result["p50_us"] <= result["p99_us"]
+            assert result["bytes_allocated"] > 0
+
+
+def test_save_and_compare(results, tmp_path):
+    path = tmp_path / "baseline.json"
+    save_results(results, path)
+    baseline = load_results(path)
+    assert baseline == results
+    assert compare(results, baseline) == []
+
+    # A baseline twice as fast flags every case
+    for sizes in baseline["results"].values():
+        for result in sizes.values():
+            result["ops_per_sec"] *= 2
+    regressions = compare(results, baseline, threshold=0.5)
+    assert len(regressions) == sum(
+        len(sizes) for sizes in results["results"].values()
+    )
+    assert all(r["metric"] == "ops_per_sec" for r in regressions)
+
+
+def test_benchmark_report(results, capfd):
+    with capfd.disabled():
+        print("\n--- Starting crypto benchmark ---")
+        print(format_results(results))
+        print("\n---  Ending crypto benchmark  ---")
+
+
+def test_backend_report(capfd):
+    results = run_backend_benchmarks(num_frames=500)
+    fastest = fastest_backend(results)
+    for rates in results.values():
+        assert "aes" in rates and "rsa" not in rates
+        assert all(rate > 0 for rate in rates.values())
+    report = format_backend_results(results)
+    assert f"Fastest backend: {fastest}." in report
+
+    with capfd.disabled():
+        print("\n--- Starting cipher backend benchmark ---")
+        print(report)
+        print("\n---  Ending cipher backend benchmark  ---")
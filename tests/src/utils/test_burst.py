@@ -0,0 +1,25 @@
+import pytest
+from src.utils.burst import burst_size, pack_burst, unpack_burst
+
+
+def test_pack_and_unpack():
+    frames = [b"\x01" * 3, b"\x02" * 251, b"\x03" * 252, b"\x04" * 1275]
+    frames.append(b"\x05" * 60)
+    payload = pack_burst(frames)
+    # Count, three short and one long length, the last length is implied
+    assert len(payload) == 1 + 1 + 1 + 2 + 2 + sum(map(len, frames))
+    assert len(payload) == burst_size([len(f) for f in frames])
+    assert [bytes(f) for f in unpack_burst(payload)] == frames
+    assert burst_size([80]) == 80
+
+
+def test_invalid_bursts():
+    with pytest.raises(ValueError):
+        pack_burst([b"\x01"])
+    with pytest.raises(ValueError):
+        pack_burst([b"\x01" * 1276, b"\x02"])
+
+    payload = pack_burst([b"\x01" * 300, b"\x02" * 10])
+    for bad in (b"", b"\x01\x05", payload[:2], payload[:302], b"\x02\x03abc"):
+        with pytest.raises(ValueError):
+            unpack_burst(bad)
@@ -0,0 +1,119 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pyaudio
+import pytest
+
+from src.utils.callback_stream import (
+    CallbackStream,
+    CaptureStream,
+    PlaybackStream,
+)
+
+RATE = 48000
+FRAMES = 480  # 10 ms callbacks
+FRAME_BYTES = FRAMES * 2
+
+
+def open_stream(cls, **kwargs):
+    """Open a stream on a mocked PyAudio, returning it and its callback"""
+    audio = MagicMock()
+    audio.get_sample_size.return_value = 2
+    audio.open.return_value.get_input_latency.return_value = 0.01
+    audio.open.return_value.get_output_latency.return_value = 0.01
+    stream = cls(audio, pyaudio.paInt16, 1, RATE, FRAMES, **kwargs)
+    callback = audio.open.call_args.kwargs["stream_callback"]
+    return stream, callback
+
+
+def test_capture_read_and_overrun():
+    stream, callback = open_stream(CaptureStream, buffer_ms=30)
+    blocks = [bytes([i]) * FRAME_BYTES for i in range(4)]
+    for block in blocks[:3]:
+        assert callback(block, FRAMES, {}, 0) == (None, pyaudio.paContinue)
+    # The ring holds 30 ms, the fourth callback has no room
+    callback(blocks[3], FRAMES, {}, pyaudio.paInputOverflow)
+    assert stream.overruns == 1
+    assert stream.device_xruns == 1
+
+    assert stream.read(FRAMES * 2) == blocks[0] + blocks[1]
+    assert stream.read(FRAMES) == blocks[2]
+    assert stream.latency.count == 2
+
+    stream.close()
+    with pytest.raises(OSError):
+        stream.read(FRAMES)
+
+
+def test_base_stream_is_abstract():
+    # Only the capture and playback streams know their direction
+    with pytest.raises(TypeError):
+        open_stream(CallbackStream)
+
+
+def test_playback_underrun_and_drain():
+    stream, callback = open_stream(PlaybackStream, timeout=0.2)
+    # Silence before the first audio is not an underrun
+    out, flag = callback(None, FRAMES, {}, 0)
+    assert out == bytes(FRAME_BYTES) and flag == pyaudio.paContinue
+    assert stream.underruns == 0
+
+    stream.write(b"\x01" * FRAME_BYTES + b"\x02" * (FRAME_BYTES // 2))
+    assert callback(None, FRAMES, {}, 0)[0] == b"\x01" * FRAME_BYTES
+    # The ring runs dry halfway through a callback
+    out, _ = callback(None, FRAMES, {}, 0)
+    assert out == b"\x02" * (FRAME_BYTES // 2) + bytes(FRAME_BYTES // 2)
+    assert stream.underruns == 1
+
+    # A full ring makes the write wait for the device, then give up
+    stream.write(bytes(stream.ring.capacity + FRAME_BYTES))
+    assert stream.overruns == 1
+    # Stopping waits for the device to play what is queued
+    device = threading.Timer(
+        0.05, lambda: stream.ring.read_into(memoryview(bytearray(10**6)))
+    )
+    device.start()
+    stream.stop_stream()
+    assert stream.ring.available == 0
+    stream.stream.stop_stream.assert_called_once()
+    device.join()
+
+
+def test_loop_stalls_do_not_stall_device(capfd):
+    """A capture loop that stalls now and then loses no audio"""
+    with capfd.disabled():
+        print("\n--- Starting callback stream stall test ---")
+
+    stream, callback = open_stream(CaptureStream)
+    num_blocks = 100
+    done = threading.Event()
+
+    def device():
+        # PortAudio calls back every 10 ms, whatever the loop is doing
+        start = time.monotonic()
+        for i in range(num_blocks):
+            delay = start + i * FRAMES / RATE - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            callback(bytes([i]) * FRAME_BYTES, FRAMES, {}, 0)
+        done.set()
+
+    thread = threading.Thread(target=device)
+    thread.start()
+    received = []
+    for i in range(num_blocks // 2):
+        received.append(stream.read(FRAMES * 2))
+        if i % 10 == 5:
+            # The loop is held up, e.g. by rendering the display
+            time.sleep(0.08)
+    thread.join()
+
+    with capfd.disabled():
+        print(stream.format())
+        print("\n--- Ending callback stream stall test ---")
+
+    expected = [bytes([i]) * FRAME_BYTES for i in range(num_blocks)]
+    assert b"".join(received) == b"".join(expected)
+    assert stream.overruns == 0
+    assert 0.01 <= stream.latency.max < 0.01 + 0.2
@@ -0,0 +1,61 @@
+import pytest
+import opuslib
+import opuslib.api.ctl
+import opuslib.api.encoder
+from src.utils.encoder_profile import (
+    EncoderProfile,
+    ENCODER_PROFILES,
+    SIGNAL_TYPES,
+    BANDWIDTHS,
+)
+from src.utils.constants import RATE, CHANNELS, FRAME_SIZE
+
+
+def test_profile_controls():
+    profile = EncoderProfile(
+        "test",
+        application="voip",
+        bitrate=16000,
+        complexity=3,
+        vbr=False,
+        dtx=True,
+        signal="voice",
+        max_bandwidth="wideband",
+        inband_fec=False,
+        packet_loss_perc=5,
+    )
+    encoder = profile.create_encoder(RATE, CHANNELS)
+
+    assert encoder.application == opuslib.APPLICATION_VOIP
+    assert encoder.bitrate == 16000
+    assert encoder.complexity == 3
+    assert encoder.vbr == 0
+    assert (
+        opuslib.api.encoder.encoder_ctl(
+            encoder.encoder_state, opuslib.api.ctl.get_dtx
+        )
+        == 1
+    )
+    assert encoder.signal == SIGNAL_TYPES["voice"]
+    assert encoder.max_bandwidth == BANDWIDTHS["wideband"]
+    assert encoder.inband_fec == 0
+    assert encoder.packet_loss_perc == 5
+    # Constant bitrate: 16 kbps is 40 bytes per 20 ms frame
+    frame = encoder.encode(bytes(range(256)) * 7 + bytes(128), FRAME_SIZE)
+    assert len(frame) == 40
+
+
+def test_registered_profiles():
+    assert "default" in ENCODER_PROFILES
+    for profile in ENCODER_PROFILES.values():
+        encoder = profile.create_encoder(RATE, CHANNELS)
+        assert encoder.encode(bytes(FRAME_SIZE * 2), FRAME_SIZE)
+
+
+def test_invalid_profile():
+    with pytest.raises(ValueError):
+        EncoderProfile("bad", application="telephone")
+    with pytest.raises(ValueError):
+        EncoderProfile("bad", signal="noise")
+    with pytest.raises(ValueError):
+        EncoderProfile("bad", max_bandwidth="ultraband")
@@ -0,0 +1,144 @@
+import random
+from src.utils.jitter_buffer import JitterBuffer
+from src.utils.constants import SEQUENCE_MASK
+
+FRAME = 0.02
+
+
+def play_out(jitter_buffer, arrivals, end):
+    """Push (time, seq) arrivals and pop on a 1 ms tick until end"""
+    arrivals = sorted(arrivals)
+    released = []
+    now = 0.0
+    i = 0
+    while now < end:
+        while i < len(arrivals) and arrivals[i][0] <= now:
+            seq = arrivals[i][1]
+            jitter_buffer.push(seq, seq, now)
+            i += 1
+        released += jitter_buffer.pop(now)
+        now += 0.001
+    return released
+
+
+def test_reorders_frames():
+    jitter_buffer = JitterBuffer(FRAME, min_depth=3)
+    # Frames 0-9 sent every 20 ms, with 2 and 3 swapped and 6 lost
+    order = [0, 1, 3, 2, 4, 5, 7, 8, 9]
+    arrivals = [(i * FRAME, seq) for i, seq in enumerate(order)]
+
+    released = play_out(jitter_buffer, arrivals, 0.4)
+
+    assert released == [0, 1, 2, 3, 4, 5, None, 7, 8, 9]
+    assert jitter_buffer.lost == 1
+    assert jitter_buffer.underruns == 1  # The stream ended
+
+
+def test_late_and_duplicate_frames():
+    jitter_buffer = JitterBuffer(FRAME, min_depth=2)
+    for seq in (10, 11, 12):
+        jitter_buffer.push(seq, seq, 0.0)
+    assert jitter_buffer.pop(0.0) == [10]
+    assert jitter_buffer.peek() == 11
+    assert jitter_buffer.pop(FRAME) == [11]
+
+    assert not jitter_buffer.push(10, 10, FRAME)
+    assert not jitter_buffer.push(12, 12, FRAME)
+    assert jitter_buffer.late == 1
+    assert jitter_buffer.duplicates == 1
+
+
+def test_sequence_wrap():
+    jitter_buffer = JitterBuffer(FRAME, min_depth=3)
+    seqs = [(SEQUENCE_MASK - 1 + i) & SEQUENCE_MASK for i in range(5)]
+    arrivals = [(i * FRAME, seq) for i, seq in enumerate(seqs)]
+    assert play_out(jitter_buffer, arrivals, 0.2) == seqs
+
+
+def test_new_stream():
+    jitter_buffer = JitterBuffer(FRAME, min_depth=2)
+    released = play_out(
+        jitter_buffer,
+        [(0.0, 500), (0.0, 501), (0.1, 7), (0.1, 8), (0.12, 9)],
+        0.2,
+    )
+    # The restarted transmitter is followed, its frames are not late
+    assert released == [500, 501, 7, 8, 9]
+    assert jitter_buffer.late == 0 and jitter_buffer.lost == 0
+
+
+def test_pause_keeps_clock():
+    jitter_buffer = JitterBuffer(FRAME, min_depth=2)
+    # Frames 0-5 every 20 ms, frame 5 starts a pause and speech resumes
+    # with frame 20
+    sent = list(range(6)) + list(range(20, 24))
+    released = []
+    for tick in range(30):
+        now = tick * FRAME
+        if tick in sent:
+            jitter_buffer.push(tick, tick, now, dtx=tick == 5)
+        released += jitter_buffer.pop(now)
+
+    assert [f for f in released if f is not None] == sent
+    # Every frame period of the pause was played out
+    assert released.index(20) - released.index(5) == 15
+    assert jitter_buffer.suppressed == 14
+    assert jitter_buffer.lost == 0
+    # Only the end of the stream ran the buffer dry
+    assert jitter_buffer.underruns == 1
+
+
+def test_depth_adapts_to_jitter():
+    # Smooth delivery keeps the buffer at its minimum
+    smooth = JitterBuffer(FRAME)
+    play_out(smooth, [(i * FRAME, i) for i in range(100)], 2.0)
+    assert smooth.target_depth == smooth.min_depth
+
+    # Bursts of five frames every 100 ms need a deeper buffer
+    bursty = JitterBuffer(FRAME)
+    arrivals = [((i // 5) * 5 * FRAME, i) for i in range(200)]
+    released = play_out(bursty, arrivals, 4.0)
+    assert bursty.target_depth >= 5
+    assert bursty.underruns <= 2
+    assert [f for f in released if f is not None] == sorted(
+        f for f in released if f is not None
+    )
+
+
+def test_bursty_channel(capfd):
+    rng = random.Random(312)
+    num_frames = 3000
+    # Frames sent every 20 ms and delayed 0-60 ms, 1% lost
+    arrivals = [
+        (i * FRAME + rng.uniform(0, 0.06), i)
+        for i in range(num_frames)
+        if rng.random() > 0.01
+    ]
+
+    # Playing on arrival: a gap longer than a frame empties the output
+    on_arrival_underruns = 0
+    reordered = 0
+    previous = None
+    for arrival, seq in sorted(arrivals):
+        if previous is not None:
+            if arrival - previous[0] > FRAME:
+                on_arrival_underruns += 1
+            if seq < previous[1]:
+                reordered += 1
+        previous = (arrival, seq)
+
+    jitter_buffer = JitterBuffer(FRAME)
+    released = play_out(jitter_buffer, arrivals, num_frames * FRAME + 1)
+    in_order = [f for f in released if f is not None]
+
+    assert in_order == sorted(in_order)
+    assert jitter_buffer.underruns < on_arrival_underruns
+    assert jitter_buffer.played >= len(arrivals) * 0.95
+
+    with capfd.disabled():
+        print("\n--- Bursty channel, 0-60 ms delay, 1% loss ---")
+        print(
+            f"Play on arrival: {on_arrival_underruns} underruns | "
+            f"{reordered} frames out of order"
+        )
+        print(jitter_buffer.format())
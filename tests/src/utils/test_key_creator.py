@@ -0,0 +1,91 @@
+import os
+import time
+import shutil
+import pytest
+from src.managers.crypto_manager import CryptoManager
+from src.utils.key_creator import KeyCreator, HYBRID_FILES
+from src.utils.utils import get_proj_root
+
+
+@pytest.fixture()
+def key_creator(tmp_path):
+    """A KeyCreator working in a copy of the keys folder"""
+    key_creator = KeyCreator()
+    # Let the startup pool top up finish before changing the folder
+    if key_creator.executor is not None:
+        key_creator.executor.shutdown(wait=True)
+        key_creator.executor = None
+    keys_dir = tmp_path / "keys"
+    shutil.copytree(key_creator.keys_dir, keys_dir)
+    shutil.rmtree(keys_dir / "hybrid_pool", ignore_errors=True)
+    key_creator.keys_dir = keys_dir
+    yield key_creator
+    if key_creator.executor is not None:
+        key_creator.executor.shutdown(wait=True)
+
+
+def hybrid_aes_key(keys_dir):
+    """The AES key and IV unwrapped from a set of hybrid key files"""
+    root = str(get_proj_root())
+    crypto_manager = CryptoManager(
+        hybrid_file=os.path.relpath(keys_dir / "hybrid.txt", root),
+        hybrid_public_file=os.path.relpath(
+            keys_dir / "hybrid_public.pem", root
+        ),
+        hybrid_private_file=os.path.relpath(
+            keys_dir / "hybrid_private.pem", root
+        ),
+    )
+    crypto_manager.hybrid_file = str(keys_dir / "hybrid.txt")
+    crypto_manager.hybrid_public_file = str(keys_dir / "hybrid_public.pem")
+    crypto_manager.hybrid_private_file = str(keys_dir / "hybrid_private.pem")
+    return crypto_manager.hybrid_aes_key + crypto_manager.hybrid_iv
+
+
+def test_key_pool(key_creator, capfd):
+    assert key_creator.take_pooled_key() is None
+
+    start_time = time.perf_counter()
+    key_creator.create_hybrid_keys(force=True)
+    generate_time = time.perf_counter() - start_time
+
+    assert key_creator.fill_pool(1) == 1
+    assert key_creator.fill_pool(1) == 0
+    pooled = key_creator.pool_dir / os.listdir(key_creator.pool_dir)[0]
+    pooled_pem = pooled.read_bytes()
+
+    start_time = time.perf_counter()
+    key_creator.create_hybrid_keys(force=True)
+    pooled_time = time.perf_counter() - start_time
+
+    # The pooled key was used and removed from the pool
+    assert key_creator.pool_size() == 0
+    assert (key_creator.keys_dir / "hybrid_private.pem").read_bytes() == (
+        pooled_pem
+    )
+    with open(key_creator.keys_dir / "aes.txt") as f:
+        aes = bytes.fromhex(f.readline()) + bytes.fromhex(f.readline())
+    assert hybrid_aes_key(key_creator.keys_dir) == aes
+    assert pooled_time < generate_time
+
+    with capfd.disabled():
+        print(
+            f"\n--- Hybrid keys: generated {generate_time * 1000:.0f} ms, "
+            f"from the pool {pooled_time * 1000:.0f} ms ---"
+        )
+
+
+def test_refresh_in_background(key_creator):
+    old = {f: (key_creator.keys_dir / f).read_bytes() for f in HYBRID_FILES}
+    ready = []
+
+    start_time = time.perf_counter()
+    future = key_creator.refresh_hybrid_keys(lambda: ready.append(True))
+    assert time.perf_counter() - start_time < 0.1
+    assert future is not None
+
+    future.result()
+    assert ready == [True]
+    new = {f: (key_creator.keys_dir / f).read_bytes() for f in HYBRID_FILES}
+    assert all(new[f] != old[f] for f in HYBRID_FILES)
+    assert not list(key_creator.keys_dir.glob("*.tmp"))
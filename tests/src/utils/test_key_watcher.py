@@ -0,0 +1,84 @@
+import os
+import shutil
+import pytest
+from src.managers.crypto_manager import CryptoManager
+from src.utils.key_creator import KeyCreator, read_mount_points
+from src.utils.key_watcher import KeyWatcher
+from src.utils.utils import get_proj_root
+
+MOUNT_LINE = "36 25 8:17 / {} rw,nosuid - vfat /dev/sdb1 rw\n"
+
+
+def make_drive(path):
+    """A USB drive with the project's RSA keys and a new AES key"""
+    keys_dir = os.path.join(get_proj_root(), "keys")
+    path.mkdir(parents=True)
+    for name in ("public_key.pem", "private_key.pem"):
+        shutil.copy2(os.path.join(keys_dir, name), path / name)
+    key = os.urandom(32)
+    (path / "aes.txt").write_text(f"{key.hex()}\n{os.urandom(16).hex()}\n")
+    return key
+
+
+@pytest.fixture()
+def watcher(tmp_path, monkeypatch):
+    keys_dir = tmp_path / "keys"
+    keys_dir.mkdir()
+    key_creator = KeyCreator()
+    key_creator.keys_dir = keys_dir
+    # Creating RSA-4096 hybrid keys takes seconds and is tested elsewhere
+    monkeypatch.setattr(
+        key_creator, "refresh_hybrid_keys", lambda on_ready=None: None
+    )
+
+    crypto_manager = CryptoManager()
+    crypto_manager.key_file = str(keys_dir / "aes.txt")
+    crypto_manager.keyring_dir = str(keys_dir / "keyring")
+
+    mountinfo = tmp_path / "mountinfo"
+    mountinfo.write_text(MOUNT_LINE.format("/"))
+    return KeyWatcher(
+        crypto_manager,
+        key_creator,
+        mountinfo=str(mountinfo),
+        mount_roots=(str(tmp_path / "media"),),
+    )
+
+
+def test_read_mount_points(tmp_path):
+    mountinfo = tmp_path / "mountinfo"
+    mountinfo.write_text(
+        MOUNT_LINE.format("/")
+        + MOUNT_LINE.format("/media/pi/KEY\\040DRIVE")
+        + MOUNT_LINE.format("/mediaserver")
+    )
+    mounts = read_mount_points(str(mountinfo), ("/media",))
+    assert [str(m) for m in mounts] == ["/media/pi/KEY DRIVE"]
+
+
+def test_new_drive_keys_go_live(watcher, tmp_path):
+    mountinfo = tmp_path / "mountinfo"
+    assert watcher.poll() is None
+
+    # A drive without valid keys is ignored
+    bad_drive = tmp_path / "media" / "bad"
+    make_drive(bad_drive)
+    (bad_drive / "aes.txt").write_text("1234\n")
+    with open(mountinfo, "a") as f:
+        f.write(MOUNT_LINE.format(bad_drive))
+    assert watcher.poll() is None
+
+    drive = tmp_path / "media" / "keys"
+    key = make_drive(drive)
+    generation = watcher.crypto_manager.key_generation
+    with open(mountinfo, "a") as f:
+        f.write(MOUNT_LINE.format(drive))
+    assert watcher.poll() == drive
+    assert watcher.crypto_manager.key == key
+    assert watcher.crypto_manager.key_generation == generation + 1
+    # The keys were copied, so they stay after the drive is removed
+    assert (watcher.key_creator.keys_dir / "aes.txt").exists()
+
+    # A drive that stays mounted is only installed once
+    assert watcher.poll() is None
+    assert watcher.installed == [drive]
@@ -0,0 +1,17 @@
+from src.utils.latency import LatencyHistogram
+
+
+def test_histogram():
+    histogram = LatencyHistogram("test")
+    for us in (0.5, 3, 3, 3, 100, 5000):
+        histogram.record(us / 1e6)
+
+    assert histogram.count == 6
+    assert histogram.counts[0] == 1 and histogram.counts[2] == 3
+    assert histogram.percentile_us(50) == 4
+    assert histogram.percentile_us(100) == 8192
+    assert round(histogram.max * 1e6) == 5000
+    assert "test: 6 samples" in histogram.format()
+
+    histogram.reset()
+    assert histogram.count == 0 and histogram.percentile_us(99) == 0
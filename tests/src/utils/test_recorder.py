@@ -0,0 +1,115 @@
+import os
+import time
+import wave
+import struct
+import opuslib
+import pytest
+from src.utils.recorder import StreamRecorder, WaveSink, OpusSink
+
+CHUNK = 960 * 2  # One 20 ms frame of 48 kHz mono 16-bit audio
+
+
+class SlowSink:
+    """A sink whose writes stall like a busy SD card"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.data = bytearray()
+        self.flushes = 0
+
+    def write(self, data):
+        time.sleep(self.delay)
+        self.data += data
+
+    def flush(self):
+        self.flushes += 1
+
+    def close(self):
+        pass
+
+
+def test_wave_recording(tmp_path):
+    path = str(tmp_path / "recording.wav")
+    chunks = [os.urandom(CHUNK) for _ in range(95)]
+
+    recorder = StreamRecorder(
+        WaveSink(path, 1, 2, 48000), queue_size=100, batch_size=10
+    )
+    for chunk in chunks[:40]:
+        recorder.write(chunk)
+    # Whole batches are on disk and playable before the recording ends
+    while recorder.written < 40:
+        time.sleep(0.001)
+    with wave.open(path, "rb") as wf:
+        assert wf.readframes(wf.getnframes()) == b"".join(chunks[:40])
+
+    for chunk in chunks[40:]:
+        recorder.write(chunk)
+    recorder.close()
+
+    with wave.open(path, "rb") as wf:
+        assert wf.readframes(wf.getnframes()) == b"".join(chunks)
+    assert recorder.dropped == 0
+    assert recorder.batches == 10
+
+
+def test_disk_stall_never_blocks(capfd):
+    sink = SlowSink(delay=0.05)
+    recorder = StreamRecorder(sink, queue_size=8, batch_size=4)
+
+    slowest = 0
+    for i in range(200):
+        start_time = time.perf_counter()
+        recorder.write(bytes([i]) * 64)
+        slowest = max(slowest, time.perf_counter() - start_time)
+        time.sleep(0.001)
+    recorder.close()
+
+    assert slowest < 0.01
+    assert recorder.dropped > 0
+    assert recorder.max_queued <= 8
+    assert recorder.written + recorder.dropped == 200
+    assert len(sink.data) == recorder.written * 64
+    assert sink.flushes == recorder.batches
+
+    with capfd.disabled():
+        print(
+            f"\n--- Disk stalling 50 ms per batch: slowest write() "
+            f"{slowest * 1e6:.0f} µs | {recorder.written} written | "
+            f"{recorder.dropped} dropped ---"
+        )
+
+
+def test_failed_sink_stops_recording():
+    class FullDisk(SlowSink):
+        def write(self, data):
+            raise OSError("No space left on device")
+
+    recorder = StreamRecorder(FullDisk(0), batch_size=1)
+    recorder.write(b"audio")
+    while recorder.error is None:
+        time.sleep(0.001)
+    with pytest.raises(OSError):
+        recorder.write(b"audio")
+    recorder.close()
+
+
+def test_opus_recording(tmp_path):
+    path = str(tmp_path / "recording.opus")
+    encoder = opuslib.Encoder(48000, 1, opuslib.APPLICATION_VOIP)
+    # Chunks that do not line up with the Opus frames
+    data = os.urandom(CHUNK * 10 + 500)
+
+    with StreamRecorder(OpusSink(path, encoder, 960, 2)) as recorder:
+        for i in range(0, len(data), 1000):
+            recorder.write(data[i : i + 1000])
+
+    decoder = opuslib.Decoder(48000, 1)
+    frames = 0
+    with open(path, "rb") as f:
+        while header := f.read(2):
+            (length,) = struct.unpack("H", header)
+            assert len(decoder.decode(f.read(length), 960)) == CHUNK
+            frames += 1
+    # The last partial frame is padded
+    assert frames == 11
@@ -0,0 +1,46 @@
+import threading
+import time
+from src.utils.ring_buffer import RingBuffer
+
+
+def test_wraps_around():
+    ring = RingBuffer(10)
+    out = memoryview(bytearray(10))
+    assert ring.write(b"abcdefg") == 7
+    assert ring.read_into(out[:5]) == 5
+    assert bytes(out[:5]) == b"abcde"
+    # Written across the end of the buffer
+    assert ring.write(b"hijklmnopq") == 8
+    assert ring.available == 10
+    assert ring.space == 0
+    assert ring.write(b"r") == 0
+    assert ring.read_into(out) == 10
+    assert bytes(out) == b"fghijklmno"
+    assert ring.read_into(out) == 0
+
+
+def test_threaded_transfer():
+    """One producer and one consumer move a byte stream without a lock"""
+    ring = RingBuffer(97)
+    data = bytes(i % 251 for i in range(50000))
+    received = bytearray()
+
+    def produce():
+        pos = 0
+        while pos < len(data):
+            count = ring.write(data[pos : pos + 37])
+            if not count:
+                time.sleep(0)  # Full, let the consumer run
+            pos += count
+
+    producer = threading.Thread(target=produce)
+    producer.start()
+    out = memoryview(bytearray(41))
+    while len(received) < len(data):
+        count = ring.read_into(out)
+        if not count:
+            time.sleep(0)  # Empty, let the producer run
+        received += out[:count]
+    producer.join()
+
+    assert received == data
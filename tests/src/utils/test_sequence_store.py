@@ -0,0 +1,36 @@
+from src.utils.constants import SEQUENCE_MASK
+from src.utils.sequence_store import SequenceStore
+
+
+def test_restart_continues_after_sent_frames(tmp_path):
+    path = tmp_path / "tx_sequence.txt"
+    store = SequenceStore(path, lease=100)
+    first = store.start()
+    sent = []
+    seq = first
+    for _ in range(260):
+        store.claim(seq)
+        sent.append(seq)
+        seq = (seq + 1) & SEQUENCE_MASK
+    # The mark is moved every half lease and stays ahead of every frame
+    assert (store.mark - sent[-1]) & SEQUENCE_MASK <= 100
+    assert not path.with_name("tx_sequence.txt.tmp").exists()
+
+    # A restart, even after a crash, never reuses a sequence number
+    restarted = SequenceStore(path, lease=100).start()
+    assert restarted == store.mark
+    assert restarted not in sent
+
+
+def test_mark_wraps_and_survives_bad_file(tmp_path):
+    path = tmp_path / "tx_sequence.txt"
+    path.write_text(f"{SEQUENCE_MASK - 10}\n")
+    store = SequenceStore(path, lease=100)
+    assert store.start() == SEQUENCE_MASK - 10
+    assert store.mark == 89
+
+    # An unreadable mark falls back to a random start and is rewritten
+    path.write_text("garbage")
+    store = SequenceStore(path, lease=100)
+    seq = store.start()
+    assert int(path.read_text()) == (seq + 100) & SEQUENCE_MASK
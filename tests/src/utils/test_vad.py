@@ -0,0 +1,43 @@
+import numpy as np
+from src.utils.vad import VoiceActivityDetector, frame_rms
+from src.utils.constants import FRAME_SIZE
+
+
+def noise(level, rng):
+    samples = rng.normal(0.0, level, FRAME_SIZE)
+    return samples.astype(np.int16).tobytes()
+
+
+def test_frame_rms():
+    assert frame_rms(b"") == 0.0
+    assert frame_rms(bytes(FRAME_SIZE * 2)) == 0.0
+    tone = (1000 * np.sin(np.arange(FRAME_SIZE) * 0.1)).astype(np.int16)
+    assert abs(frame_rms(tone.tobytes()) - 1000 / np.sqrt(2)) < 5
+
+
+def test_speech_and_hangover():
+    rng = np.random.default_rng(312)
+    vad = VoiceActivityDetector()
+    # Background noise only
+    assert not any(vad.is_speech(noise(30, rng)) for _ in range(30))
+    assert 20 < vad.noise_rms < 30
+    assert vad.pause_frames == 30
+
+    # A word, then the hangover keeps sending for a while
+    assert all(vad.is_speech(noise(2000, rng)) for _ in range(10))
+    assert vad.pause_frames == 0
+    after = [vad.is_speech(noise(30, rng)) for _ in range(20)]
+    assert after == [True] * vad.hangover + [False] * (20 - vad.hangover)
+    assert vad.speech_frames == 10 + vad.hangover
+    assert vad.activity == vad.speech_frames / 60
+
+
+def test_dtx_frame_is_silence():
+    rng = np.random.default_rng(312)
+    vad = VoiceActivityDetector(hangover=0)
+    loud = noise(2000, rng)
+    assert vad.is_speech(loud, b"\x00" * 40)
+    assert not vad.is_speech(loud, b"\x08")
+
+    vad.reset()
+    assert vad.frames == 0 and vad.pause_frames == 0